@@ -0,0 +1,82 @@
+"""
+Benchmark reading SDS file segments: ObsPy headonly vs the record header scanner.
+
+Usage:
+    python -m benchmarks.bench_sds_headers [SDS_PATH]
+
+Without SDS_PATH a sample archive of synthetic day files is built in a
+temporary directory.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from obspy import Stream, Trace, UTCDateTime
+from obspy.core.stream import read as streamread
+
+from seed_vault.service.db import iter_sds_files, stream_to_db_elements
+from seed_vault.service.mseed import read_segments
+
+
+def build_sample_archive(sds_path: Path, num_stations: int = 4, num_days: int = 3,
+                         sample_rate: float = 40.0):
+    rng = np.random.default_rng(0)
+    start = UTCDateTime("2024-01-01")
+    for sta in range(num_stations):
+        for cha in ("HHZ", "HHN", "HHE"):
+            for day in range(num_days):
+                t0 = start + day * 86400
+                tr = Trace(data=rng.integers(-2000, 2000, int(86400 * sample_rate), dtype=np.int32),
+                           header={"network": "XX", "station": f"S{sta:03d}", "channel": cha,
+                                   "starttime": t0, "sampling_rate": sample_rate})
+                fn = (sds_path / str(t0.year) / "XX" / f"S{sta:03d}" / f"{cha}.D" /
+                      f"{tr.id}.D.{t0.year}.{t0.julday:03d}")
+                fn.parent.mkdir(parents=True, exist_ok=True)
+                # Leave a gap in one file so that there is more than one segment
+                if day == 1:
+                    st = Stream([tr.slice(endtime=t0 + 3600), tr.slice(starttime=t0 + 7200)])
+                else:
+                    st = Stream([tr])
+                st.write(str(fn), format="MSEED", reclen=512, encoding="STEIM2")
+
+
+def obspy_segments(path: str):
+    return stream_to_db_elements(streamread(path, headonly=True))
+
+
+def same_segments(a, b, tolerance: float = 1e-6) -> bool:
+    return len(a) == len(b) and all(
+        x[0:4] == y[0:4] and abs(x[4] - y[4]) <= tolerance and abs(x[5] - y[5]) <= tolerance
+        for x, y in zip(a, b))
+
+
+def bench(func, paths):
+    t0 = time.perf_counter()
+    results = [func(path) for path in paths]
+    return time.perf_counter() - t0, results
+
+
+def main(sds_path: str):
+    paths = [entry.path for entry in iter_sds_files(sds_path)]
+    print(f"{len(paths)} files in {sds_path}")
+
+    t_obspy, obspy_results = bench(obspy_segments, paths)
+    t_scan, scan_results = bench(read_segments, paths)
+
+    mismatches = sum(not same_segments(a, b) for a, b in zip(obspy_results, scan_results))
+    print(f"obspy headonly: {t_obspy:8.3f} s")
+    print(f"header scanner: {t_scan:8.3f} s  ({t_obspy / t_scan:.1f}x faster)")
+    print(f"files with different segments: {mismatches}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            print("Building sample archive...")
+            build_sample_archive(Path(tmp))
+            main(tmp)
@@ -1,6 +1,7 @@
 import click
 import os
 from seed_vault.service.seismoloader import run_main, populate_database_from_sds
+from seed_vault.service.db import index_sds_archive
 
 dirname = os.path.dirname(__file__)
 par_dir = os.path.dirname(dirname)
@@ -26,7 +27,9 @@ def cli(ctx, file_path):
 @click.option("-nt", "--newer-than", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Filter for files newer than a specific date (YYYY-MM-DD).")
 @click.option("-c", "--cpu", default=0, type=int, help="Number of processes to use, input 0 to maximize.")
 @click.option("-g", "--gap-tolerance", default=60, type=int, help="Gap tolerance in seconds.")
-def populate_db(sds_path, db_path, search_patterns, newer_than, cpu, gap_tolerance):
+@click.option("-ff", "--from-filenames", is_flag=True, default=False, help="Fast mode for continuous archives: assume complete day files and only read headers of files that may have changed.")
+@click.option("-i", "--incremental", is_flag=True, default=False, help="Only read files that changed since the last sync and forget files that were removed.")
+def populate_db(sds_path, db_path, search_patterns, newer_than, cpu, gap_tolerance, from_filenames, incremental):
     """Populates the database from the SDS path into the specified database file."""
     search_patterns_list = search_patterns.strip().split(",")
 
@@ -37,6 +40,8 @@ def populate_db(sds_path, db_path, search_patterns, newer_than, cpu, gap_toleran
         newer_than=newer_than,
         num_processes=cpu,
         gap_tolerance=gap_tolerance,
+        from_filenames=from_filenames,
+        incremental=incremental,
     )
 
 
@@ -44,5 +49,25 @@ def populate_db(sds_path, db_path, search_patterns, newer_than, cpu, gap_toleran
 cli.add_command(populate_db, name="sync-db")
 
 
+@click.command(name="index-sds", help="Writes the record index of every day file in the local SDS repository.")
+@click.argument("sds_path", type=click.Path(exists=True))
+@click.option("-sp", "--search-patterns", default="??.*.*.???.?.????.???", help="Comma-separated list of search patterns.")
+@click.option("-c", "--cpu", default=0, type=int, help="Number of processes to use, input 0 to maximize.")
+@click.option("--force", is_flag=True, default=False, help="Rewrite indexes that are already up to date.")
+def index_sds(sds_path, search_patterns, cpu, force):
+    """Writes the sidecar record index of the files in the SDS path."""
+    search_patterns_list = search_patterns.strip().split(",")
+
+    index_sds_archive(
+        sds_path=sds_path,
+        search_patterns=search_patterns_list,
+        num_processes=cpu,
+        force=force,
+    )
+
+
+cli.add_command(index_sds, name="index-sds")
+
+
 if __name__ == "__main__":
     cli()
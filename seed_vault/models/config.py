@@ -113,6 +113,16 @@ class ProcessingConfig(BaseModel):
     """
     num_processes: Optional    [  int         ] | None = 4
     gap_tolerance: Optional    [  int         ] | None = 60
+    max_client_connections: Optional [ int    ] | None = 3
+    pipeline_downloads: Optional [ bool       ] = False
+    pipeline_buffer_mb: Optional [ int        ] | None = 512
+    write_buffer_mb: Optional  [  int         ] | None = 256
+    traveltime_tolerance: Optional [ float    ] | None = 0.5
+    parallel_events: Optional  [  int         ] | None = 1
+    coalesce_slack_sec: Optional [ int        ] | None = None
+    request_budget_mb: Optional [ int         ] | None = None
+    stream_buffer_mb: Optional [ int          ] | None = None
+    record_index: Optional [ bool             ] = False
     logging      : Optional    [  str         ] = None
 
 
@@ -617,6 +627,76 @@ class SeismoLoaderSettings(BaseModel):
             gap_tolerance = 60  # Default value
             status_handler.add_warning("input_parameters", "'gap_tolerance' is missing or invalid in the [PROCESSING] section. Using default value: '60'.")
 
+        # Parse max_client_connections (simultaneous downloads allowed per data center)
+        max_client_connections = config.get('PROCESSING', 'max_client_connections', fallback=None)
+        try:
+            max_client_connections = cls._check_val(max_client_connections, 3, "int")
+        except ValueError:
+            max_client_connections = 3  # Default value
+            status_handler.add_warning("input_parameters", "'max_client_connections' is invalid in the [PROCESSING] section. Using default value: '3'.")
+
+        # Parse pipeline_downloads (separate download and SDS write stages)
+        pipeline_downloads = cls._check_val(config.get('PROCESSING', 'pipeline_downloads', fallback=False), False, "bool")
+
+        # Parse pipeline_buffer_mb (downloaded data waiting for the pipeline's writer stage)
+        pipeline_buffer_mb = config.get('PROCESSING', 'pipeline_buffer_mb', fallback=None)
+        try:
+            pipeline_buffer_mb = cls._check_val(pipeline_buffer_mb, 512, "int")
+        except ValueError:
+            pipeline_buffer_mb = 512  # Default value
+            status_handler.add_warning("input_parameters", "'pipeline_buffer_mb' is invalid in the [PROCESSING] section. Using default value: '512'.")
+
+        # Parse write_buffer_mb (memory ceiling of the continuous write-behind buffer, 0 = off)
+        write_buffer_mb = config.get('PROCESSING', 'write_buffer_mb', fallback=None)
+        try:
+            write_buffer_mb = cls._check_val(write_buffer_mb, 256, "int")
+        except ValueError:
+            write_buffer_mb = 256  # Default value
+            status_handler.add_warning("input_parameters", "'write_buffer_mb' is invalid in the [PROCESSING] section. Using default value: '256'.")
+
+        # Parse traveltime_tolerance (interpolation error of cached travel times accepted at a cell's check points in seconds, 0 = exact TauP)
+        traveltime_tolerance = config.get('PROCESSING', 'traveltime_tolerance', fallback=None)
+        try:
+            traveltime_tolerance = cls._check_val(traveltime_tolerance, 0.5, "float")
+        except ValueError:
+            traveltime_tolerance = 0.5  # Default value
+            status_handler.add_warning("input_parameters", "'traveltime_tolerance' is invalid in the [PROCESSING] section. Using default value: '0.5'.")
+
+        # Parse parallel_events (number of events processed concurrently by run_event)
+        parallel_events = config.get('PROCESSING', 'parallel_events', fallback=None)
+        try:
+            parallel_events = cls._check_val(parallel_events, 1, "int")
+        except ValueError:
+            parallel_events = 1  # Default value
+            status_handler.add_warning("input_parameters", "'parallel_events' is invalid in the [PROCESSING] section. Using default value: '1'.")
+
+        # Parse coalesce_slack_sec (merge windows of the same channel across events, None = plan per event)
+        coalesce_slack_sec = config.get('PROCESSING', 'coalesce_slack_sec', fallback=None)
+        try:
+            coalesce_slack_sec = cls._check_val(coalesce_slack_sec, None, "int")
+        except ValueError:
+            coalesce_slack_sec = None  # Default value
+            status_handler.add_warning("input_parameters", "'coalesce_slack_sec' is invalid in the [PROCESSING] section. Using default value: 'None'.")
+
+        # Parse request_budget_mb (estimated payload per bulk selection, None = combine_requests)
+        request_budget_mb = config.get('PROCESSING', 'request_budget_mb', fallback=None)
+        try:
+            request_budget_mb = cls._check_val(request_budget_mb, None, "int")
+        except ValueError:
+            request_budget_mb = None  # Default value
+            status_handler.add_warning("input_parameters", "'request_budget_mb' is invalid in the [PROCESSING] section. Using default value: 'None'.")
+
+        # Parse stream_buffer_mb (route raw records to day files with this much buffering, None = off)
+        stream_buffer_mb = config.get('PROCESSING', 'stream_buffer_mb', fallback=None)
+        try:
+            stream_buffer_mb = cls._check_val(stream_buffer_mb, None, "int")
+        except ValueError:
+            stream_buffer_mb = None  # Default value
+            status_handler.add_warning("input_parameters", "'stream_buffer_mb' is invalid in the [PROCESSING] section. Using default value: 'None'.")
+
+        # Parse record_index (write a sidecar record index next to every SDS day file written)
+        record_index = cls._check_val(config.get('PROCESSING', 'record_index', fallback=False), False, "bool")
+
         # Parse and validate download_type
         download_type_str = config.get('PROCESSING', 'download_type', fallback='').strip().lower()
         if download_type_str not in DownloadType._value2member_map_:
@@ -628,6 +708,16 @@ class SeismoLoaderSettings(BaseModel):
         return ProcessingConfig(
             num_processes=num_processes,
             gap_tolerance=gap_tolerance,
+            max_client_connections=max_client_connections,
+            pipeline_downloads=pipeline_downloads,
+            pipeline_buffer_mb=pipeline_buffer_mb,
+            write_buffer_mb=write_buffer_mb,
+            traveltime_tolerance=traveltime_tolerance,
+            parallel_events=parallel_events,
+            coalesce_slack_sec=coalesce_slack_sec,
+            request_budget_mb=request_budget_mb,
+            stream_buffer_mb=stream_buffer_mb,
+            record_index=record_index,
         ), download_type
 
 
@@ -1131,6 +1221,16 @@ class SeismoLoaderSettings(BaseModel):
         config['PROCESSING'] = {}
         safe_add_to_config(config, 'PROCESSING', 'num_processes', self.processing.num_processes)
         safe_add_to_config(config, 'PROCESSING', 'gap_tolerance', self.processing.gap_tolerance)
+        safe_add_to_config(config, 'PROCESSING', 'max_client_connections', self.processing.max_client_connections)
+        safe_add_to_config(config, 'PROCESSING', 'pipeline_downloads', self.processing.pipeline_downloads)
+        safe_add_to_config(config, 'PROCESSING', 'pipeline_buffer_mb', self.processing.pipeline_buffer_mb)
+        safe_add_to_config(config, 'PROCESSING', 'write_buffer_mb', self.processing.write_buffer_mb)
+        safe_add_to_config(config, 'PROCESSING', 'traveltime_tolerance', self.processing.traveltime_tolerance)
+        safe_add_to_config(config, 'PROCESSING', 'parallel_events', self.processing.parallel_events)
+        safe_add_to_config(config, 'PROCESSING', 'coalesce_slack_sec', self.processing.coalesce_slack_sec)
+        safe_add_to_config(config, 'PROCESSING', 'request_budget_mb', self.processing.request_budget_mb)
+        safe_add_to_config(config, 'PROCESSING', 'stream_buffer_mb', self.processing.stream_buffer_mb)
+        safe_add_to_config(config, 'PROCESSING', 'record_index', self.processing.record_index)
         safe_add_to_config(config, 'PROCESSING', 'download_type', self.download_type.value)
 
         # Populate the [AUTH] section
@@ -1238,6 +1338,16 @@ class SeismoLoaderSettings(BaseModel):
             'processing': {
                 'num_processes': self.processing.num_processes,
                 'gap_tolerance': self.processing.gap_tolerance,
+                'max_client_connections': self.processing.max_client_connections,
+                'pipeline_downloads': self.processing.pipeline_downloads,
+                'pipeline_buffer_mb': self.processing.pipeline_buffer_mb,
+                'write_buffer_mb': self.processing.write_buffer_mb,
+                'traveltime_tolerance': self.processing.traveltime_tolerance,
+                'parallel_events': self.processing.parallel_events,
+                'coalesce_slack_sec': self.processing.coalesce_slack_sec,
+                'request_budget_mb': self.processing.request_budget_mb,
+                'stream_buffer_mb': self.processing.stream_buffer_mb,
+                'record_index': self.processing.record_index,
             },            
             'download_type': self.download_type.value if self.download_type else None,
             'auths': self.auths if self.auths else [],
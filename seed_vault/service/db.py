@@ -12,20 +12,27 @@ import contextlib
 import time
 import random
 import fnmatch
+import itertools
+import re
+import threading
+import weakref
 import multiprocessing
 from tqdm import tqdm
 from datetime import datetime, timedelta
 from pathlib import Path
+from collections import defaultdict
 from obspy import UTCDateTime,Stream
 from obspy.core.stream import read as streamread
+import numpy as np
 import pandas as pd
 from typing import Union, List, Dict, Tuple, Optional, Any
 
+from seed_vault.service.mseed import read_segments, load_record_index, write_record_index
 from seed_vault.service.utils import to_timestamp
 
 
 
-def stream_to_db_elements(st: Stream) -> List[Tuple[str, str, str, str, str, str]]:
+def stream_to_db_elements(st: Stream) -> List[Tuple[str, str, str, str, float, float]]:
     """
     Convert an ObsPy Stream object to multiple database element tuples, properly handling gaps.
     Creates database elements from a stream, assuming all traces have the same 
@@ -35,13 +42,13 @@ def stream_to_db_elements(st: Stream) -> List[Tuple[str, str, str, str, str, str
         st: ObsPy Stream object containing seismic traces.
     
     Returns:
-        List[Tuple[str, str, str, str, str, str]]: A list of tuples, each containing:
+        List[Tuple[str, str, str, str, float, float]]: A list of tuples, each containing:
             - network: Network code
             - station: Station code
             - location: Location code
             - channel: Channel code
-            - start_time: ISO format start time
-            - end_time: ISO format end time
+            - start_time: Start time as Unix timestamp
+            - end_time: End time as Unix timestamp
             Returns empty list if stream is empty.
     
     Example:
@@ -73,7 +80,7 @@ def stream_to_db_elements(st: Stream) -> List[Tuple[str, str, str, str, str, str
         if st[i].stats.starttime > current_segment_end:
             elements.append((
                 network, station, location, channel,
-                current_segment_start.isoformat(), current_segment_end.isoformat()
+                current_segment_start.timestamp, current_segment_end.timestamp
             ))
             current_segment_start = st[i].stats.starttime
         
@@ -83,31 +90,33 @@ def stream_to_db_elements(st: Stream) -> List[Tuple[str, str, str, str, str, str
     # Add the final segment
     elements.append((
         network, station, location, channel,
-        current_segment_start.isoformat(), current_segment_end.isoformat()
+        current_segment_start.timestamp, current_segment_end.timestamp
     ))
     
     return elements
 
 
-def miniseed_to_db_elements(file_path: str) -> Optional[Tuple[str, str, str, str, str, str]]:
+def miniseed_to_db_elements(file_path: str) -> List[Tuple[str, str, str, str, float, float]]:
     """
     Convert a miniseed file to a database element tuple.
 
     Processes a miniseed file and extracts relevant metadata for database storage.
     Expects files in the format: network.station.location.channel.*.year.julday
+    Only record headers are read (see mseed.read_segments), falling back to
+    ObsPy for files that aren't plain miniSEED 2.
 
     Args:
         file_path: Path to the miniseed file.
 
     Returns:
-        Optional[Tuple[str, str, str, str, str, str]]: A tuple containing:
+        List[Tuple[str, str, str, str, float, float]]: Tuples containing:
             - network: Network code
             - station: Station code
             - location: Location code
             - channel: Channel code
-            - start_time: ISO format start time
-            - end_time: ISO format end time
-            Returns None if file is invalid or cannot be processed.
+            - start_time: Start time as Unix timestamp
+            - end_time: End time as Unix timestamp
+            Returns an empty list if file is invalid or cannot be processed.
 
     Example:
         >>> element = miniseed_to_db_element("/path/to/IU.ANMO.00.BHZ.D.2020.001")
@@ -124,7 +133,12 @@ def miniseed_to_db_elements(file_path: str) -> Optional[Tuple[str, str, str, str
         
         network, station, location, channel, _, year, dayfolder = parts
         
-        # Read the file to get actual start and end times
+        # Read the record headers to get actual start and end times
+        try:
+            return read_segments(file_path)
+        except ValueError:
+            pass  # not a plain miniSEED 2 file, let ObsPy have a go
+
         st = streamread(file_path, headonly=True)
 
         db_elements = stream_to_db_elements(st)
@@ -136,9 +150,212 @@ def miniseed_to_db_elements(file_path: str) -> Optional[Tuple[str, str, str, str
         return []
 
 
+def compile_search_patterns(search_patterns: List[str]) -> "re.Pattern":
+    """
+    Combine shell-style file name patterns into one precompiled regex.
+
+    Args:
+        search_patterns: fnmatch patterns, e.g. ["??.*.*.???.?.????.???"].
+
+    Returns:
+        Compiled regex matching a file name if any of the patterns match it.
+    """
+    return re.compile("|".join(f"(?:{fnmatch.translate(p.strip())})"
+                               for p in search_patterns if p.strip()))
+
+
+def iter_sds_files(sds_path: str, search_patterns: List[str] = ["??.*.*.???.?.????.???"]):
+    """
+    Find the day files of an SDS archive.
+
+    Only follows the fixed SDS layout YEAR/NET/STA/CHAN.TYPE/file with
+    os.scandir (so the directory listings provide file types without extra
+    stat calls) and matches file names against one precompiled regex.
+    Symbolic links are followed, like os.walk(followlinks=True).
+
+    Args:
+        sds_path: Path to the root SDS archive directory.
+        search_patterns: File name patterns to match.
+
+    Yields:
+        os.DirEntry of each matching file. entry.stat() is cached, so
+        callers only pay for a stat when they need mtime or size.
+
+    Example:
+        >>> for entry in iter_sds_files("/archive/SDS"):
+        ...     print(entry.path, entry.stat().st_size)
+    """
+    pattern = compile_search_patterns(search_patterns)
+    year_dir = re.compile(r"\d{4}$")
+
+    def subdirs(path):
+        try:
+            with os.scandir(path) as it:
+                return [e.path for e in it if e.is_dir()]
+        except OSError as e:
+            print(f"Could not scan {path}: {str(e)}")
+            return []
+
+    try:
+        with os.scandir(sds_path) as it:
+            years = [e.path for e in it if e.is_dir() and year_dir.match(e.name)]
+    except OSError as e:
+        print(f"Could not scan {sds_path}: {str(e)}")
+        return
+    for year in sorted(years):
+        for net in subdirs(year):
+            for sta in subdirs(net):
+                for cha in subdirs(sta):
+                    try:
+                        with os.scandir(cha) as it:
+                            files = [e for e in it if pattern.match(e.name) and e.is_file()]
+                    except OSError as e:
+                        print(f"Could not scan {cha}: {str(e)}")
+                        continue
+                    yield from files
+
+
+def sds_filename_to_db_element(file_name: str) -> Optional[Tuple[str, str, str, str, float, float]]:
+    """
+    Describe an SDS day file by its name alone, assuming it covers the whole day.
+
+    Args:
+        file_name: SDS file name, e.g. "IU.ANMO.00.BHZ.D.2020.001".
+
+    Returns:
+        (network, station, location, channel, start, end) with start and end
+        the Unix timestamps of the day's start and end, or None if the name
+        isn't a valid SDS file name.
+
+    Example:
+        >>> sds_filename_to_db_element("IU.ANMO.00.BHZ.D.2020.001")
+        ('IU', 'ANMO', '00', 'BHZ', 1577836800.0, 1577923200.0)
+    """
+    parts = file_name.split('.')
+    if len(parts) != 7:
+        return None
+    network, station, location, channel, _, year, doy = parts
+    try:
+        day_start = UTCDateTime(year=int(year), julday=int(doy)).timestamp
+    except (ValueError, TypeError):
+        return None
+    return (network, station, location, channel, day_start, day_start + 86400)
+
+
+# Files per database transaction when syncing, and files per worker task
+SYNC_BATCH_FILES = 5000
+SYNC_CHUNKSIZE = 16
+
+
+def _run_task(item: Tuple[int, Any, Any]) -> Tuple[int, Any]:
+    """Run one numbered task of _imap_files() (in a worker process)."""
+    i, func, task = item
+    return i, func(task)
+
+
+def _imap_files(func, tasks, num_processes: int, chunksize: int = SYNC_CHUNKSIZE):
+    """
+    Apply func to each task in a process pool, yielding results as they complete.
+
+    tasks may be a generator: the pool takes tasks as its workers need them,
+    so memory use doesn't grow with the number of tasks. Falls back to a
+    single process if the pool can't be started or breaks (common on OSX and
+    Windows), running the tasks the pool didn't finish here.
+
+    Args:
+        func: Module-level function taking one task.
+        tasks: Iterable of picklable tasks.
+        num_processes: Number of worker processes, 1 to run everything here.
+        chunksize: Tasks sent to a worker at once.
+
+    Yields:
+        func(task) for each task, in no particular order.
+    """
+    tasks = iter(tasks)
+    in_flight = {}
+    errors = []
+
+    def numbered():
+        # Runs in the pool's task thread. Errors of the tasks iterable itself
+        # are raised again below rather than taken for a broken pool.
+        try:
+            for i, task in enumerate(tasks):
+                in_flight[i] = task
+                yield i, func, task
+        except Exception as e:
+            errors.append(e)
+
+    if num_processes > 1:
+        # TODO TODO TODO ensure cross platform compatibility with windows especially
+        try:
+            with multiprocessing.Pool(processes=num_processes) as pool:
+                for i, result in pool.imap_unordered(_run_task, numbered(), chunksize=chunksize):
+                    del in_flight[i]
+                    yield result
+        except Exception as e:
+            print(f"Multiprocessing failed: {str(e)}. Falling back to single-process execution.")
+        if errors:
+            raise errors[0]
+    # Nothing left here once the pool went through all tasks
+    for task in list(in_flight.values()):
+        yield func(task)
+    for task in tasks:
+        yield func(task)
+
+
+def _read_sds_file(task: Tuple[str, str, int, float, int, Optional[List[Tuple]]]) -> Tuple[str, int, float, int, List[Tuple]]:
+    """
+    Read the spans of one SDS file (in a worker process).
+
+    Args:
+        task: (full path, path relative to the SDS root, size, mtime, inode,
+            elements). Files whose elements are already known (registered by
+            name) aren't opened.
+
+    Returns:
+        (path, size, mtime, inode, elements), as taken by
+        DatabaseManager.update_file_manifest().
+    """
+    elements = task[5] if task[5] is not None else miniseed_to_db_elements(task[0])
+    return task[1:5] + (elements,)
+
+
+def _file_stat(entry: os.DirEntry) -> Tuple[int, float, int]:
+    """(size, mtime, inode) of a file, with the inode fitting an SQLite integer."""
+    stat = entry.stat()
+    inode = stat.st_ino if stat.st_ino < 2**63 else stat.st_ino - 2**64
+    return stat.st_size, stat.st_mtime, inode
+
+
+def _coverage_windows(paths: List[str], segments: Dict[str, List[Tuple]]) -> List[Tuple[str, str, str, str, float, float]]:
+    """
+    Time windows covered by files, per channel.
+
+    Args:
+        paths: SDS file paths. The day a file is named after is always part of its window.
+        segments: Spans of the files, as returned by DatabaseManager.get_file_segments().
+
+    Returns:
+        List of (network, station, location, channel, starttime, endtime).
+    """
+    windows = []
+    for path in paths:
+        spans = list(segments.get(path, []))
+        day = sds_filename_to_db_element(os.path.basename(path))
+        if day is not None:
+            spans.append(day)
+        by_channel = defaultdict(list)
+        for span in spans:
+            by_channel[tuple(span[0:4])].append(span[4:6])
+        for nslc, times in by_channel.items():
+            windows.append(nslc + (min(t[0] for t in times), max(t[1] for t in times)))
+    return windows
+
+
 def populate_database_from_sds(sds_path, db_path,
     search_patterns=["??.*.*.???.?.????.???"],
-    newer_than=None, num_processes=None, gap_tolerance = 60):
+    newer_than=None, num_processes=None, gap_tolerance = 60,
+    from_filenames=False, incremental=False):
 
     """
     Scan an SDS archive directory and populate a database with data availability.
@@ -158,13 +375,31 @@ def populate_database_from_sds(sds_path, db_path,
             Defaults to None (use all available CPU cores).
         gap_tolerance (int, optional): Maximum time gap in seconds between segments
             that should be considered continuous. Defaults to 60.
+        from_filenames (bool, optional): Fast mode for complete continuous archives.
+            Files are assumed to cover their whole day, as given by their name,
+            and only files that may have changed since (modified before their
+            day was over, or after newer_than) have their headers read. All
+            other matching files are registered without being opened.
+            Defaults to False.
+        incremental (bool, optional): Only read files whose size, mtime or inode
+            changed since the last sync (as recorded in the file_manifest table),
+            and remove the availability of files that no longer exist.
+            Defaults to False.
 
     Notes:
         - Uses DatabaseManager class to handle database operations
         - Attempts multiprocessing but falls back to single process if it fails
             (common on OSX and Windows)
+        - Only looks at the SDS layout YEAR/NET/STA/CHAN.TYPE (see iter_sds_files)
         - Follows symbolic links when walking directory tree
         - Files are processed using miniseed_to_db_elements() function
+        - Every file read is recorded in the file_manifest and file_segments tables
+        - Files are handed to the workers as the archive is walked, and an
+            incremental sync compares each directory with its part of the
+            manifest only, so memory use doesn't grow with the archive
+        - Results are inserted in transactions of SYNC_BATCH_FILES files as they
+            arrive, so an interrupted sync keeps what it has read (and an
+            incremental sync picks up where it stopped)
         - After insertion, continuous segments are joined based on gap_tolerance
         - Progress is displayed using tqdm progress bars
         - If newer_than is provided, it's converted to a Unix timestamp for comparison
@@ -183,45 +418,159 @@ def populate_database_from_sds(sds_path, db_path,
     if newer_than:
         newer_than = to_timestamp(newer_than)
 
-    # Collect all file paths
-    file_paths = []
+    pattern = compile_search_patterns(search_patterns)
+    counts = {'changed': 0, 'removed': 0, 'registered': 0, 'inserted': 0}
+    visited = set()
 
-    for root, dirs, files in os.walk(sds_path,followlinks=True):
-        for f in files:
-            if any(fnmatch.fnmatch(f, pattern) for pattern in search_patterns):
-                file_path = os.path.join(root,f)
-                if newer_than is None or os.path.getmtime(file_path) > newer_than:
-                    file_paths.append(os.path.join(root, f))
-    
-    total_files = len(file_paths)
-    print(f"Found {total_files} files to process.")
-    
-    # Process files with or without multiprocessing
-    # TODO TODO TODO ensure cross platform compatibility with windows especially
-    if num_processes > 1:
+    def forget(paths, num_removed=0):
+        # Forget changed and removed files, rebuilding the time windows they
+        # covered from the other files. Changed files are then inserted like new ones.
+        if not paths:
+            return
+        windows = _coverage_windows(paths, db_manager.get_file_segments(paths))
         try:
-            with multiprocessing.Pool(processes=num_processes) as pool:
-                results = list(tqdm(pool.imap(miniseed_to_db_elements, file_paths), 
-                              total=total_files, desc="Processing files"))
-                to_insert_db = [item for sublist in results for item in sublist]
-
+            db_manager.update_file_manifest([], removed=paths)
+            if windows:
+                counts['inserted'] += db_manager.rebuild_archive_windows(windows)
         except Exception as e:
-            print(f"Multiprocessing failed: {str(e)}. Falling back to single-process execution.")
-            num_processes = 1
-    else:
-        to_insert_db = []
-        for fp in tqdm(file_paths, desc="Scanning %s..." % sds_path):
-            to_insert_db.extend(miniseed_to_db_elements(fp))
+            raise RuntimeError("Error with rebuild_archive_windows") from e
+        counts['changed'] += len(paths) - num_removed
+        counts['removed'] += num_removed
+
+    def scan():
+        # One SDS directory at a time, comparing with the manifest of that
+        # directory only, so nothing grows with the archive
+        files = iter_sds_files(sds_path, search_patterns)
+        for directory, entries in itertools.groupby(files, key=lambda e: os.path.dirname(e.path)):
+            directory = os.path.relpath(directory, sds_path)
+            visited.add(directory)
+            manifest = db_manager.get_file_manifest(directory) if incremental else {}
+            changed = []
+            tasks = []
+            for entry in entries:
+                path = os.path.relpath(entry.path, sds_path)
+                stat = _file_stat(entry)
+                known = manifest.pop(path, None)
+                if known is not None and tuple(known) == stat:
+                    continue
+                size, mtime, _ = stat
+                elements = None
+                if from_filenames:
+                    element = sds_filename_to_db_element(entry.name)
+                    # A file last written before its day ended may be incomplete
+                    if (element is not None and mtime > element[5] and
+                        (newer_than is None or mtime <= newer_than)):
+                        elements = [element] if size > 0 else []
+                        counts['registered'] += 1
+                elif newer_than is not None and mtime <= newer_than:
+                    continue
+                if known is not None:
+                    changed.append(path)
+                tasks.append((entry.path, path) + stat + (elements,))
+            # Files of the last sync that are gone
+            removed = [path for path in manifest if pattern.match(os.path.basename(path))]
+            forget(changed + removed, len(removed))
+            yield from tasks
+
+        if incremental:
+            # Files of the last sync in directories that are gone or empty
+            for paths in db_manager.iter_file_manifest_paths(SYNC_BATCH_FILES):
+                removed = [path for path in paths if os.path.dirname(path) not in visited
+                           and pattern.match(os.path.basename(path))]
+                forget(removed, len(removed))
+
+    def insert(batch):
+        try:
+            db_manager.update_file_manifest(batch)
+            return db_manager.bulk_insert_archive_data([ele for f in batch for ele in f[4]])
+        except Exception as e:
+            raise RuntimeError("Error with bulk_insert_archive_data") from e
+
+    # Update database in fixed-size transactions as results arrive, so memory
+    # use doesn't grow with the archive and an interrupted sync keeps its progress
+    num_files = 0
+    batch = []
+    for result in tqdm(_imap_files(_read_sds_file, scan(), num_processes),
+                       desc="Scanning %s..." % sds_path):
+        batch.append(result)
+        num_files += 1
+        if len(batch) >= SYNC_BATCH_FILES:
+            counts['inserted'] += insert(batch)
+            batch = []
+    counts['inserted'] += insert(batch)
+
+    if incremental:
+        print(f"{counts['changed']} files changed and {counts['removed']} removed since the last sync.")
+    if from_filenames:
+        print(f"Registered {counts['registered']} files by name.")
+    print(f"Processed {num_files} files, inserted {counts['inserted']} records into the database.")
+
+    db_manager.join_continuous_segments(gap_tolerance, touched_only=incremental)
+
+
+def _index_sds_file(task: Tuple[str, bool]) -> Tuple[str, Optional[str]]:
+    """
+    Write the sidecar record index of one SDS file (in a worker process).
 
-    # Update database
+    Args:
+        task: (full path, force). Without force, files whose index is up to
+            date are skipped.
+
+    Returns:
+        (path, status), status being 'indexed', 'skipped' or an error message.
+    """
+    path, force = task
+    if not force and load_record_index(path) is not None:
+        return path, 'skipped'
     try:
-        num_inserted = db_manager.bulk_insert_archive_data(to_insert_db)
+        write_record_index(path)
     except Exception as e:
-        raise RuntimeError("Error with bulk_insert_archive_data") from e  
+        return path, str(e)
+    return path, 'indexed'
+
+
+def index_sds_archive(sds_path, search_patterns=["??.*.*.???.?.????.???"],
+                      num_processes=None, force=False) -> Dict[str, int]:
+    """
+    Write the sidecar record index of every file in an SDS archive.
+
+    Backfills archives written before processing.record_index was turned on
+    (or by other tools), see mseed.write_record_index(). Files that already
+    have an up to date index are left alone, so this can be re-run at any
+    time to index only what changed.
 
-    print(f"Processed {total_files} files, inserted {num_inserted} records into the database.")
+    Args:
+        sds_path (str): Path to the root SDS archive directory
+        search_patterns (list, optional): List of file patterns to match.
+            Defaults to ["??.*.*.???.?.????.???"] (standard SDS naming pattern).
+        num_processes (int, optional): Number of parallel processes to use.
+            Defaults to None (use all available CPU cores).
+        force (bool, optional): Rewrite indexes that are up to date as well.
+            Defaults to False.
 
-    db_manager.join_continuous_segments(gap_tolerance)
+    Returns:
+        Dict[str, int]: Number of files 'indexed', 'skipped' and 'failed'.
+
+    Example:
+        >>> index_sds_archive("/archive/SDS", num_processes=8)
+        {'indexed': 3650, 'skipped': 0, 'failed': 2}
+    """
+    if num_processes is None or num_processes <= 0:
+        num_processes = os.cpu_count()
+
+    tasks = ((entry.path, force) for entry in iter_sds_files(sds_path, search_patterns))
+
+    counts = {'indexed': 0, 'skipped': 0, 'failed': 0}
+    for path, status in tqdm(_imap_files(_index_sds_file, tasks, num_processes),
+                             desc="Indexing %s..." % sds_path):
+        if status in counts:
+            counts[status] += 1
+        else:
+            counts['failed'] += 1
+            print(f"! Could not index {path}: {status}")
+
+    print(f"Indexed {counts['indexed']} files, {counts['skipped']} already up to date, {counts['failed']} failed.")
+    return counts
 
 
 def populate_database_from_files_dumb(cursor, file_paths=[]):
@@ -265,14 +614,18 @@ def populate_database_from_files(cursor, file_paths=[]):
         cursor (sqlite3.Cursor): Database cursor for executing SQL commands
         file_paths (list, optional): List of paths to MiniSeed files. Defaults to empty list.
 
+    Returns:
+        set: (network, station, location, channel) of every span inserted, to
+            pass to DatabaseManager.mark_touched() so that they are joined later.
+
     Notes:
         - Database must have an 'archive_data' table with columns:
             * network (text)
             * station (text)
             * location (text)
             * channel (text)
-            * starttime (integer): Unix timestamp
-            * endtime (integer): Unix timestamp
+            * starttime (real): Unix timestamp
+            * endtime (real): Unix timestamp
             * importtime (integer): Unix timestamp of database insertion
         - Handles overlapping time spans by merging them into a single entry
         - Sets importtime to current Unix timestamp
@@ -286,6 +639,7 @@ def populate_database_from_files(cursor, file_paths=[]):
         >>> populate_database_from_files(cursor, files)
         >>> conn.commit()
     """
+    inserted = set()
     now = int(datetime.now().timestamp())
     for fp in file_paths:
         try:
@@ -326,7 +680,255 @@ def populate_database_from_files(cursor, file_paths=[]):
                     (network, station, location, channel, starttime, endtime, importtime)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (network, station, location, channel, start_timestamp, end_timestamp, now))
- 
+                inserted.add((network, station, location, channel))
+
+    return inserted
+
+
+def _as_epoch(value: Union[str, int, float, datetime, UTCDateTime]) -> float:
+    """Convert a single time (ISO string, timestamp, datetime or UTCDateTime) to epoch seconds."""
+    if isinstance(value, str):
+        return UTCDateTime(value).timestamp
+    return to_timestamp(value)
+
+
+def times_to_epoch(values) -> np.ndarray:
+    """
+    Convert a sequence of database times (ISO strings or numbers) to epoch seconds.
+
+    Args:
+        values: Sequence of ISO format strings or Unix timestamps.
+
+    Returns:
+        np.ndarray: float64 array of Unix timestamps.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    times = pd.to_datetime(values, utc=True, format='ISO8601')
+    return ((times - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64)
+
+
+def _merge_segments(df: pd.DataFrame, gap_tolerance: float) -> Tuple[List[Tuple], List[int]]:
+    """
+    Work out which archive_data rows to merge, using vectorized numpy operations.
+
+    Args:
+        df: archive_data rows (id, network, station, location, channel,
+            starttime, endtime, importtime), ordered by NSLC then starttime.
+        gap_tolerance: Maximum allowed gap (in seconds) to consider segments continuous.
+
+    Returns:
+        Tuple containing:
+            - List of (endtime, importtime, id) updates for the first row of
+              every segment that absorbed other rows
+            - List of ids of the absorbed rows, to delete
+    """
+    if df.empty:
+        return [], []
+
+    nslc = df[['network', 'station', 'location', 'channel']]
+    new_channel = (nslc != nslc.shift()).any(axis=1).to_numpy()
+    starts = df['starttime'].to_numpy(dtype=np.float64)
+    ends = df['endtime'].to_numpy(dtype=np.float64)
+    imports = df['importtime'].to_numpy(dtype=np.float64)
+    ids = df['id'].to_numpy()
+
+    # Latest end time seen so far within each channel
+    running_end = pd.Series(ends).groupby(np.cumsum(new_channel)).cummax().to_numpy()
+
+    # A new segment starts on a new channel, or after a gap larger than the tolerance
+    new_segment = new_channel.copy()
+    new_segment[1:] |= (starts[1:] - running_end[:-1]) > gap_tolerance
+    new_segment[0] = True
+
+    first = np.flatnonzero(new_segment)
+    counts = np.diff(np.append(first, len(df)))
+    segment_ends = np.maximum.reduceat(ends, first)
+    segment_imports = np.fmax.reduceat(imports, first)
+
+    merged = counts > 1
+    to_update = [(float(end), None if np.isnan(imp) else float(imp), int(id))
+                 for end, imp, id in zip(segment_ends[merged], segment_imports[merged], ids[first][merged])]
+    to_delete = ids[~new_segment].tolist()
+
+    return to_update, to_delete
+
+
+class AvailabilityIndex:
+    """
+    In-memory index of the data available in the archive.
+
+    Holds, for every network/station/location/channel, the time spans present
+    in archive_data as two sorted numpy arrays of merged (non-overlapping)
+    start and end times. Looking up which parts of a time window are missing
+    is then a binary search instead of an SQL query.
+
+    Attributes:
+        spans (dict): Maps (network, station, location, channel) to a tuple of
+            (starts, ends) float64 arrays of Unix timestamps.
+
+    Example:
+        >>> index = db_manager.get_availability_index()
+        >>> index.missing("IU", "ANMO", "00", "BHZ",
+        ...               UTCDateTime("2020-01-01").timestamp,
+        ...               UTCDateTime("2020-01-02").timestamp)
+        [(1577836800.0, 1577840400.0)]
+    """
+
+    def __init__(self):
+        self.spans: Dict[Tuple[str, str, str, str], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __contains__(self, nslc: Tuple[str, str, str, str]) -> bool:
+        return tuple(nslc) in self.spans
+
+    @classmethod
+    def from_rows(cls, rows) -> "AvailabilityIndex":
+        """
+        Build an index from (network, station, location, channel, starttime, endtime) rows.
+
+        Args:
+            rows: Iterable of rows, or a DataFrame with those columns. Times may
+                be ISO strings or Unix timestamps.
+        """
+        index = cls()
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(
+            list(rows), columns=['network', 'station', 'location', 'channel', 'starttime', 'endtime'])
+        if df.empty:
+            return index
+
+        df = df.assign(starttime=times_to_epoch(df['starttime']),
+                       endtime=times_to_epoch(df['endtime']))
+        for nslc, group in df.groupby(['network', 'station', 'location', 'channel'], sort=False):
+            index.set_spans(nslc, group['starttime'].to_numpy(), group['endtime'].to_numpy())
+        return index
+
+    def set_spans(self, nslc: Tuple[str, str, str, str], starts, ends):
+        """
+        Replace the spans for one channel, merging any that overlap or touch.
+
+        Args:
+            nslc: (network, station, location, channel) tuple.
+            starts: Span start times (Unix timestamps), in any order.
+            ends: Span end times (Unix timestamps).
+        """
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        if starts.size == 0:
+            self.spans.pop(tuple(nslc), None)
+            return
+
+        order = np.argsort(starts, kind='stable')
+        starts = starts[order]
+        ends = np.maximum.accumulate(ends[order])
+
+        # A new merged span begins wherever a start lies beyond all previous ends
+        new_span = np.ones(starts.size, dtype=bool)
+        new_span[1:] = starts[1:] > ends[:-1]
+        first = np.flatnonzero(new_span)
+        last = np.append(first[1:] - 1, starts.size - 1)
+
+        self.spans[tuple(nslc)] = (starts[first], ends[last])
+
+    def add(self, nslc: Tuple[str, str, str, str], starttime: float, endtime: float):
+        """Add a single span (Unix timestamps) for a channel."""
+        starts, ends = self.spans.get(tuple(nslc), (np.empty(0), np.empty(0)))
+        self.set_spans(nslc, np.append(starts, starttime), np.append(ends, endtime))
+
+    def covered(self, nslc: Tuple[str, str, str, str], t0: float, t1: float) -> List[Tuple[float, float]]:
+        """
+        Spans of a channel that overlap [t0, t1].
+
+        Returns:
+            List of (start, end) tuples of Unix timestamps, sorted by start.
+        """
+        spans = self.spans.get(tuple(nslc))
+        if spans is None:
+            return []
+        starts, ends = spans
+        i = np.searchsorted(ends, t0, side='left')   # first span ending at/after t0
+        j = np.searchsorted(starts, t1, side='right') # spans starting at/before t1
+        return list(zip(starts[i:j].tolist(), ends[i:j].tolist()))
+
+    def missing(
+        self, network: str, station: str, location: str, channel: str,
+        t0: float, t1: float, min_window: float = 0
+    ) -> List[Tuple[float, float]]:
+        """
+        Sub-intervals of [t0, t1] with no data for a channel.
+
+        Args:
+            network, station, location, channel: NSLC codes.
+            t0, t1: Window to check (Unix timestamps).
+            min_window: Gaps of this many seconds or less are ignored.
+
+        Returns:
+            List of (start, end) tuples of Unix timestamps, sorted by start.
+        """
+        gaps = []
+        current = t0
+        for span_start, span_end in self.covered((network, station, location, channel), t0, t1):
+            if current < span_start - min_window:
+                gaps.append((current, span_start))
+            current = max(current, span_end)
+        if current < t1 - min_window:
+            gaps.append((current, t1))
+        return gaps
+
+    def bulk_missing(
+        self, requests: List[Tuple[str, str, str, str, Any, Any]], min_window: float = 0
+    ) -> List[List[Tuple[float, float]]]:
+        """
+        Missing sub-intervals for a whole list of requests at once.
+
+        Args:
+            requests: List of (network, station, location, channel, starttime,
+                endtime) tuples. Times may be ISO strings or Unix timestamps.
+            min_window: Gaps of this many seconds or less are ignored.
+
+        Returns:
+            One list of (start, end) gaps per request, in the same order.
+        """
+        if not requests:
+            return []
+        t0s = times_to_epoch([req[4] for req in requests])
+        t1s = times_to_epoch([req[5] for req in requests])
+        return [self.missing(req[0], req[1], req[2], req[3], t0, t1, min_window)
+                for req, t0, t1 in zip(requests, t0s, t1s)]
+
+
+def _close_connection(conn: sqlite3.Connection):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class _ThreadConnection:
+    """
+    The pooled connection of one thread.
+
+    Only the thread's local storage holds on to it, so the connection is
+    closed as soon as the thread ends.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.pid = os.getpid()
+        # Number of nested DatabaseManager.connection() contexts using it
+        self.depth = 0
+        self._finalizer = weakref.finalize(self, _close_connection, conn)
+
+    def close(self):
+        self._finalizer()
+
+    def detach(self):
+        """Forget the connection without closing it (it belongs to another process)."""
+        self._finalizer.detach()
+
 
 class DatabaseManager:
     """
@@ -337,24 +939,130 @@ class DatabaseManager:
 
     Attributes:
         db_path (str): Path to the SQLite database file.
+        pooled (bool): Whether each thread reuses a long-lived connection.
+        touched_channels (set): (network, station, location, channel) keys
+            inserted since the last incremental join_continuous_segments().
     """
 
-    def __init__(self, db_path: str):
+    # Page cache per connection, in KiB (negative cache_size means KiB in SQLite)
+    CACHE_SIZE_KB = 64000
+
+    def __init__(self, db_path: str, pooled: bool = True):
         """Initialize DatabaseManager with database path.
 
         Args:
             db_path: Path where the SQLite database should be created/accessed.
+            pooled: If True, each thread (and process) reuses one long-lived
+                connection instead of opening a new one for every call.
         """
         self.db_path = db_path
+        self.pooled = pooled
         parent_dir = Path(db_path).parent
         parent_dir.mkdir(parents=True, exist_ok=True)
+        # Channels inserted since the last join_continuous_segments(touched_only=True)
+        self.touched_channels: set = set()
+        self._touched_lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = weakref.WeakSet()
+        self._pool_lock = threading.Lock()
         self.setup_database()
 
+    def __getstate__(self):
+        # Connections and locks can't cross process boundaries
+        state = self.__dict__.copy()
+        for key in ('_touched_lock', '_local', '_pool', '_pool_lock'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._touched_lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = weakref.WeakSet()
+        self._pool_lock = threading.Lock()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """
+        Open a new connection with WAL journaling and tuned pragmas.
+
+        WAL lets readers (e.g. the Streamlit UI) run while a download thread or
+        the SDS scanner is writing. synchronous=NORMAL is durable in WAL mode
+        apart from the last transactions on power loss.
+
+        Returns:
+            sqlite3.Connection: Database connection object.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=20, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass  # another connection holds a lock; journal mode is persistent, so it'll be set later
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{self.CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _thread_connection(self) -> _ThreadConnection:
+        """
+        Get the long-lived connection of the calling thread, opening it if needed.
+
+        Connections are never shared between threads, and are closed when their
+        thread ends. A forked child process inherits the parent's thread-local
+        state, so the pid is checked and a fresh connection is opened in the child.
+
+        Returns:
+            _ThreadConnection: The thread's connection.
+        """
+        pooled = getattr(self._local, 'pooled', None)
+        if pooled is None or pooled.pid != os.getpid():
+            if pooled is not None:
+                pooled.detach()
+            pooled = _ThreadConnection(self._open_connection())
+            self._local.pooled = pooled
+            with self._pool_lock:
+                self._pool.add(pooled)
+        return pooled
+
+    def _pooled_connection(self) -> sqlite3.Connection:
+        """The long-lived connection of the calling thread, see _thread_connection()."""
+        return self._thread_connection().conn
+
+    def mark_touched(self, channels):
+        """
+        Record channels whose archive_data rows changed outside bulk_insert_archive_data(),
+        so that the next join_continuous_segments(touched_only=True) merges them.
+
+        Args:
+            channels: (network, station, location, channel) tuples.
+        """
+        with self._touched_lock:
+            self.touched_channels.update(tuple(c[0:4]) for c in channels)
+
+    def close(self):
+        """
+        Close all pooled connections opened by this DatabaseManager.
+
+        Connections of threads that have ended are already closed. Call this
+        once the manager is no longer used; it can still be used afterwards,
+        new connections are simply opened.
+        """
+        with self._pool_lock:
+            pooled, self._pool = list(self._pool), weakref.WeakSet()
+        for conn in pooled:
+            if conn.pid == os.getpid():
+                conn.close()
+        self._local = threading.local()
+
     @contextlib.contextmanager
     def connection(self, max_retries: int = 3, initial_delay: float = 1):
         """
         Context manager for database connections with retry mechanism.
 
+        With pooling enabled the calling thread's long-lived connection is
+        reused: the transaction is committed on success and rolled back on
+        error, but the connection stays open. Nested contexts of a thread share
+        the outermost one's transaction, only the outermost commits or rolls back.
+
         Args:
             max_retries: Maximum number of connection retry attempts.
             initial_delay: Initial delay between retries in seconds.
@@ -365,12 +1073,29 @@ class DatabaseManager:
         Raises:
             sqlite3.OperationalError: If database connection fails after all retries.
         """
+        if self.pooled:
+            pooled = self._thread_connection()
+            if pooled.depth > 0:
+                pooled.depth += 1
+                try:
+                    yield pooled.conn
+                finally:
+                    pooled.depth -= 1
+                return
+
         retry_count = 0
         delay = initial_delay
         
         while retry_count < max_retries:
+            conn = None
+            pooled = None
             try:
-                conn = sqlite3.connect(self.db_path, timeout=20)
+                if self.pooled:
+                    pooled = self._thread_connection()
+                    pooled.depth = 1
+                    conn = pooled.conn
+                else:
+                    conn = self._open_connection()
                 yield conn
                 conn.commit()
                 return
@@ -387,14 +1112,27 @@ class DatabaseManager:
                 else:
                     raise
             finally:
-                if 'conn' in locals():
-                    conn.close()
+                if pooled is not None:
+                    pooled.depth = 0
+                if conn is not None:
+                    if not self.pooled:
+                        conn.close()
+                    elif conn.in_transaction:
+                        conn.rollback()
+
+    # Schema version stored in PRAGMA user_version
+    # 0: archive_data times stored as ISO TEXT
+    # 1: archive_data times stored as REAL epoch seconds
+    SCHEMA_VERSION = 1
 
     def setup_database(self):
         """
         Initialize database schema with required tables and indices."""
         with self.connection() as conn:
             cursor = conn.cursor()
+
+            # Bring older databases up to date first
+            self._migrate_schema(conn)
             
             # Create archive_data table
             cursor.execute('''
@@ -404,18 +1142,57 @@ class DatabaseManager:
                     station TEXT,
                     location TEXT,
                     channel TEXT,
-                    starttime TEXT,
-                    endtime TEXT,
+                    starttime REAL,
+                    endtime REAL,
                     importtime REAL
                 )
             ''')
             
-            # Create index for archive_data
+            # Create index for archive_data (covers NSLC + time range queries)
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_archive_data 
-                ON archive_data (network, station, location, channel, starttime, endtime, importtime)
+                ON archive_data (network, station, location, channel, starttime, endtime)
             ''')
-            
+
+            # ISO formatted times, for backwards compatibility / readability
+            cursor.execute('''
+                CREATE VIEW IF NOT EXISTS archive_data_iso AS
+                SELECT id, network, station, location, channel,
+                    strftime('%Y-%m-%dT%H:%M:%f', starttime, 'unixepoch') AS starttime,
+                    strftime('%Y-%m-%dT%H:%M:%f', endtime, 'unixepoch') AS endtime,
+                    importtime
+                FROM archive_data
+            ''')
+
+            # Files of the SDS archive as of the last sync, and the spans read from them
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS file_manifest (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime REAL,
+                    inode INTEGER,
+                    scantime REAL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS file_segments (
+                    path TEXT,
+                    network TEXT,
+                    station TEXT,
+                    location TEXT,
+                    channel TEXT,
+                    starttime REAL,
+                    endtime REAL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_file_segments_path ON file_segments (path)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_file_segments_nslc
+                ON file_segments (network, station, location, channel, starttime)
+            ''')
+
             # Create arrival_data table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS arrival_data (
@@ -443,6 +1220,80 @@ class DatabaseManager:
                 )
             ''')
 
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _migrate_schema(self, conn: sqlite3.Connection):
+        """
+        Upgrade a database created by an older version of SEED-vault.
+
+        Version 0 databases stored archive_data start/end times as ISO text,
+        which can only be compared lexically. These are converted in place to
+        REAL epoch seconds and the index is rebuilt. Runs in one transaction,
+        so an interrupted migration leaves the old table untouched.
+
+        Args:
+            conn: Open database connection.
+        """
+        cursor = conn.cursor()
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION:
+            return
+
+        columns = {row[1]: row[2].upper() for row in cursor.execute("PRAGMA table_info(archive_data)")}
+        if columns.get('starttime') != 'TEXT':
+            return  # new database, or already numeric
+
+        conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Someone else may have got here first
+            columns = {row[1]: row[2].upper() for row in cursor.execute("PRAGMA table_info(archive_data)")}
+            if columns.get('starttime') != 'TEXT':
+                conn.commit()
+                return
+
+            print("Upgrading database: converting archive_data times to epoch seconds...")
+            cursor.execute("DROP VIEW IF EXISTS archive_data_iso")
+            cursor.execute('''
+                CREATE TABLE archive_data_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    network TEXT,
+                    station TEXT,
+                    location TEXT,
+                    channel TEXT,
+                    starttime REAL,
+                    endtime REAL,
+                    importtime REAL
+                )
+            ''')
+
+            select = cursor.execute('''
+                SELECT id, network, station, location, channel, starttime, endtime, importtime
+                FROM archive_data
+            ''')
+            insert = conn.cursor()
+            num_rows = 0
+            while True:
+                rows = select.fetchmany(100000)
+                if not rows:
+                    break
+                starts = times_to_epoch([row[5] for row in rows])
+                ends = times_to_epoch([row[6] for row in rows])
+                insert.executemany('''
+                    INSERT INTO archive_data_new
+                    (id, network, station, location, channel, starttime, endtime, importtime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [row[0:5] + (float(t0), float(t1), row[7])
+                      for row, t0, t1 in zip(rows, starts, ends)])
+                num_rows += len(rows)
+
+            cursor.execute("DROP TABLE archive_data")
+            cursor.execute("ALTER TABLE archive_data_new RENAME TO archive_data")
+            conn.commit()
+            print(f"Converted {num_rows} rows.")
+        except Exception:
+            conn.rollback()
+            raise
+
     def display_contents(
         self, table_name: str, start_time: Union[int, float, datetime, UTCDateTime] = 0,
         end_time: Union[int, float, datetime, UTCDateTime] = 4102444799, limit: int = 100):
@@ -488,6 +1339,43 @@ class DatabaseManager:
             
             print(f"\nTotal rows: {len(results)}")
 
+    def get_availability_index(
+        self,
+        networks: Optional[List[str]] = None,
+        starttime: Optional[float] = None,
+        endtime: Optional[float] = None
+    ) -> AvailabilityIndex:
+        """
+        Load archive_data into an AvailabilityIndex with a single query.
+
+        Args:
+            networks: Optional list of network codes to restrict the index to.
+            starttime: Optional Unix timestamp; only spans ending at or after it are loaded.
+            endtime: Optional Unix timestamp; only spans starting at or before it are loaded.
+
+        Returns:
+            AvailabilityIndex: Index of all archived spans.
+        """
+        query = "SELECT network, station, location, channel, starttime, endtime FROM archive_data"
+        conditions = []
+        params = []
+        if networks:
+            networks = sorted(set(networks))
+            conditions.append(f"network IN ({', '.join('?' for _ in networks)})")
+            params.extend(networks)
+        if starttime is not None:
+            conditions.append("endtime >= ?")
+            params.append(starttime)
+        if endtime is not None:
+            conditions.append("starttime <= ?")
+            params.append(endtime)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        with self.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        return AvailabilityIndex.from_rows(df)
+
     def reindex_archive_data(self):
         """Rebuild the index on archive_data table."""
         with self.connection() as conn:
@@ -544,56 +1432,61 @@ class DatabaseManager:
             cursor.execute(query, (start_timestamp, end_timestamp))
             return cursor.rowcount
 
-    def join_continuous_segments(self, gap_tolerance: float = 30):
+    def join_continuous_segments(self, gap_tolerance: float = 30, touched_only: bool = False):
         """
         Join continuous data segments in the database.
 
+        Segments are merged with vectorized numpy operations over the start and
+        end times, rather than row by row.
+
         Args:
             gap_tolerance: Maximum allowed gap (in seconds) to consider segments continuous.
+            touched_only: If True, only re-merge the channels inserted through
+                bulk_insert_archive_data() since the last join (see touched_channels),
+                instead of the whole archive_data table. Channels are only
+                forgotten once their join is committed.
         """
+        with self._touched_lock:
+            touched = set(self.touched_channels)
+
+        if touched_only and not touched:
+            print("\nDatabase cleaned. Deleted 0 rows, updated 0 rows.")
+            return
+
         with self.connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, network, station, location, channel, starttime, endtime, importtime
-                FROM archive_data
-                ORDER BY network, station, location, channel, starttime
-            ''')
-            
-            all_data = cursor.fetchall()
-            to_delete = []
-            to_update = []
-            current_segment = None
-            
-            for row in all_data:
-                id, network, station, location, channel, starttime, endtime, importtime = row
-                starttime = UTCDateTime(starttime)
-                endtime = UTCDateTime(endtime)
-                
-                if current_segment is None:
-                    current_segment = list(row)
-                else:
-                    if (network == current_segment[1] and
-                        station == current_segment[2] and
-                        location == current_segment[3] and
-                        channel == current_segment[4] and
-                        starttime - UTCDateTime(current_segment[6]) <= gap_tolerance):
-                        
-                        current_segment[6] = max(endtime, UTCDateTime(current_segment[6])).isoformat()
-                        current_segment[7] = max(importtime, current_segment[7]) if importtime and current_segment[7] else None
-                        to_delete.append(id)
-                    else:
-                        to_update.append(tuple(current_segment))
-                        current_segment = list(row)
-            
-            if current_segment:
-                to_update.append(tuple(current_segment))
-            
+
+            if touched_only:
+                cursor.execute('''
+                    CREATE TEMP TABLE IF NOT EXISTS touched_channels (
+                        network TEXT, station TEXT, location TEXT, channel TEXT)
+                ''')
+                cursor.execute("DELETE FROM touched_channels")
+                cursor.executemany("INSERT INTO touched_channels VALUES (?, ?, ?, ?)", list(touched))
+                query = '''
+                    SELECT a.id, a.network, a.station, a.location, a.channel,
+                        a.starttime, a.endtime, a.importtime
+                    FROM touched_channels t
+                    JOIN archive_data a
+                    ON a.network = t.network AND a.station = t.station
+                        AND a.location = t.location AND a.channel = t.channel
+                    ORDER BY a.network, a.station, a.location, a.channel, a.starttime
+                '''
+            else:
+                query = '''
+                    SELECT id, network, station, location, channel, starttime, endtime, importtime
+                    FROM archive_data
+                    ORDER BY network, station, location, channel, starttime
+                '''
+
+            df = pd.read_sql_query(query, conn)
+            to_update, to_delete = _merge_segments(df, gap_tolerance)
+
             cursor.executemany('''
                 UPDATE archive_data
                 SET endtime = ?, importtime = ?
                 WHERE id = ?
-            ''', [(row[6], row[7], row[0]) for row in to_update])
+            ''', to_update)
             
             if to_delete:
                 for i in range(0, len(to_delete), 500):
@@ -603,6 +1496,14 @@ class DatabaseManager:
                         [(id,) for id in chunk]
                     )
 
+            if touched_only:
+                cursor.execute("DROP TABLE IF EXISTS temp.touched_channels")
+
+        if touched_only:
+            # Channels inserted while joining stay pending
+            with self._touched_lock:
+                self.touched_channels -= touched
+
         print(f"\nDatabase cleaned. Deleted {len(to_delete)} rows, updated {len(to_update)} rows.")
 
     def execute_query(self, query: str) -> Tuple[bool, str, Optional[pd.DataFrame]]:
@@ -643,7 +1544,9 @@ class DatabaseManager:
         Insert multiple archive data records.
 
         Args:
-            archive_list: List of tuples containing archive data records.
+            archive_list: List of (network, station, location, channel, starttime,
+                endtime) tuples. Times may be Unix timestamps or ISO strings, and
+                are stored as epoch seconds.
 
         Returns:
             int: Number of inserted records.
@@ -654,7 +1557,9 @@ class DatabaseManager:
         with self.connection() as conn:
             cursor = conn.cursor()
             now = int(datetime.now().timestamp())
-            archive_list = [tuple(list(ele) + [now]) for ele in archive_list if ele is not None]
+            archive_list = [tuple(ele[0:4]) + (_as_epoch(ele[4]), _as_epoch(ele[5]), now)
+                            for ele in archive_list if ele is not None]
+            self.mark_touched(archive_list)
             
             cursor.executemany('''
                 INSERT OR REPLACE INTO archive_data
@@ -664,6 +1569,157 @@ class DatabaseManager:
             
             return cursor.rowcount
 
+    def get_file_manifest(self, directory: Optional[str] = None) -> Dict[str, Tuple[int, float, int]]:
+        """
+        Files recorded by the last sync of the SDS archive.
+
+        Args:
+            directory: Only return the files directly in this directory
+                (relative to the SDS root), e.g. "2020/IU/ANMO/BHZ.D".
+
+        Returns:
+            Dict mapping each path (relative to the SDS root) to its
+            (size, mtime, inode) when it was last read.
+        """
+        query = "SELECT path, size, mtime, inode FROM file_manifest"
+        params = ()
+        if directory is not None:
+            # Range over the primary key, so only this directory is looked at
+            prefix = os.path.join(directory, '')
+            query += " WHERE path >= ? AND path < ?"
+            params = (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        with self.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows
+                if directory is None or os.path.dirname(row[0]) == directory}
+
+    def iter_file_manifest_paths(self, batch_size: int = 5000):
+        """
+        Paths of the file manifest, in sorted batches.
+
+        Every batch is a query of its own, so the manifest is never loaded
+        whole and the paths of a batch may be removed before the next one.
+
+        Args:
+            batch_size: Most paths per batch.
+
+        Yields:
+            Lists of paths relative to the SDS root.
+        """
+        last = ''
+        while True:
+            with self.connection() as conn:
+                paths = [row[0] for row in conn.execute(
+                    "SELECT path FROM file_manifest WHERE path > ? ORDER BY path LIMIT ?",
+                    (last, batch_size))]
+            if not paths:
+                return
+            yield paths
+            last = paths[-1]
+
+    def get_file_segments(self, paths: List[str]) -> Dict[str, List[Tuple]]:
+        """
+        Spans recorded for files of the manifest.
+
+        Args:
+            paths: Paths relative to the SDS root.
+
+        Returns:
+            Dict mapping each path with spans to a list of
+            (network, station, location, channel, starttime, endtime) tuples.
+        """
+        segments = defaultdict(list)
+        with self.connection() as conn:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                rows = conn.execute(f'''
+                    SELECT path, network, station, location, channel, starttime, endtime
+                    FROM file_segments WHERE path IN ({','.join('?' * len(chunk))})
+                ''', chunk).fetchall()
+                for row in rows:
+                    segments[row[0]].append(tuple(row[1:]))
+        return dict(segments)
+
+    def update_file_manifest(self, files: List[Tuple[str, int, float, int, List[Tuple]]],
+                             removed: List[str] = []):
+        """
+        Record the files of a sync and the spans read from them.
+
+        Args:
+            files: (path, size, mtime, inode, elements) of each file read, with
+                elements as returned by miniseed_to_db_elements(). Replaces
+                what was recorded for these paths before.
+            removed: Paths of files that no longer exist.
+        """
+        now = int(datetime.now().timestamp())
+        paths = [(f[0],) for f in files] + [(path,) for path in removed]
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("DELETE FROM file_manifest WHERE path = ?", paths)
+            cursor.executemany("DELETE FROM file_segments WHERE path = ?", paths)
+            cursor.executemany('''
+                INSERT INTO file_manifest (path, size, mtime, inode, scantime)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [f[0:4] + (now,) for f in files])
+            cursor.executemany('''
+                INSERT INTO file_segments
+                (path, network, station, location, channel, starttime, endtime)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(f[0],) + tuple(ele[0:4]) + (_as_epoch(ele[4]), _as_epoch(ele[5]))
+                  for f in files for ele in f[4]])
+
+    def rebuild_archive_windows(self, windows: List[Tuple[str, str, str, str, float, float]]) -> int:
+        """
+        Replace archive_data within time windows by the spans of the file manifest.
+
+        Used when files were changed or removed: rows overlapping a window are
+        cut back to the window edges, then the spans of all manifest files of
+        that channel overlapping the window are inserted again. Run
+        join_continuous_segments(touched_only=True) afterwards.
+
+        Args:
+            windows: (network, station, location, channel, starttime, endtime)
+                of each time window to rebuild.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        now = int(datetime.now().timestamp())
+        num_inserted = 0
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for net, sta, loc, cha, t0, t1 in windows:
+                nslc = (net, sta, loc, cha)
+                rows = cursor.execute('''
+                    SELECT id, starttime, endtime FROM archive_data
+                    WHERE network = ? AND station = ? AND location = ? AND channel = ?
+                    AND starttime <= ? AND endtime >= ?
+                ''', nslc + (t1, t0)).fetchall()
+                to_insert = []
+                for _, start, end in rows:
+                    if start < t0:
+                        to_insert.append(nslc + (start, t0, now))
+                    if end > t1:
+                        to_insert.append(nslc + (t1, end, now))
+                cursor.executemany("DELETE FROM archive_data WHERE id = ?",
+                                   [(row[0],) for row in rows])
+                to_insert.extend(
+                    row + (now,) for row in cursor.execute('''
+                        SELECT network, station, location, channel, starttime, endtime
+                        FROM file_segments
+                        WHERE network = ? AND station = ? AND location = ? AND channel = ?
+                        AND starttime <= ? AND endtime >= ?
+                    ''', nslc + (t1, t0)).fetchall())
+                cursor.executemany('''
+                    INSERT INTO archive_data
+                    (network, station, location, channel, starttime, endtime, importtime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', to_insert)
+                num_inserted += len(to_insert)
+
+        self.mark_touched(windows)
+        return num_inserted
+
     def bulk_insert_arrival_data(self, arrival_list: List[Tuple]) -> int:
         """
         Insert multiple arrival data records.
@@ -709,13 +1765,13 @@ class DatabaseManager:
             station (str): Station code
             location (str): Location code
             channel (str): Channel code
-            start/endtime (str): Time in iso
+            start/endtime (str): Time in iso (or Unix timestamp)
         
         Returns:
             bool: True if data exists for the specified parameters, False otherwise
         """
-
-        time_point = datetime.fromisoformat(starttime) + timedelta(seconds=5) # just 5 seconds in is fine
+        starttime = _as_epoch(starttime)
+        endtime = _as_epoch(endtime)
         
         # Use the connection context manager from the DatabaseManager
         with self.connection() as conn:
@@ -737,6 +1793,42 @@ class DatabaseManager:
             
             return count > 0        
 
+    def check_data_existence_bulk(
+        self, channels: List[Tuple[str, str, str, str]],
+        windows: List[Tuple[Any, Any]]) -> List[bool]:
+        """
+        check_data_existence() for many channels and time windows, in one query.
+
+        Args:
+            channels: (network, station, location, channel) codes to look for.
+            windows: (starttime, endtime) pairs, in iso (or Unix timestamp).
+
+        Returns:
+            List[bool]: For each window, True if a single db element of any
+                of the channels spans all of it.
+        """
+        channels = set(map(tuple, channels))
+        if not channels or not windows:
+            return [False] * len(windows)
+
+        starttimes = np.array([_as_epoch(w[0]) for w in windows], dtype=np.float64)
+        endtimes = np.array([_as_epoch(w[1]) for w in windows], dtype=np.float64)
+        networks = sorted({c[0] for c in channels})
+
+        query = f"""
+            SELECT network, station, location, channel, starttime, endtime FROM archive_data
+            WHERE network IN ({', '.join('?' for _ in networks)})
+            AND starttime <= ?
+            AND endtime >= ?
+        """
+        with self.connection() as conn:
+            rows = conn.execute(query, networks + [float(starttimes.max()), float(endtimes.min())]).fetchall()
+
+        spans = np.array([row[4:6] for row in rows if tuple(row[0:4]) in channels],
+                         dtype=np.float64).reshape(-1, 2)
+        return [bool(np.any((spans[:, 0] <= t0) & (spans[:, 1] >= t1)))
+                for t0, t1 in zip(starttimes, endtimes)]
+
     def get_arrival_data(
     self, resource_id: str, netcode: str, stacode: str
     ) -> Optional[Dict[str, Any]]:
@@ -839,6 +1931,50 @@ class DatabaseManager:
                 return (result[0], result[1])
         return None
 
+    def fetch_arrivals_distances_bulk(
+        self, resource_ids: Union[str, List[str]]
+    ) -> Dict[str, Any]:
+        """
+        Retrieve all cached arrival times and distance metrics for one or more events.
+
+        Loads everything in a single query, instead of one
+        fetch_arrivals_distances() call per station.
+
+        Args:
+            resource_ids: Unique identifier of a seismic event, or a list of them.
+
+        Returns:
+            Dict[str, Any]: For a single resource_id, a dictionary mapping "net.sta"
+                to a (p_arrival, s_arrival, dist_km, dist_deg, azimuth) tuple, as
+                returned by fetch_arrivals_distances(). For a list, a dictionary
+                mapping each resource_id to such a dictionary (empty if nothing
+                is cached for that event).
+
+        Example:
+            >>> cached = db_manager.fetch_arrivals_distances_bulk(str(eq.preferred_origin_id))
+            >>> p_time, s_time, dist_km, dist_deg, azi = cached["IU.ANMO"]
+        """
+        single = isinstance(resource_ids, str)
+        ids = [resource_ids] if single else list(dict.fromkeys(resource_ids))
+        arrivals = {rid: {} for rid in ids}
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                cursor.execute(f'''
+                    SELECT resource_id, s_netcode, s_stacode,
+                        p_arrival, s_arrival, dist_km, dist_deg, azimuth
+                    FROM arrival_data
+                    WHERE resource_id IN ({','.join('?' * len(chunk))})
+                    ORDER BY s_start
+                ''', chunk)
+                for row in cursor.fetchall():
+                    # keep the first entry per station, like fetch_arrivals_distances
+                    arrivals[row[0]].setdefault(f"{row[1]}.{row[2]}", tuple(row[3:]))
+
+        return arrivals[resource_ids] if single else arrivals
+
     def fetch_arrivals_distances(
     self, resource_id: str, netcode: str, stacode: str
     ) -> Optional[Tuple[float, float, float, float, float]]:    
@@ -0,0 +1,589 @@
+"""
+Minimal miniSEED (v2) record handling without decoding any data.
+
+Used to route downloaded records straight into SDS day files and to describe
+them in the database without building ObsPy Streams, and to decode only the
+records of a file that a time window needs. Record headers of an SDS day file
+can also be kept in a small sidecar index next to it, so they needn't be
+scanned again.
+"""
+
+import io
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from obspy import Stream, UTCDateTime
+from obspy.core.stream import read as streamread
+
+
+FIXED_HEADER_SIZE = 48
+
+# Seconds from 1970-01-01 to January 1st of each year, filled on demand
+_year_starts = {}
+
+
+class RecordHeader(NamedTuple):
+    """The parts of a miniSEED record header needed to archive it."""
+    network: str
+    station: str
+    location: str
+    channel: str
+    year: int
+    doy: int
+    starttime: float  # Unix timestamp, time correction applied
+    nsamples: int
+    sample_rate: float
+    record_length: int
+
+    @property
+    def endtime(self) -> float:
+        """Time of the last sample (as in ObsPy's Trace.stats.endtime)."""
+        if self.sample_rate <= 0 or self.nsamples == 0:
+            return self.starttime
+        return self.starttime + (self.nsamples - 1) / self.sample_rate
+
+
+def _year_start(year: int) -> float:
+    start = _year_starts.get(year)
+    if start is None:
+        start = datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+        _year_starts[year] = start
+    return start
+
+
+def _sample_rate(factor: int, multiplier: int) -> float:
+    if factor == 0 or multiplier == 0:
+        return 0.0
+    if factor > 0 and multiplier > 0:
+        return float(factor * multiplier)
+    if factor > 0 and multiplier < 0:
+        return -factor / multiplier
+    if factor < 0 and multiplier > 0:
+        return -multiplier / factor
+    return 1.0 / (factor * multiplier)
+
+
+def parse_record_header(buf, offset: int = 0) -> RecordHeader:
+    """
+    Parse the fixed header and blockette 1000 of a miniSEED record.
+
+    Args:
+        buf: bytes, bytearray or memoryview holding the record.
+        offset: Position of the record in buf.
+
+    Returns:
+        RecordHeader of the record.
+
+    Raises:
+        ValueError: If buf doesn't hold a complete header at offset, or the
+            record has no blockette 1000 (so its length is unknown).
+    """
+    if len(buf) - offset < FIXED_HEADER_SIZE:
+        raise ValueError("Incomplete miniSEED header")
+
+    # Byte order: the year must be plausible
+    year = struct.unpack_from('>H', buf, offset + 20)[0]
+    order = '>' if 1900 <= year <= 2100 else '<'
+
+    (year, doy, hour, minute, second, _, frac, nsamples, factor, multiplier,
+     activity, _, _, num_blockettes, correction, _, blockette_offset) = \
+        struct.unpack_from(order + 'HHBBBBHHhhBBBBiHH', buf, offset + 20)
+
+    if not (1900 <= year <= 2100 and 1 <= doy <= 366):
+        raise ValueError("Not a miniSEED record")
+
+    # Find blockette 1000 for the record length
+    record_length = None
+    for _ in range(num_blockettes):
+        if not blockette_offset or len(buf) - offset < blockette_offset + 8:
+            break
+        b_type, b_next = struct.unpack_from(order + 'HH', buf, offset + blockette_offset)
+        if b_type == 1000:
+            record_length = 2 ** buf[offset + blockette_offset + 6]
+            break
+        blockette_offset = b_next
+    if record_length is None:
+        raise ValueError("miniSEED record without blockette 1000")
+
+    starttime = (_year_start(year) + (doy - 1) * 86400 + hour * 3600 +
+                 minute * 60 + second + frac * 0.0001)
+    # Apply the time correction unless the header says it already was
+    if not activity & 0x02:
+        starttime += correction * 0.0001
+
+    codes = bytes(buf[offset + 8:offset + 20]).decode('ascii', errors='replace')
+    return RecordHeader(
+        network=codes[10:12].strip(),
+        station=codes[0:5].strip(),
+        location=codes[5:7].strip(),
+        channel=codes[7:10].strip(),
+        year=year,
+        doy=doy,
+        starttime=starttime,
+        nsamples=nsamples,
+        sample_rate=_sample_rate(factor, multiplier),
+        record_length=record_length,
+    )
+
+
+def iter_records(buf) -> Iterator[Tuple[int, RecordHeader]]:
+    """
+    Iterate over the complete records in a buffer.
+
+    Args:
+        buf: bytes, bytearray or memoryview holding concatenated records.
+
+    Yields:
+        (offset, header) of each complete record. Stops at the first
+        incomplete record, whose offset can be found from the last one.
+
+    Raises:
+        ValueError: If data that isn't miniSEED is encountered.
+    """
+    offset = 0
+    while len(buf) - offset >= FIXED_HEADER_SIZE:
+        try:
+            header = parse_record_header(buf, offset)
+        except ValueError:
+            if len(buf) - offset < 4096:
+                return  # blockettes may still be on their way
+            raise
+        if len(buf) - offset < header.record_length:
+            return
+        yield offset, header
+        offset += header.record_length
+
+
+class RecordArrays(NamedTuple):
+    """Headers of all records of a buffer, one array element per record."""
+    offsets: np.ndarray       # int64, position of each record
+    codes: np.ndarray         # 'S12' raw station/location/channel/network field
+    starttimes: np.ndarray    # float64 Unix timestamps, time correction applied
+    endtimes: np.ndarray      # float64, time of the last sample
+    nsamples: np.ndarray      # int64
+    sample_rates: np.ndarray  # float64
+    record_length: int        # 0 if records differ in length
+
+
+def _header_dtype(order: str, record_length: int) -> np.dtype:
+    """Fixed header fields of records of a fixed length, as a numpy dtype."""
+    return np.dtype({
+        'names': ['codes', 'year', 'doy', 'hour', 'minute', 'second', 'frac',
+                  'nsamples', 'factor', 'multiplier', 'activity', 'correction',
+                  'blockette_offset'],
+        'formats': ['S12', order + 'u2', order + 'u2', 'u1', 'u1', 'u1', order + 'u2',
+                    order + 'u2', order + 'i2', order + 'i2', 'u1', order + 'i4',
+                    order + 'u2'],
+        'offsets': [8, 20, 22, 24, 25, 26, 28, 30, 32, 34, 36, 40, 46],
+        'itemsize': record_length,
+    })
+
+
+def _sample_rates(factor: np.ndarray, multiplier: np.ndarray) -> np.ndarray:
+    """Vectorized _sample_rate()."""
+    f = factor.astype(np.float64)
+    m = multiplier.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.select(
+            [(f == 0) | (m == 0), (f > 0) & (m > 0), (f > 0) & (m < 0), (f < 0) & (m > 0)],
+            [0.0, f * m, -f / m, -m / f],
+            1.0 / (f * m))
+    return rates
+
+
+def scan_records(buf) -> RecordArrays:
+    """
+    Read the headers of all records in a buffer at once.
+
+    Records are viewed in place with numpy.frombuffer, so only the fixed
+    header fields are touched. This needs all records to have the length,
+    byte order and blockette 1000 position of the first one, as is the case
+    for files written by SEED-vault, ObsPy or SeisComP. Other buffers are
+    parsed record by record with iter_records().
+
+    Args:
+        buf: bytes, bytearray, memoryview or mmap holding concatenated records.
+
+    Returns:
+        RecordArrays of the complete records in buf.
+
+    Raises:
+        ValueError: If data that isn't miniSEED is encountered.
+
+    Example:
+        >>> with open("IU.ANMO.00.BHZ.D.2020.001", "rb") as f:
+        ...     records = scan_records(f.read())
+        >>> records.starttimes[0], records.endtimes[-1]
+    """
+    if len(buf) < FIXED_HEADER_SIZE:
+        return _records_from_headers([], 0)
+    first = parse_record_header(buf, 0)
+    record_length = first.record_length
+    count = len(buf) // record_length
+    year = struct.unpack_from('>H', buf, 20)[0]
+    order = '>' if 1900 <= year <= 2100 else '<'
+
+    headers = b1000 = years = None
+    try:
+        headers = np.frombuffer(buf, dtype=_header_dtype(order, record_length), count=count)
+        blockette_offset = int(headers['blockette_offset'][0])
+        b1000 = np.frombuffer(buf, dtype=np.dtype({
+            'names': ['type', 'exponent'],
+            'formats': [order + 'u2', 'u1'],
+            'offsets': [blockette_offset, blockette_offset + 6],
+            'itemsize': record_length}), count=count)
+        years = headers['year']
+        uniform = (len(buf) % record_length == 0 and
+                   np.all(headers['blockette_offset'] == blockette_offset) and
+                   np.all(b1000['type'] == 1000) and
+                   np.all(b1000['exponent'] == b1000['exponent'][0]) and
+                   np.all((years >= 1900) & (years <= 2100)))
+        if not uniform:
+            return _records_from_headers(list(iter_records(buf)), 0)
+
+        # Times in integer nanoseconds, like ObsPy's UTCDateTime
+        unique_years, year_index = np.unique(years, return_inverse=True)
+        year_starts = np.array([round(_year_start(int(y))) for y in unique_years], dtype=np.int64)
+        seconds = ((headers['doy'].astype(np.int64) - 1) * 86400 +
+                   headers['hour'].astype(np.int64) * 3600 +
+                   headers['minute'].astype(np.int64) * 60 + headers['second'])
+        start_ns = ((year_starts[year_index] + seconds) * 10**9 +
+                    headers['frac'].astype(np.int64) * 100000)
+        # Apply the time correction unless the header says it already was
+        correct = (headers['activity'] & 0x02) == 0
+        start_ns += np.where(correct, headers['correction'].astype(np.int64) * 100000, 0)
+
+        nsamples = headers['nsamples'].astype(np.int64)
+        sample_rates = _sample_rates(headers['factor'], headers['multiplier'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            duration_ns = np.where((sample_rates > 0) & (nsamples > 0),
+                                   np.round((nsamples - 1) * (1.0 / sample_rates) * 1e9), 0)
+        starttimes = start_ns / 1e9
+        endtimes = (start_ns + duration_ns.astype(np.int64)) / 1e9
+        return RecordArrays(
+            offsets=np.arange(count, dtype=np.int64) * record_length,
+            codes=headers['codes'].copy(),
+            starttimes=starttimes,
+            endtimes=endtimes,
+            nsamples=nsamples,
+            sample_rates=sample_rates,
+            record_length=record_length,
+        )
+    finally:
+        # Views must be gone before an mmap can be closed, even after an error
+        headers = b1000 = years = None
+
+
+def _records_from_headers(records: List[Tuple[int, RecordHeader]], record_length: int) -> RecordArrays:
+    """RecordArrays from the output of iter_records()."""
+    codes = [(f"{h.station:<5}{h.location:<2}{h.channel:<3}{h.network:<2}").encode('ascii')
+             for _, h in records]
+    return RecordArrays(
+        offsets=np.array([offset for offset, _ in records], dtype=np.int64),
+        codes=np.array(codes, dtype='S12'),
+        starttimes=np.array([h.starttime for _, h in records], dtype=np.float64),
+        endtimes=np.array([h.endtime for _, h in records], dtype=np.float64),
+        nsamples=np.array([h.nsamples for _, h in records], dtype=np.int64),
+        sample_rates=np.array([h.sample_rate for _, h in records], dtype=np.float64),
+        record_length=record_length,
+    )
+
+
+def _split_codes(raw: bytes) -> Tuple[str, str, str, str]:
+    codes = raw.decode('ascii', errors='replace').ljust(12)
+    return (codes[10:12].strip(), codes[0:5].strip(), codes[5:7].strip(), codes[7:10].strip())
+
+
+def records_to_segments(records: RecordArrays) -> List[Tuple[str, str, str, str, float, float]]:
+    """
+    Merge record time spans into continuous segments per channel.
+
+    Records are joined like ObsPy joins them into traces (the next record
+    starts within half a sample of where one sample after the last one would
+    be), and overlapping spans are joined too, as in stream_to_db_elements().
+
+    Args:
+        records: Record headers, as returned by scan_records().
+
+    Returns:
+        List of (network, station, location, channel, starttime, endtime)
+        tuples with Unix timestamps, sorted by channel and time.
+    """
+    segments = []
+    has_data = (records.nsamples > 0) & (records.sample_rates > 0)
+    for raw in np.unique(records.codes[has_data]):
+        mask = has_data & (records.codes == raw)
+        order = np.argsort(records.starttimes[mask], kind='stable')
+        starts = records.starttimes[mask][order]
+        ends = records.endtimes[mask][order]
+        delta = 1.0 / records.sample_rates[mask][order]
+
+        reach = np.maximum.accumulate(ends)
+        prev_reach = reach[:-1]
+        joined = ((starts[1:] <= prev_reach) |
+                  (np.abs(starts[1:] - (prev_reach + delta[1:])) <= 0.5 * delta[1:]))
+        first = np.flatnonzero(np.concatenate(([True], ~joined)))
+        last = np.append(first[1:] - 1, len(starts) - 1)
+
+        nslc = _split_codes(bytes(raw))
+        segments.extend(nslc + (float(t0), float(t1))
+                        for t0, t1 in zip(starts[first], reach[last]))
+    return segments
+
+
+def read_segments(path: str) -> List[Tuple[str, str, str, str, float, float]]:
+    """
+    Continuous segments of a miniSEED file, reading only record headers.
+
+    Taken from the file's sidecar record index if it has an up to date one
+    (see write_record_index). Otherwise the file is memory mapped, so only the
+    pages holding headers are read.
+
+    Args:
+        path: Path to a miniSEED file.
+
+    Returns:
+        List of (network, station, location, channel, starttime, endtime)
+        tuples with Unix timestamps. Empty for an empty file.
+
+    Raises:
+        ValueError: If the file isn't miniSEED 2 with blockette 1000.
+        OSError: If the file can't be read.
+
+    Example:
+        >>> read_segments("/archive/SDS/2020/IU/ANMO/BHZ.D/IU.ANMO.00.BHZ.D.2020.001")
+        [('IU', 'ANMO', '00', 'BHZ', 1577836800.0, 1577923199.975)]
+    """
+    sidecar = load_record_index(path)
+    if sidecar is not None:
+        return sidecar[1]
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return records_to_segments(scan_records(mm))
+
+
+# Record indexes of recently read files, keyed by path, size and mtime
+RECORD_INDEX_CACHE_SIZE = 512
+_record_index_cache = OrderedDict()
+_record_index_lock = threading.Lock()
+
+
+def record_index(path: str, mm=None) -> RecordArrays:
+    """
+    Record headers of a file (record offset -> time span), cached per file version.
+
+    Uses the file's sidecar record index if it is up to date, otherwise scans
+    the record headers.
+
+    Args:
+        path: Path to a miniSEED file.
+        mm: The file, already memory mapped (optional).
+
+    Returns:
+        RecordArrays of the file.
+
+    Raises:
+        ValueError: If the file isn't miniSEED 2 with blockette 1000.
+        OSError: If the file can't be read.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _record_index_lock:
+        records = _record_index_cache.get(key)
+        if records is not None:
+            _record_index_cache.move_to_end(key)
+            return records
+
+    sidecar = load_record_index(path, stat)
+    if sidecar is not None:
+        records = sidecar[0]
+    elif mm is not None:
+        records = scan_records(mm)
+    else:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            records = scan_records(mm)
+
+    with _record_index_lock:
+        _record_index_cache[key] = records
+        while len(_record_index_cache) > RECORD_INDEX_CACHE_SIZE:
+            _record_index_cache.popitem(last=False)
+    return records
+
+
+def read_windows(path: str, windows: List[Tuple[float, float]]) -> Stream:
+    """
+    Read the data of a miniSEED file within time windows, decoding only the
+    records that overlap them.
+
+    The file is memory mapped, its record index looked up (see record_index),
+    and only the overlapping records are copied out and decoded by ObsPy.
+    Files that aren't plain miniSEED 2 are read whole and trimmed instead.
+
+    Args:
+        path: Path to a miniSEED file.
+        windows: (starttime, endtime) Unix timestamps of the wanted windows.
+
+    Returns:
+        Stream of the decoded records, which may extend somewhat beyond the
+        windows (by up to a record). Empty if no record overlaps them.
+
+    Raises:
+        OSError: If the file can't be read.
+
+    Example:
+        >>> st = read_windows("/archive/SDS/2020/IU/ANMO/BHZ.D/IU.ANMO.00.BHZ.D.2020.001",
+        ...                   [(1577840000.0, 1577840140.0)])
+    """
+    if not windows:
+        return Stream()
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return Stream()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                records = record_index(path, mm)
+            except ValueError:
+                records = None
+            if records is not None:
+                wanted = np.zeros(len(records.offsets), dtype=bool)
+                for t0, t1 in windows:
+                    wanted |= (records.starttimes <= t1) & (records.endtimes >= t0)
+                lengths = (np.diff(np.append(records.offsets, len(mm)))
+                           if records.record_length == 0 else
+                           np.full(len(records.offsets), records.record_length))
+                data = b"".join(mm[o:o + n] for o, n in zip(records.offsets[wanted].tolist(),
+                                                            lengths[wanted].tolist()))
+    if records is None:
+        return streamread(path, format="MSEED",
+                          starttime=UTCDateTime(min(w[0] for w in windows)),
+                          endtime=UTCDateTime(max(w[1] for w in windows)))
+    if not data:
+        return Stream()
+    return streamread(io.BytesIO(data), format="MSEED")
+
+
+# Sidecar record index format version
+RECORD_INDEX_VERSION = 1
+
+
+def record_index_path(path: str) -> str:
+    """
+    Path of the sidecar record index of an SDS day file.
+
+    A hidden file next to the day file, e.g. ".IU.ANMO.00.BHZ.D.2020.001.idx",
+    which SDS file name patterns don't match.
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.idx")
+
+
+def write_record_index(path: str) -> Optional[RecordArrays]:
+    """
+    Write the sidecar record index of a miniSEED file.
+
+    The index holds the offset, start and end time, sample count, sample rate
+    and channel of every record, and the continuous segments (so the gaps) of
+    the file, compressed with numpy. It remembers the size and mtime of the
+    file it describes, so that readers ignore it once the file changes.
+
+    Args:
+        path: Path to a miniSEED file, usually an SDS day file just written.
+
+    Returns:
+        RecordArrays of the file, or None for an empty file.
+
+    Raises:
+        ValueError: If the file isn't miniSEED 2 with blockette 1000.
+        OSError: If the file can't be read or the index can't be written.
+
+    Example:
+        >>> write_record_index("/archive/SDS/2020/IU/ANMO/BHZ.D/IU.ANMO.00.BHZ.D.2020.001")
+    """
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        return None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        records = scan_records(mm)
+    segments = records_to_segments(records)
+
+    codes, code_index = np.unique(records.codes, return_inverse=True)
+    arrays = {
+        'version': RECORD_INDEX_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'record_length': records.record_length,
+        'codes': codes,
+        'code_index': code_index.astype(np.uint16),
+        'starttimes': records.starttimes,
+        'endtimes': records.endtimes,
+        'nsamples': records.nsamples.astype(np.int32),
+        'sample_rates': records.sample_rates,
+        'segment_nslc': np.array([seg[0:4] for seg in segments], dtype='U12').reshape(-1, 4),
+        'segment_times': np.array([seg[4:6] for seg in segments], dtype=np.float64).reshape(-1, 2),
+    }
+    if records.record_length == 0:
+        arrays['offsets'] = records.offsets
+
+    index_path = record_index_path(path)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, index_path)
+
+    with _record_index_lock:
+        _record_index_cache[(path, stat.st_size, stat.st_mtime_ns)] = records
+        while len(_record_index_cache) > RECORD_INDEX_CACHE_SIZE:
+            _record_index_cache.popitem(last=False)
+    return records
+
+
+def load_record_index(path: str, stat: Optional[os.stat_result] = None
+                      ) -> Optional[Tuple[RecordArrays, List[Tuple[str, str, str, str, float, float]]]]:
+    """
+    Read the sidecar record index of a file, if it has an up to date one.
+
+    Args:
+        path: Path to a miniSEED file.
+        stat: os.stat() of the file, if already known.
+
+    Returns:
+        (records, segments) as written by write_record_index(), or None if
+        there is no index or it describes another version of the file.
+    """
+    index_path = record_index_path(path)
+    try:
+        if stat is None:
+            stat = os.stat(path)
+        with np.load(index_path) as data:
+            if (int(data['version']) != RECORD_INDEX_VERSION or
+                int(data['size']) != stat.st_size or int(data['mtime_ns']) != stat.st_mtime_ns):
+                return None
+            record_length = int(data['record_length'])
+            starttimes = data['starttimes']
+            if record_length:
+                offsets = np.arange(len(starttimes), dtype=np.int64) * record_length
+            else:
+                offsets = data['offsets']
+            records = RecordArrays(
+                offsets=offsets,
+                codes=data['codes'][data['code_index']],
+                starttimes=starttimes,
+                endtimes=data['endtimes'],
+                nsamples=data['nsamples'].astype(np.int64),
+                sample_rates=data['sample_rates'],
+                record_length=record_length,
+            )
+            segments = [tuple(nslc) + (float(t0), float(t1))
+                        for nslc, (t0, t1) in zip(data['segment_nslc'].tolist(),
+                                                  data['segment_times'].tolist())]
+    except (OSError, KeyError, ValueError):
+        return None
+    return records, segments
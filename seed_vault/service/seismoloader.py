@@ -3,6 +3,7 @@ The main functions for SEED-vault, from original CLI-only version (Pickle 2024)
 
 """
 
+import io
 import os
 import sys
 import copy
@@ -14,29 +15,37 @@ import configparser
 import pandas as pd
 import numpy as np
 import threading
+import queue
 import random
-from typing import Any, Dict, List, Tuple, Optional, Union
+from typing import Any, Dict, List, Set, Tuple, Optional, Union
 from collections import defaultdict
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor, as_completed
 
 
 from obspy import UTCDateTime
 from obspy.core.stream import Stream
+from obspy.core.trace import Trace
 from obspy.core.stream import read as streamread
 from obspy.core.inventory import read_inventory,Inventory
 from obspy.core.event import read_events,Event,Catalog
 
 from obspy.clients.fdsn import Client
 from obspy.taup import TauPyModel
-from obspy.geodetics.base import locations2degrees,gps2dist_azimuth
+from obspy.geodetics.base import locations2degrees
 from obspy.clients.fdsn.header import URL_MAPPINGS, FDSNNoDataException
 
 from seed_vault.models.config import SeismoLoaderSettings, SeismoQuery
 from seed_vault.enums.config import DownloadType, GeoConstraintType
 from seed_vault.service.utils import is_in_enum,get_sds_filenames,to_timestamp,\
-    filter_inventory_by_geo_constraints,filter_catalog_by_geo_constraints
-from seed_vault.service.db import DatabaseManager,stream_to_db_elements,miniseed_to_db_elements,\
+    filter_inventory_by_geo_constraints,filter_catalog_by_geo_constraints,\
+    inventory_coordinates,gps2dist_azimuth_array
+from seed_vault.service.db import DatabaseManager,AvailabilityIndex,times_to_epoch,\
+    stream_to_db_elements,miniseed_to_db_elements,\
     populate_database_from_sds,populate_database_from_files,populate_database_from_files_dumb
-from seed_vault.service.waveform import get_local_waveform, stream_to_dataframe
+from seed_vault.service.waveform import get_local_waveforms_bulk, stream_to_dataframe
+from seed_vault.service.traveltime import TravelTimeTable
+from seed_vault.service.mseed import RecordHeader, iter_records, write_record_index
 
 
 
@@ -201,7 +210,8 @@ def get_p_s_times(eq, dist_deg, ttmodel):
         eq (obspy.core.event.Event): Earthquake event object containing origin time
             and depth information
         dist_deg (float): Distance between source and receiver in degrees
-        ttmodel (obspy.taup.TauPyModel): Travel time model to use for calculations
+        ttmodel (obspy.taup.TauPyModel or TravelTimeTable): Travel time model to use
+            for calculations. A TravelTimeTable interpolates cached travel times.
 
     Returns:
         tuple: A tuple containing:
@@ -225,6 +235,16 @@ def get_p_s_times(eq, dist_deg, ttmodel):
     eq_time = eq.origins[0].time
     eq_depth = eq.origins[0].depth / 1000  # depths are in meters for QuakeML
 
+    if isinstance(ttmodel, TravelTimeTable):
+        p_tt, s_tt = ttmodel.travel_times(eq_depth, dist_deg)
+        p_arrival_time = eq_time + p_tt if p_tt is not None else None
+        s_arrival_time = eq_time + s_tt if s_tt is not None else None
+        if p_arrival_time is None:
+            print(f"No direct P-wave arrival found for distance {dist_deg} degrees")
+        if s_arrival_time is None and dist_deg <= 90:
+            print(f"No direct S-wave arrival found for distance {dist_deg} degrees (event {eq_time})")
+        return p_arrival_time, s_arrival_time
+
     try:
         phasearrivals = ttmodel.get_travel_times(
             source_depth_in_km=eq_depth,
@@ -256,6 +276,36 @@ def get_p_s_times(eq, dist_deg, ttmodel):
     return p_arrival_time, s_arrival_time
 
 
+def get_travel_time_model(settings: SeismoLoaderSettings) -> Union[TauPyModel, TravelTimeTable]:
+    """
+    Load the travel time model for event downloads.
+
+    Uses settings.event.model, falling back to IASP91. If
+    settings.processing.traveltime_tolerance is set, the model is wrapped in a
+    TravelTimeTable persisted next to the database, so first P / first S times
+    are interpolated from a cached grid instead of ray traced per station.
+
+    Args:
+        settings: SeismoLoaderSettings object containing configuration.
+
+    Returns:
+        Union[TauPyModel, TravelTimeTable]: Model to pass to get_p_s_times().
+    """
+    model_name = settings.event.model
+    try:
+        ttmodel = TauPyModel(model_name)
+    except Exception as e:
+        print(f"Falling back to IASP91 model: {str(e)}")
+        model_name = 'IASP91'
+        ttmodel = TauPyModel(model_name)
+
+    tolerance = settings.processing.traveltime_tolerance
+    if tolerance:
+        return TravelTimeTable(model_name, cache_dir=Path(settings.db_path).parent,
+                               tolerance=tolerance, model=ttmodel)
+    return ttmodel
+
+
 def select_highest_samplerate(inv, minSR=10, time=None):
     """
     Filters an inventory to keep only the highest sample rate channels where duplicates exist.
@@ -440,7 +490,7 @@ def get_preferred_channels(
 def collect_requests_event(
     eq: Event,
     inv: Inventory,
-    model: Optional[TauPyModel] = None,
+    model: Optional[Union[TauPyModel, TravelTimeTable]] = None,
     settings: Optional[SeismoLoaderSettings] = None
 ) -> Tuple[List[Tuple[str, str, str, str, str, str]], 
            List[Tuple[Any, ...]], 
@@ -454,8 +504,8 @@ def collect_requests_event(
     Args:
         eq: ObsPy Event object containing earthquake information.
         inv: ObsPy Inventory object containing station information.
-        model: Optional TauPyModel for travel time calculations.
-            If None, uses model from settings or falls back to IASP91.
+        model: Optional TauPyModel or TravelTimeTable for travel time calculations.
+            If None, uses get_travel_time_model(settings).
         settings: Optional SeismoLoaderSettings object containing configuration.
 
     Returns:
@@ -465,7 +515,7 @@ def collect_requests_event(
             - Dictionary mapping "net.sta" to P-arrival timestamps
 
     Note:
-        Requires a DatabaseManager instance to check for existing arrivals.
+        Opens the database (see setup_paths) to check for existing arrivals.
         Time windows are constructed around P-wave arrivals using settings.
         Handles both new calculations and retrieving existing arrival times.
 
@@ -500,17 +550,27 @@ def collect_requests_event(
 
     # Ensure 1D vel model is loaded
     if not model:
-        try:
-            model = TauPyModel(model_name.upper())
-        except Exception:
-            model = TauPyModel('IASP91')
+        model = get_travel_time_model(settings)
 
     requests_per_eq = []
     arrivals_per_eq = []
     p_arrivals: Dict[str, float] = {}
 
+    # All arrivals already cached for this event, keyed by "net.sta"
+    try:
+        cached_arrivals = db_manager.fetch_arrivals_distances_bulk(str(eq.preferred_origin_id))
+    finally:
+        db_manager.close()
+
+    # Event to station distances and azimuths for the whole inventory at once
+    sta_lats, sta_lons = inventory_coordinates(sub_inv)
+    all_dist_deg = locations2degrees(origin.latitude, origin.longitude, sta_lats, sta_lons)
+    all_dist_m, all_azi, _ = gps2dist_azimuth_array(origin.latitude, origin.longitude, sta_lats, sta_lons)
+    sta_index = -1
+
     for net in sub_inv:
         for sta in net:
+            sta_index += 1
             # Get station timing info
             try:
                 sta_start = sta.start_date.timestamp
@@ -520,11 +580,7 @@ def collect_requests_event(
                 sta_end = None
 
             # Check for existing arrivals
-            fetched_arrivals = db_manager.fetch_arrivals_distances(
-                str(eq.preferred_origin_id),
-                net.code,
-                sta.code
-            )
+            fetched_arrivals = cached_arrivals.get(f"{net.code}.{sta.code}")
 
             if fetched_arrivals:
                 p_time, s_time, dist_km, dist_deg, azi = fetched_arrivals
@@ -533,14 +589,9 @@ def collect_requests_event(
                 p_arrivals[f"{net.code}.{sta.code}"] = p_time
             else:
                 # Calculate new arrivals
-                dist_deg = locations2degrees(
-                    origin.latitude, origin.longitude,
-                    sta.latitude, sta.longitude
-                )
-                dist_m, azi, _ = gps2dist_azimuth(
-                    origin.latitude, origin.longitude,
-                    sta.latitude, sta.longitude
-                )
+                dist_deg = float(all_dist_deg[sta_index])
+                dist_m = float(all_dist_m[sta_index])
+                azi = float(all_azi[sta_index])
                 
                 p_time, s_time = get_p_s_times(eq, dist_deg, model)
                 if p_time is None:
@@ -588,6 +639,68 @@ def collect_requests_event(
     return requests_per_eq, arrivals_per_eq, p_arrivals
 
 
+def coalesce_requests(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    slack: float = 0
+) -> List[Tuple[str, str, str, str, str, str]]:
+    """
+    Merge overlapping or nearly adjacent time windows of the same channel.
+
+    Used to plan downloads across events: closely spaced events (e.g. an
+    aftershock sequence) request overlapping windows at the same stations,
+    which would otherwise become separate (or duplicate) FDSN requests.
+
+    Args:
+        requests: List of request tuples, each containing:
+            (network, station, location, channel, start_time, end_time)
+        slack: Windows of the same channel separated by up to this many
+            seconds are merged into one.
+
+    Returns:
+        List of request tuples. Windows that didn't merge with anything are
+        returned unchanged.
+
+    Example:
+        >>> coalesce_requests([
+        ...     ("IU", "ANMO", "00", "BHZ", "2020-01-01T00:00:00", "2020-01-01T00:10:00"),
+        ...     ("IU", "ANMO", "00", "BHZ", "2020-01-01T00:11:00", "2020-01-01T00:20:00")
+        ... ], slack=60)
+        [("IU", "ANMO", "00", "BHZ", "2020-01-01T00:00:00", "2020-01-01T00:20:00")]
+    """
+    if not requests:
+        return []
+
+    starts = times_to_epoch([req[4] for req in requests])
+    ends = times_to_epoch([req[5] for req in requests])
+
+    groups = defaultdict(list)
+    for i, req in enumerate(requests):
+        groups[tuple(req[0:4])].append(i)
+
+    coalesced = []
+    for nslc, idx in groups.items():
+        idx = np.array(idx)
+        order = idx[np.argsort(starts[idx], kind='stable')]
+        seg_starts, seg_ends = starts[order], ends[order]
+
+        # A new window starts wherever the gap to everything before it exceeds the slack
+        running_end = np.maximum.accumulate(seg_ends)
+        new_window = np.ones(len(order), dtype=bool)
+        new_window[1:] = seg_starts[1:] > running_end[:-1] + slack
+
+        first = np.flatnonzero(new_window)
+        counts = np.diff(np.append(first, len(order)))
+        merged_ends = np.maximum.reduceat(seg_ends, first)
+        for f, count, t1 in zip(first, counts, merged_ends):
+            if count == 1:
+                coalesced.append(requests[order[f]])
+            else:
+                coalesced.append(nslc + (UTCDateTime(seg_starts[f]).isoformat(),
+                                         UTCDateTime(t1).isoformat()))
+
+    return coalesced
+
+
 def combine_requests(
     requests: List[Tuple[str, str, str, str, str, str]]
 ) -> List[Tuple[str, str, str, str, str, str]]:
@@ -645,13 +758,209 @@ def combine_requests(
     return combined_requests
 
 
+# Typical sample rates per SEED band code, for channels missing from the inventory
+BAND_CODE_SAMPLE_RATES = {
+    'F': 1000, 'G': 1000, 'D': 250, 'C': 250, 'E': 100, 'H': 100,
+    'S': 40, 'B': 40, 'M': 10, 'L': 1, 'V': 0.1, 'U': 0.01,
+    'R': 0.001, 'P': 0.0001, 'T': 0.00001, 'Q': 0.000001,
+}
+
+# Rough size of a STEIM2 compressed miniSEED sample, to estimate request payloads
+MSEED_BYTES_PER_SAMPLE = 2.0
+
+# Limits of a single dataselect POST sent by download_selection()
+BULK_MAX_BYTES = 200 * 1024**2
+BULK_MAX_LINES = 1000
+
+
+def inventory_sample_rates(inventory: Optional[Inventory]) -> Dict[Tuple[str, str, str, str], float]:
+    """
+    Sample rate of every channel in an inventory.
+
+    Args:
+        inventory: ObsPy Inventory with channel level information (or None).
+
+    Returns:
+        Dict mapping (network, station, location, channel) to sample rate in Hz.
+    """
+    sample_rates = {}
+    if not inventory:
+        return sample_rates
+    for net in inventory:
+        for sta in net:
+            for cha in sta:
+                if cha.sample_rate:
+                    sample_rates[(net.code, sta.code, cha.location_code, cha.code)] = cha.sample_rate
+    return sample_rates
+
+
+def estimate_request_bytes(
+    request: Tuple[str, str, str, str, str, str],
+    sample_rates: Optional[Dict[Tuple[str, str, str, str], float]] = None
+) -> float:
+    """
+    Estimate the miniSEED payload of a single channel request.
+
+    Uses the sample rate from the inventory if known, otherwise a typical
+    rate for the channel's band code.
+
+    Args:
+        request: Tuple containing (network, station, location, channel,
+            start_time, end_time)
+        sample_rates: Output of inventory_sample_rates().
+
+    Returns:
+        Estimated size in bytes.
+    """
+    sample_rate = (sample_rates or {}).get(tuple(request[0:4]))
+    if sample_rate is None:
+        sample_rate = BAND_CODE_SAMPLE_RATES.get(request[3][:1].upper(), 100)
+    duration = max(0, UTCDateTime(request[5]) - UTCDateTime(request[4]))
+    return sample_rate * duration * MSEED_BYTES_PER_SAMPLE
+
+
+def pack_requests(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    max_bytes: float,
+    sample_rates: Optional[Dict[Tuple[str, str, str, str], float]] = None,
+    slack: float = 0,
+    max_lines: int = 1000,
+    client_keys: Optional[Set[str]] = None
+) -> List[List[Tuple[str, str, str, str, str, str]]]:
+    """
+    Pack single channel requests into bulk (dataselect POST) selections.
+
+    Unlike combine_requests(), every channel keeps its own time window, so
+    nothing that wasn't asked for is downloaded, and windows don't need to be
+    identical to share an HTTP request. Windows of the same channel that
+    overlap or lie within `slack` seconds are merged first (see
+    coalesce_requests). Selections are filled per network and client (see
+    waveform_client_key) up to an estimated payload of max_bytes.
+
+    Args:
+        requests: List of request tuples, each containing:
+            (network, station, location, channel, start_time, end_time)
+        max_bytes: Target estimated payload per selection. A single channel
+            larger than this gets a selection of its own.
+        sample_rates: Output of inventory_sample_rates(), for estimating payloads.
+        slack: Gap in seconds below which windows of a channel are merged.
+        max_lines: Maximum number of lines per selection.
+        client_keys: Keys of the authenticated clients (network or net.sta
+            codes, see credential_key), so that each selection only holds
+            lines for one client.
+
+    Returns:
+        List of selections, each a list of request tuples of a single network
+        and client, to be downloaded with one get_waveforms_bulk call.
+
+    Example:
+        >>> selections = pack_requests(requests, max_bytes=50 * 1024**2,
+        ...                            sample_rates=inventory_sample_rates(inv))
+    """
+    if not requests:
+        return []
+
+    by_client = defaultdict(list)
+    for req in coalesce_requests(requests, slack=slack):
+        by_client[(req[0], waveform_client_key(req, client_keys or ()))].append(req)
+
+    selections = []
+    for key in sorted(by_client):
+        lines = sorted(by_client[key], key=lambda req: (req[1], req[2], req[3], UTCDateTime(req[4])))
+        selections.extend(chunk_selection(lines, max_bytes, sample_rates, max_lines))
+
+    return selections
+
+
+def chunk_selection(
+    lines: List[Tuple[str, str, str, str, str, str]],
+    max_bytes: float,
+    sample_rates: Optional[Dict[Tuple[str, str, str, str], float]] = None,
+    max_lines: int = 1000
+) -> List[List[Tuple[str, str, str, str, str, str]]]:
+    """
+    Split bulk request lines into consecutive chunks of limited estimated payload.
+
+    Args:
+        lines: List of request tuples, each containing:
+            (network, station, location, channel, start_time, end_time)
+        max_bytes: Target estimated payload per chunk. A single line larger
+            than this gets a chunk of its own.
+        sample_rates: Output of inventory_sample_rates(), for estimating payloads.
+        max_lines: Maximum number of lines per chunk.
+
+    Returns:
+        List of chunks (lists of request tuples), in the original order.
+    """
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+    for line in lines:
+        line_bytes = estimate_request_bytes(line, sample_rates)
+        if chunk and (chunk_bytes + line_bytes > max_bytes or len(chunk) >= max_lines):
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(line)
+        chunk_bytes += line_bytes
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def plan_requests(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    settings: SeismoLoaderSettings
+) -> List[Union[Tuple[str, str, str, str, str, str], List[Tuple[str, str, str, str, str, str]]]]:
+    """
+    Group pruned requests into downloads.
+
+    Uses pack_requests() if settings.processing.request_budget_mb is set,
+    otherwise combine_requests().
+
+    Args:
+        requests: List of single channel request tuples.
+        settings: SeismoLoaderSettings object containing configuration.
+
+    Returns:
+        Requests to pass to archive_request(): combined request tuples, or
+        bulk selections (lists of request tuples).
+    """
+    budget_mb = settings.processing.request_budget_mb
+    if budget_mb:
+        return pack_requests(requests, max_bytes=budget_mb * 1024**2,
+                             sample_rates=inventory_sample_rates(settings.station.selected_invs),
+                             slack=settings.processing.coalesce_slack_sec or 0,
+                             client_keys={credential_key(cred.nslc_code) for cred in settings.auths})
+    return combine_requests(requests)
+
+
+def request_lines(request) -> List[Tuple[str, str, str, str, str, str]]:
+    """The request tuples making up a request: itself, or the lines of a bulk selection."""
+    return request if isinstance(request, list) else [request]
+
+
+def describe_request(request) -> str:
+    """Short description of a request or bulk selection, for logging."""
+    if not isinstance(request, list):
+        return str(request)
+    t0 = min(UTCDateTime(req[4]) for req in request)
+    t1 = max(UTCDateTime(req[5]) for req in request)
+    return f"{request[0][0]}: {len(request)} channels, {str(t0)[0:19]} - {str(t1)[0:19]}"
+
+
 def get_missing_from_request(db_manager, eq_id: str, requests: List[Tuple], st: Stream) -> dict:
     """
     Compare requested seismic data against what's present in a Stream.
     Handles comma-separated values for location and channel codes.
+
+    The stream is indexed once by channel code and the database is queried
+    once for all requests, so this stays cheap for events with many stations.
     
     Parameters:
     -----------
+    db_manager : DatabaseManager
+        Database to also look for the streamed channels in
     eq_id : str
         Earthquake ID to use as dictionary key
     requests : List[Tuple]
@@ -678,56 +987,38 @@ def get_missing_from_request(db_manager, eq_id: str, requests: List[Tuple], st:
         return {}
     
     result = {eq_id: {}}
-    
-    # Process each request
-    for request in requests:
-        net, sta, loc, cha, t0, t1 = request #only using t0 really
+
+    # Index the stream once: channel codes present per (network, station, location)
+    stream_channels = defaultdict(set)
+    for tr in st:
+        stream_channels[(tr.stats.network, tr.stats.station, tr.stats.location)].add(tr.stats.channel)
+    stream_nslcs = [key + (cha,) for key, chas in stream_channels.items() for cha in chas]
+
+    # Requests are also satisfied if the database has a span of any streamed
+    # channel covering their whole time window; one query for all requests
+    in_db = db_manager.check_data_existence_bulk(
+        stream_nslcs, [(request[4], request[5]) for request in requests])
+
+    for request, request_in_db in zip(requests, in_db):
+        net, sta, loc, cha = request[:4]
         station_key = f"{net}.{sta}"
-        
+
+        if request_in_db:
+            result[eq_id][station_key] = []
+            continue
+
         # Split location and channel if comma-separated
-        locations = loc.split(',') if ',' in loc else [loc]
-        channels = cha.split(',') if ',' in cha else [cha]
-        
-        missing_channels = []
-        total_combinations = 0
-        missing_combinations = 0
-        
-        # Check all combinations
-        for location in locations:
-            for channel in channels:
-                total_combinations += 1
-                # Look for matching trace
-                found_match = False
-
-                for tr in st:
-
-                    # check the recently downloaded stream
-                    if (tr.stats.network == net and 
-                        tr.stats.station == sta and
-                        tr.stats.location == (location if location else '') and
-                        fnmatch.fnmatch(tr.stats.channel, channel)):
-                        found_match = True
-                        break
+        combinations = [(location, channel)
+                        for location in loc.split(',') for channel in cha.split(',')]
+        missing_channels = [
+            f"{net}.{sta}.{location}.{channel}" for location, channel in combinations
+            if not fnmatch.filter(stream_channels.get((net, sta, location), ()), channel)
+        ]
 
-                    # also check the database
-                    if db_manager.check_data_existence(tr.stats.network,
-                                                    tr.stats.station,
-                                                    tr.stats.location,
-                                                    tr.stats.channel,
-                                                    t0,t1):
-                        found_match = True
-                        break
-                
-                if not found_match:
-                    missing_combinations += 1
-                    missing_channels.append(
-                        f"{net}.{sta}.{location}.{channel}"
-                    )
-        
         # Determine value for this station
-        if missing_combinations == total_combinations:  # nothing returned
+        if len(missing_channels) == len(combinations):  # nothing returned
             result[eq_id][station_key] = "ALL"
-        elif missing_combinations == 0:  # everything returned
+        elif not missing_channels:  # everything returned
             result[eq_id][station_key] = []
         else:  # partial return
             result[eq_id][station_key] = missing_channels
@@ -739,7 +1030,8 @@ def prune_requests(
     requests: List[Tuple[str, str, str, str, str, str]],
     db_manager: DatabaseManager,
     sds_path: str,
-    min_request_window: float = 3
+    min_request_window: float = 3,
+    availability: Optional[AvailabilityIndex] = None
 ) -> List[Tuple[str, str, str, str, str, str]]:
     """
     Remove overlapping requests where data already exists in the archive.
@@ -754,13 +1046,17 @@ def prune_requests(
         sds_path: Root path of the SDS archive.
         min_request_window: Minimum time window in seconds to keep a request.
             Requests shorter than this are discarded.
+        availability: Optional pre-built AvailabilityIndex. If None, one is
+            built from the database with a single query.
 
     Returns:
         List of pruned request tuples, sorted by start time, network, and station.
 
     Note:
-        This function will update the database if it finds files in the SDS
-        structure that aren't yet recorded in the database.
+        Existing data is looked up in an in-memory AvailabilityIndex rather
+        than with one query per request. Only where data appears to be missing
+        is the filesystem checked for SDS day files that aren't yet recorded
+        in the database; any found are added to the database (and the index).
 
     Example:
         >>> requests = [("IU", "ANMO", "00", "BHZ", "2020-01-01", "2020-01-02")]
@@ -770,77 +1066,63 @@ def prune_requests(
     if not requests:
         return pruned_requests
 
+    requests = [req for req in requests
+                if UTCDateTime(req[5]) - UTCDateTime(req[4]) >= min_request_window]
+    if not requests:
+        return pruned_requests
 
-    with db_manager.connection() as conn:
-        cursor = conn.cursor()
-        
-        for req in requests:
-            network, station, location, channel, start_time, end_time = req
-            start_time = UTCDateTime(start_time)
-            end_time = UTCDateTime(end_time)
-
-            if end_time - start_time < min_request_window:
-                continue
-
-            # Check filesystem for existing files
-            existing_filenames = get_sds_filenames(
-                network, station, location, channel,
-                start_time, end_time, sds_path
-            )
-            
-            # Query database for existing data
-            cursor.execute('''
-                SELECT starttime, endtime FROM archive_data
-                WHERE network = ? AND station = ? AND location = ? AND channel = ?
-                AND endtime >= ? AND starttime <= ?
-                ORDER BY starttime
-            ''', (network, station, location, channel,
-                 start_time.isoformat(), end_time.isoformat()))
-            
-            existing_data = cursor.fetchall()
+    if availability is None:
+        availability = db_manager.get_availability_index(
+            networks=[req[0] for req in requests])
 
+    all_gaps = availability.bulk_missing(requests, min_request_window)
 
-            # Update database if files exist but aren't recorded (probably continuous) OR there are multiple items in one file (probably events)
-            if existing_filenames and ( len(existing_data) < len(existing_filenames) or len(existing_data) > len(existing_filenames)):
-                populate_database_from_files(cursor, file_paths=existing_filenames)
-                
+    # Check the filesystem for unrecorded day files, but only where data is missing
+    checked_files = set()
+    for i, (req, gaps) in enumerate(zip(requests, all_gaps)):
+        if not gaps:
+            continue
+        network, station, location, channel = req[0:4]
+
+        unrecorded = []
+        for gap_start, gap_end in gaps:
+            for fn in get_sds_filenames(network, station, location, channel,
+                                        UTCDateTime(gap_start), UTCDateTime(gap_end), sds_path):
+                if fn not in checked_files and os.path.isfile(fn):
+                    unrecorded.append(fn)
+                checked_files.add(fn)
+
+        if unrecorded:
+            nslc = (network, station, location, channel)
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
+                db_manager.mark_touched(populate_database_from_files(cursor, file_paths=unrecorded))
                 cursor.execute('''
                     SELECT starttime, endtime FROM archive_data
                     WHERE network = ? AND station = ? AND location = ? AND channel = ?
-                    AND endtime >= ? AND starttime <= ?
-                    ORDER BY starttime
-                ''', (network, station, location, channel,
-                     start_time.isoformat(), end_time.isoformat()))
-                
-                existing_data = cursor.fetchall()
+                ''', nslc)
+                rows = cursor.fetchall()
 
-            if not existing_data and not existing_filenames:
-                # Keep entire request if no existing data found
-                pruned_requests.append(req)
-            else:
-                # Process gaps in existing data
-                current_time = start_time
-                for db_start, db_end in existing_data:
-                    db_start = UTCDateTime(db_start)
-                    db_end = UTCDateTime(db_end)
-                    
-                    if current_time < db_start - min_request_window:
-                        # Add request for gap before existing data
-                        pruned_requests.append((
-                            network, station, location, channel,
-                            current_time.isoformat(),
-                            db_start.isoformat()
-                        ))
-                    
-                    current_time = max(current_time, db_end)
-                
-                if current_time < end_time - min_request_window:
-                    # Add request for gap after last existing data
-                    pruned_requests.append((
-                        network, station, location, channel,
-                        current_time.isoformat(),
-                        end_time.isoformat()
-                    ))
+            availability.set_spans(nslc,
+                                   times_to_epoch([row[0] for row in rows]),
+                                   times_to_epoch([row[1] for row in rows]))
+            all_gaps[i] = availability.bulk_missing([req], min_request_window)[0]
+
+    for req, gaps in zip(requests, all_gaps):
+        network, station, location, channel, start_time, end_time = req
+
+        if len(gaps) == 1 and abs(gaps[0][0] - UTCDateTime(start_time).timestamp) < 1e-3 \
+                and abs(gaps[0][1] - UTCDateTime(end_time).timestamp) < 1e-3:
+            # Keep entire request if no existing data found
+            pruned_requests.append(req)
+            continue
+
+        for gap_start, gap_end in gaps:
+            pruned_requests.append((
+                network, station, location, channel,
+                UTCDateTime(gap_start).isoformat(),
+                UTCDateTime(gap_end).isoformat()
+            ))
 
     # Sort by start time, network, station
     if pruned_requests:
@@ -849,39 +1131,94 @@ def prune_requests(
     return pruned_requests
 
 
-def archive_request(
+# Guards for SDS day files and database writes, so that concurrent download
+# workers never merge into the same day file at the same time
+_sds_file_locks: Dict[str, threading.Lock] = {}
+_sds_file_locks_guard = threading.Lock()
+_db_write_lock = threading.Lock()
+
+
+def _get_sds_file_lock(full_path: str) -> threading.Lock:
+    """Return the (shared) lock that serializes writes to one SDS day file."""
+    with _sds_file_locks_guard:
+        lock = _sds_file_locks.get(full_path)
+        if lock is None:
+            lock = _sds_file_locks[full_path] = threading.Lock()
+        return lock
+
+
+def credential_key(nslc_code: str) -> str:
+    """Client key of a credential: its network code, or net.sta code for a single station."""
+    return '.'.join(nslc_code.upper().split('.')[0:2])
+
+
+def waveform_client_key(request: Tuple[str, str, str, str, str, str], client_keys) -> str:
+    """
+    Key of the client responsible for a request line.
+
+    Per-network credentials take precedence over per-station credentials,
+    otherwise the 'open' client is used.
+
+    Args:
+        request: Tuple containing (network, station, location, channel,
+            start_time, end_time)
+        client_keys: Keys of the authenticated clients (network or net.sta codes).
+
+    Returns:
+        The network code, net.sta code or 'open'.
+    """
+    if request[0] in client_keys:
+        return request[0]
+    elif request[0] + '.' + request[1] in client_keys:
+        return request[0] + '.' + request[1]
+    return 'open'
+
+
+def select_waveform_client(
     request: Tuple[str, str, str, str, str, str],
-    waveform_clients: Dict[str, Client],
-    sds_path: str,
-    db_manager: DatabaseManager
-) -> None:
+    waveform_clients: Dict[str, Client]
+) -> Client:
     """
-    Download seismic data for a request and archive it in SDS format.
+    Pick the FDSN client to use for a request, see waveform_client_key().
+
+    Args:
+        request: Tuple containing (network, station, location, channel,
+            start_time, end_time), or a bulk selection from pack_requests()
+        waveform_clients: Dictionary mapping network codes (or net.sta codes)
+            to FDSN clients. Special key 'open' is used for default client.
+
+    Returns:
+        The FDSN client responsible for this request.
+    """
+    # Bulk selections only hold lines of a single client
+    return waveform_clients[waveform_client_key(request_lines(request)[0], waveform_clients)]
 
-    Retrieves waveform data from FDSN web services, saves it in SDS format,
-    and updates the database. Handles authentication, data merging, and
-    various error conditions.
+
+def download_request(
+    request: Tuple[str, str, str, str, str, str],
+    waveform_clients: Dict[str, Client]
+) -> Optional[Stream]:
+    """
+    Download the waveforms for a single (possibly combined) request.
 
     Args:
         request: Tuple containing (network, station, location, channel,
             start_time, end_time)
         waveform_clients: Dictionary mapping network codes to FDSN clients.
             Special key 'open' is used for default client.
-        sds_path: Root path of the SDS archive.
-        db_manager: DatabaseManager instance for updating the database.
+
+    Returns:
+        Stream of downloaded traces, or None if the request returned no data
+        or failed.
 
     Note:
         - Supports per-network and per-station authentication
-        - Handles splitting of large station list requests
-        - Performs data merging when files already exist
-        - Attempts STEIM2 compression, falls back to uncompressed format
-        - Groups traces by day to handle fragmented data efficiently
-
-    Example:
-        >>> clients = {'IU': Client('IRIS'), 'open': Client('IRIS')}
-        >>> request = ("IU", "ANMO", "00", "BHZ", "2020-01-01", "2020-01-02")
-        >>> archive_request(request, clients, "/data/seismic", db_manager)
+        - Long station lists and bulk selections (lists of request tuples)
+          are sent as dataselect POST requests, see download_selection()
     """
+    if isinstance(request, list):
+        return download_selection(request, waveform_clients)
+
     try:
 
         t0 = UTCDateTime(request[4])
@@ -889,17 +1226,12 @@ def archive_request(
 
         # Double check that the request range is real and not some db artifact
         if t1 - t0 < 1:
-            return
+            return None
 
         time0 = time.time()
         
         # Select appropriate client
-        if request[0] in waveform_clients:
-            wc = waveform_clients[request[0]]
-        elif request[0] + '.' + request[1] in waveform_clients:
-            wc = waveform_clients[request[0] + '.' + request[1]]
-        else:
-            wc = waveform_clients['open']
+        wc = select_waveform_client(request, waveform_clients)
 
         kwargs = {
             'network': request[0].upper(),
@@ -910,115 +1242,1051 @@ def archive_request(
             'endtime': t1
         }
 
-        # Handle long station lists
+        # Handle long station lists: send them as dataselect POST lines
+        # (chunked by estimated payload) rather than one GET per station
         if len(request[1]) > 24:
-            st = Stream()
-            split_stations = request[1].split(',')
-            for s in split_stations:
+            return download_selection(expand_request(request), waveform_clients)
+
+        st = wc.get_waveforms(**kwargs)
+
+        # Log download statistics
+        download_time = time.time() - time0
+        download_size = sum(tr.data.nbytes for tr in st) / 1024**2  # MB
+        print(f"      > Downloaded {download_size:.2f} MB @ {download_size/download_time:.2f} MB/s")
+
+    except Exception as e:
+        if 'code: 204' in str(e):
+            print(f"      ~ No data available")
+        else:
+            print(f"{str(e)}")
+        return None
+
+    return st
+
+
+def download_selection(
+    selection: List[Tuple[str, str, str, str, str, str]],
+    waveform_clients: Dict[str, Client],
+    max_bytes: Optional[float] = None,
+    max_lines: Optional[int] = None
+) -> Optional[Stream]:
+    """
+    Download a bulk selection (see pack_requests) via dataselect POST.
+
+    The selection is sent in as few get_waveforms_bulk calls as possible,
+    chunked so no single POST exceeds max_bytes of estimated payload or
+    max_lines lines.
+
+    Args:
+        selection: List of request tuples of a single network, each containing
+            (network, station, location, channel, start_time, end_time)
+        waveform_clients: Dictionary mapping network codes to FDSN clients.
+            Special key 'open' is used for default client.
+        max_bytes: Maximum estimated payload per POST. Defaults to BULK_MAX_BYTES.
+        max_lines: Maximum number of lines per POST. Defaults to BULK_MAX_LINES.
+
+    Returns:
+        Stream of downloaded traces, or None if the request returned no data
+        or failed.
+    """
+    bulk = []
+    for net, sta, loc, cha, t0, t1 in selection:
+        t0, t1 = UTCDateTime(t0), UTCDateTime(t1)
+        # Double check that the request range is real and not some db artifact
+        if t1 - t0 >= 1:
+            bulk.append((net.upper(), sta.upper(), loc.upper(), cha.upper(), t0, t1))
+    if not bulk:
+        return None
+
+    time0 = time.time()
+    wc = select_waveform_client(selection, waveform_clients)
+    st = Stream()
+    for chunk in chunk_selection(bulk, max_bytes or BULK_MAX_BYTES,
+                                 max_lines=max_lines or BULK_MAX_LINES):
+        try:
+            st += wc.get_waveforms_bulk(chunk)
+        except Exception as e:
+            if 'code: 204' in str(e):
+                print(f"      ~ No data available for {len(chunk)} channels")
+            else:
+                print(f"{str(e)}")
+
+    if not st:
+        return None
+
+    # Log download statistics
+    download_time = time.time() - time0
+    download_size = sum(tr.data.nbytes for tr in st) / 1024**2  # MB
+    print(f"      > Downloaded {download_size:.2f} MB @ {download_size/download_time:.2f} MB/s")
+
+    return st
+
+
+def expand_request(request: Tuple[str, str, str, str, str, str]) -> List[Tuple[str, str, str, str, str, str]]:
+    """
+    Expand a combined request (comma separated stations, locations and
+    channels) into one bulk line per station, location and channel.
+
+    Args:
+        request: Tuple containing (network, station, location, channel,
+            start_time, end_time)
+
+    Returns:
+        List of request tuples, the cross product of the comma separated codes.
+    """
+    net, stas, locs, chas, t0, t1 = request
+    return [(net, sta, loc, cha, t0, t1)
+            for sta in stas.split(',')
+            for loc in locs.split(',')
+            for cha in chas.split(',')]
+
+
+def day_sample_ranges(tr: Trace) -> List[Tuple[int, int, int, int]]:
+    """
+    Sample index ranges of a trace that belong to each SDS day file.
+
+    Each day gets the samples nearest to its start and its end (like
+    Trace.slice with nearest_sample=True), and a trace start leaking into the
+    previous day by up to one sample is assigned to the next day.
+
+    Args:
+        tr: Trace to partition.
+
+    Returns:
+        List of (year, doy, start_index, end_index) with non-empty ranges,
+        end_index exclusive, so that tr.data[start_index:end_index] holds the
+        samples of that day.
+    """
+    npts = tr.stats.npts
+    if npts == 0:
+        return []
+    starttime = tr.stats.starttime
+    endtime = tr.stats.endtime
+    delta = tr.stats.delta
+
+    # Handle trace start leaking into previous day
+    first_day = UTCDateTime(starttime.date)
+    if (first_day + 86400 - starttime) <= delta:
+        first_day += 86400
+
+    num_days = int(np.ceil((endtime - first_day) / 86400)) if endtime > first_day else 0
+    # Nearest sample to each midnight, rounding halves up like Trace.slice.
+    # Offsets in integer nanoseconds keep exact halves exact.
+    offsets_ns = (first_day.ns - starttime.ns) + 86400 * 10**9 * np.arange(num_days + 1, dtype=np.int64)
+    bounds = np.floor(offsets_ns * (tr.stats.sampling_rate / 1e9) + 0.5).astype(np.int64)
+    bounds = np.clip(bounds, 0, npts)
+    bounds[-1] = npts
+
+    ranges = []
+    for d in range(num_days):
+        if bounds[d + 1] > bounds[d]:
+            day = first_day + 86400 * d
+            ranges.append((day.year, day.julday, int(bounds[d]), int(bounds[d + 1])))
+    return ranges
+
+
+def split_stream_by_day(st: Stream) -> Dict[Tuple[int, int, str, str, str, str], Stream]:
+    """
+    Group the traces of a stream into SDS day files, without copying data.
+
+    Day traces are views into the original tr.data arrays (see
+    day_sample_ranges), so splitting allocates no waveform memory.
+
+    Args:
+        st: Stream of (possibly multi-day) traces.
+
+    Returns:
+        Dictionary mapping (year, doy, net, sta, loc, cha) to a Stream holding
+        the part of the data that belongs in that day file.
+    """
+    traces_by_day = defaultdict(Stream)
+    
+    for tr in st:
+        net = tr.stats.network
+        sta = tr.stats.station
+        loc = tr.stats.location
+        cha = tr.stats.channel
+
+        for year, doy, i0, i1 in day_sample_ranges(tr):
+            header = tr.stats.copy()
+            header.npts = i1 - i0
+            header.starttime = tr.stats.starttime + i0 * tr.stats.delta
+            day_tr = Trace(data=tr.data[i0:i1], header=header)
+            traces_by_day[(year, doy, net, sta, loc, cha)].append(day_tr)
+
+    return traces_by_day
+
+
+def write_stream_to_sds(st: Stream, sds_path: str,
+                        index_records: bool = False) -> List[Tuple[str, str, str, str, str, str]]:
+    """
+    Write a downloaded stream into the SDS archive, merging with existing day files.
+
+    Writes to any single day file are serialized, so this is safe to call
+    from several threads at once.
+
+    Args:
+        st: Stream of downloaded traces.
+        sds_path: Root path of the SDS archive.
+        index_records: Also write the sidecar record index of each day file
+            written (see mseed.write_record_index).
+
+    Returns:
+        List of database elements (network, station, location, channel,
+        starttime, endtime) describing the written day files.
+
+    Note:
+        - Performs data merging when files already exist
+        - Attempts STEIM2 compression, falls back to uncompressed format
+        - Groups traces by day to handle fragmented data efficiently
+    """
+    to_insert_db = []
+    for day_key, day_stream in split_stream_by_day(st).items():
+        full_path = _sds_day_file(sds_path, day_key)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        with _get_sds_file_lock(full_path):
+            to_insert_db.extend(_write_day_stream(full_path, day_stream, index_records))
+
+    return to_insert_db
+
+
+def _sds_day_file(sds_path: str, day_key: Tuple[int, int, str, str, str, str]) -> str:
+    """Full SDS path of the day file for a (year, doy, net, sta, loc, cha) key."""
+    year, doy, net, sta, loc, cha = day_key
+    return os.path.join(sds_path, str(year), net, sta, f"{cha}.D",
+                        f"{net}.{sta}.{loc}.{cha}.D.{year}.{doy:03d}")
+
+
+def archive_request(
+    request: Tuple[str, str, str, str, str, str],
+    waveform_clients: Dict[str, Client],
+    sds_path: str,
+    db_manager: DatabaseManager,
+    write_buffer: Optional["SDSWriteBuffer"] = None,
+    record_writer: Optional["SDSRecordWriter"] = None,
+    index_records: bool = False
+) -> None:
+    """
+    Download seismic data for a request and archive it in SDS format.
+
+    Retrieves waveform data from FDSN web services, saves it in SDS format,
+    and updates the database. Handles authentication, data merging, and
+    various error conditions.
+
+    Args:
+        request: Tuple containing (network, station, location, channel,
+            start_time, end_time)
+        waveform_clients: Dictionary mapping network codes to FDSN clients.
+            Special key 'open' is used for default client.
+        sds_path: Root path of the SDS archive.
+        db_manager: DatabaseManager instance for updating the database.
+        write_buffer: Optional SDSWriteBuffer. If given, downloaded data is
+            handed to the buffer and written when it is flushed, instead of
+            being written (and inserted into the database) right away.
+        record_writer: Optional SDSRecordWriter. If given, the raw miniSEED
+            response is routed to the day files without being decoded (see
+            stream_request_to_sds), and write_buffer is ignored.
+        index_records: Write the sidecar record index of each day file
+            written. Buffers and record writers have their own setting.
+
+    Note:
+        See download_request() and write_stream_to_sds() for the two halves
+        of this function.
+
+    Example:
+        >>> clients = {'IU': Client('IRIS'), 'open': Client('IRIS')}
+        >>> request = ("IU", "ANMO", "00", "BHZ", "2020-01-01", "2020-01-02")
+        >>> archive_request(request, clients, "/data/seismic", db_manager)
+    """
+    if record_writer is not None:
+        stream_request_to_sds(request, waveform_clients, record_writer)
+        return
+
+    st = download_request(request, waveform_clients)
+    if not st:
+        return
+
+    if write_buffer is not None:
+        write_buffer.add(st)
+        return
+
+    to_insert_db = write_stream_to_sds(st, sds_path, index_records)
+
+    # Update database
+    try:
+        with _db_write_lock:
+            num_inserted = db_manager.bulk_insert_archive_data(to_insert_db)
+    except Exception as e:
+        print("! Error with bulk_insert_archive_data:", e)
+
+
+def _write_day_stream(full_path: str, day_stream: Stream,
+                      index_records: bool = False) -> List[Tuple[str, str, str, str, str, str]]:
+    """
+    Merge a day's worth of traces into an SDS day file and write it to disk.
+
+    Args:
+        full_path: Full path of the SDS day file.
+        day_stream: Traces belonging to this day file.
+        index_records: Also write the sidecar record index of the file.
+
+    Returns:
+        List of database elements describing the written file, or an empty
+        list if nothing could be written.
+    """
+    to_insert_db = []
+    if os.path.exists(full_path):
+        try:
+            existing_st = streamread(full_path)
+            existing_st += day_stream
+            existing_st.merge(method=-1, fill_value=None)
+            existing_st._cleanup(misalignment_threshold=0.25)
+            if existing_st:
+                print(f"  ... Merging {full_path}")
+        except Exception as e:
+            print(f"! Could not read {full_path}:\n {e}")
+            return to_insert_db
+    else:
+        existing_st = day_stream
+        if existing_st:
+            print(f"  ... Writing {full_path}")
+
+    existing_st = Stream([tr for tr in existing_st if len(tr.data) > 0])
+
+    if existing_st:
+        try:
+            # Try STEIM2 compression first
+            existing_st.write(full_path, format="MSEED", encoding='STEIM2')
+            to_insert_db.extend(stream_to_db_elements(existing_st))
+        except Exception as e:
+            if "Wrong dtype" in str(e):
+                # Fall back to uncompressed format
+                print("Data type not compatible with STEIM2, attempting uncompressed format...")
                 try:
-                    st += wc.get_waveforms(
-                        station=s,
-                        **{k: v for k, v in kwargs.items() if k != 'station'}
-                    )
+                    existing_st.write(full_path, format="MSEED")
+                    to_insert_db.extend(stream_to_db_elements(existing_st))
                 except Exception as e:
-                    if 'code: 204' in str(e):
-                        print(f"\n        No data for station {s}")
-                    else:
-                        print(f"Unusual error fetching data for station {s}:\n {str(e)}")
+                    print(f"Failed to write uncompressed MSEED to {full_path}:\n {e}")
+            else:
+                print(f"Failed to write {full_path}:\n {e}")
+
+    if to_insert_db and index_records:
+        _index_day_file(full_path)
+
+    return to_insert_db
+
+
+def _index_day_file(full_path: str):
+    """Write the sidecar record index of a day file. Failing to do so isn't fatal."""
+    try:
+        write_record_index(full_path)
+    except Exception as e:
+        print(f"! Could not index records of {full_path}:\n {e}")
+
+
+class SDSWriteBuffer:
+    """
+    Write-behind buffer for SDS day files.
+
+    Collects downloaded traces across requests, keyed by the day file they
+    belong to (year, doy, net, sta, loc, cha). When flushed, each day file is
+    read, merged and written exactly once, and all resulting segments go to
+    the database in a single bulk_insert_archive_data() call. The buffer
+    flushes itself whenever it grows beyond max_buffer_mb.
+
+    Safe to use from several download threads at once.
+
+    Attributes:
+        sds_path (str): Root path of the SDS archive.
+        db_manager (DatabaseManager): Database to record written segments in.
+        max_bytes (int): Memory ceiling that triggers an automatic flush.
+        index_records (bool): Write the sidecar record index of each day file.
+
+    Example:
+        >>> buffer = SDSWriteBuffer("/data/SDS", db_manager, max_buffer_mb=256)
+        >>> for request in requests:
+        ...     archive_request(request, clients, "/data/SDS", db_manager, write_buffer=buffer)
+        >>> buffer.flush()
+    """
+
+    def __init__(self, sds_path: str, db_manager: DatabaseManager, max_buffer_mb: float = 256,
+                 index_records: bool = False):
+        self.sds_path = sds_path
+        self.db_manager = db_manager
+        self.max_bytes = int(max_buffer_mb * 1024**2)
+        self.index_records = index_records
+        self._traces_by_day = defaultdict(Stream)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._traces_by_day)
+
+    @property
+    def nbytes(self) -> int:
+        """Amount of waveform data currently held in the buffer."""
+        return self._nbytes
+
+    def add(self, st: Stream):
+        """
+        Add a downloaded stream to the buffer, flushing if the memory ceiling is reached.
+
+        Args:
+            st: Stream of downloaded traces.
+        """
+        traces_by_day = split_stream_by_day(st)
+        with self._lock:
+            for day_key, day_stream in traces_by_day.items():
+                self._traces_by_day[day_key] += day_stream
+                self._nbytes += sum(tr.data.nbytes for tr in day_stream)
+            over_limit = self._nbytes >= self.max_bytes
+
+        if over_limit:
+            print(f"  ... Write buffer full ({self._nbytes / 1024**2:.1f} MB), flushing")
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all buffered day files to the archive and record them in the database.
+
+        Returns:
+            int: Number of day files written.
+        """
+        with self._lock:
+            traces_by_day = self._traces_by_day
+            self._traces_by_day = defaultdict(Stream)
+            self._nbytes = 0
+
+        if not traces_by_day:
+            return 0
+
+        to_insert_db = []
+        for day_key, day_stream in sorted(traces_by_day.items()):
+            full_path = _sds_day_file(self.sds_path, day_key)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+            # Pieces may come from different requests
+            if len(day_stream) > 1:
+                day_stream.merge(method=-1, fill_value=None)
+
+            with _get_sds_file_lock(full_path):
+                to_insert_db.extend(_write_day_stream(full_path, day_stream, self.index_records))
+
+        try:
+            with _db_write_lock:
+                self.db_manager.bulk_insert_archive_data(to_insert_db)
+        except Exception as e:
+            print("! Error with bulk_insert_archive_data:", e)
+
+        return len(traces_by_day)
+
+
+class SDSRecordWriter:
+    """
+    Route raw miniSEED records from dataselect responses into SDS day files.
+
+    Downloads are never decoded into Streams: each record is assigned to a day
+    file from its header alone and buffered as bytes. On flush, records for a
+    day file that doesn't exist yet (or was created by this writer) are simply
+    appended, minus records already written (dataselect returns the record at
+    a boundary between two requests with both of them). Records for a
+    pre-existing day file, or that overlap records of a created one without
+    being identical, are decoded, merged and re-encoded (see
+    _write_day_stream). The buffer flushes itself whenever it
+    grows beyond max_buffer_mb, which bounds the memory used on top of the
+    response currently being received.
+
+    Safe to use from several download threads at once; each response is fed
+    through its own sink (see open_sink).
+
+    Attributes:
+        sds_path (str): Root path of the SDS archive.
+        db_manager (DatabaseManager): Database to record written segments in.
+        max_bytes (int): Memory ceiling that triggers an automatic flush.
+        index_records (bool): Write the sidecar record index of each day file.
+
+    Example:
+        >>> writer = SDSRecordWriter("/data/SDS", db_manager, max_buffer_mb=64)
+        >>> for request in requests:
+        ...     archive_request(request, clients, "/data/SDS", db_manager, record_writer=writer)
+        >>> writer.flush()
+    """
+
+    def __init__(self, sds_path: str, db_manager: DatabaseManager, max_buffer_mb: float = 64,
+                 index_records: bool = False):
+        self.sds_path = sds_path
+        self.db_manager = db_manager
+        self.max_bytes = int(max_buffer_mb * 1024**2)
+        self.index_records = index_records
+        self._records_by_day = defaultdict(list)
+        self._headers_by_day = defaultdict(list)
+        self._nbytes = 0
+        self._created = set()
+        # (start time, end time, samples) of the records written to each created day file
+        self._written = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records_by_day)
+
+    @property
+    def nbytes(self) -> int:
+        """Amount of miniSEED data currently held in the buffer."""
+        return self._nbytes
+
+    def open_sink(self) -> "_RecordSink":
+        """A file-like object to pass as `filename` to ObsPy's get_waveforms(_bulk)."""
+        return _RecordSink(self)
+
+    def add_records(self, buf, records: List[Tuple[int, RecordHeader]]):
+        """
+        Add complete records to the buffer, flushing if the memory ceiling is reached.
+
+        Args:
+            buf: Buffer holding the records.
+            records: (offset, header) of each record, see mseed.iter_records().
+        """
+        with self._lock:
+            for offset, header in records:
+                day_key = (header.year, header.doy, header.network,
+                           header.station, header.location, header.channel)
+                self._records_by_day[day_key].append(bytes(buf[offset:offset + header.record_length]))
+                self._headers_by_day[day_key].append(header)
+                self._nbytes += header.record_length
+            over_limit = self._nbytes >= self.max_bytes
+
+        if over_limit:
+            print(f"  ... Record buffer full ({self._nbytes / 1024**2:.1f} MB), flushing")
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all buffered records to the archive and record them in the database.
+
+        Returns:
+            int: Number of day files written.
+        """
+        with self._lock:
+            records_by_day, self._records_by_day = self._records_by_day, defaultdict(list)
+            headers_by_day, self._headers_by_day = self._headers_by_day, defaultdict(list)
+            self._nbytes = 0
+
+        if not records_by_day:
+            return 0
+
+        to_insert_db = []
+        for day_key in sorted(records_by_day):
+            full_path = _sds_day_file(self.sds_path, day_key)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            records, headers = records_by_day[day_key], headers_by_day[day_key]
+
+            with _get_sds_file_lock(full_path):
+                if full_path in self._created or not os.path.exists(full_path):
+                    records, headers, overlap = self._new_records(full_path, records, headers)
+                    if not records:
+                        continue
+                else:
+                    overlap = True
+
+                if overlap:
+                    # Existing data: decode, merge and re-encode
+                    try:
+                        day_stream = streamread(io.BytesIO(b''.join(records)), format="MSEED")
+                        # Records of the batch may overlap each other as well
+                        day_stream.merge(method=-1, fill_value=None)
+                    except Exception as e:
+                        print(f"! Could not read downloaded records for {full_path}:\n {e}")
+                        continue
+                    to_insert_db.extend(_write_day_stream(full_path, day_stream, self.index_records))
+                    # Rewritten by ObsPy, from now on merged like any pre-existing file
+                    self._created.discard(full_path)
+                    self._written.pop(full_path, None)
+                    continue
+
+                if full_path not in self._created:
+                    print(f"  ... Writing {full_path}")
+                with open(full_path, 'ab') as f:
+                    f.write(b''.join(records))
+                self._created.add(full_path)
+                self._written[full_path].update(_record_key(h) for h in headers)
+                if self.index_records:
+                    _index_day_file(full_path)
+
+            to_insert_db.extend(_record_spans(headers))
+
+        try:
+            with _db_write_lock:
+                self.db_manager.bulk_insert_archive_data(to_insert_db)
+        except Exception as e:
+            print("! Error with bulk_insert_archive_data:", e)
+
+        return len(records_by_day)
+
+    def _new_records(self, full_path: str, records: List[bytes], headers: List[RecordHeader]
+                     ) -> Tuple[List[bytes], List[RecordHeader], bool]:
+        """
+        Drop records a created day file (or this batch) already holds.
+
+        A record is only taken for one already held if its start time, end
+        time and number of samples all match; records that merely start at
+        the same time are kept and reported as overlapping.
+
+        Returns:
+            (records, headers, overlap): the remaining records sorted by start
+            time, and whether any of them overlaps a record of the file or of
+            the batch without being identical to it.
+        """
+        written = self._written.get(full_path, set())
+        new = {}
+        for record, header in zip(records, headers):
+            key = _record_key(header)
+            if key not in written and key not in new:
+                new[key] = (record, header)
+
+        sample_rate = max(h.sample_rate for h in headers)
+        tolerance = 0.5 / sample_rate if sample_rate > 0 else 0
+        overlap = False
+        last_end = None
+        for start, end, _ in sorted(written | set(new)):
+            if last_end is not None and start < last_end + tolerance:
+                overlap = True
+                break
+            last_end = end if last_end is None else max(last_end, end)
+
+        kept = [new[key] for key in sorted(new)]
+        return [r for r, _ in kept], [h for _, h in kept], overlap
+
+
+class _RecordSink:
+    """Receives one dataselect response, in pieces of any size, for an SDSRecordWriter."""
+
+    def __init__(self, writer: SDSRecordWriter):
+        self.writer = writer
+        self.nbytes = 0
+        self._pending = bytearray()
+
+    def write(self, data) -> int:
+        self._pending += data
+        self.nbytes += len(data)
+        records = list(iter_records(self._pending))
+        if records:
+            self.writer.add_records(self._pending, records)
+            end = records[-1][0] + records[-1][1].record_length
+            del self._pending[:end]
+        return len(data)
+
+    def close(self):
+        if self._pending:
+            print(f"! Discarding {len(self._pending)} bytes of incomplete miniSEED")
+            self._pending = bytearray()
+
+
+def _record_key(header: RecordHeader) -> Tuple[float, float, int]:
+    """What makes two records the same record: (start time, end time, samples)."""
+    return header.starttime, header.endtime, header.nsamples
+
+
+def _record_spans(headers: List[RecordHeader]) -> List[Tuple[str, str, str, str, float, float]]:
+    """Database elements for the continuous runs of a day file's records."""
+    spans = []
+    for header in sorted(headers, key=lambda h: h.starttime):
+        if header.sample_rate <= 0 or header.nsamples == 0:
+            continue
+        if spans and header.starttime <= spans[-1][5] + 1.5 / header.sample_rate:
+            spans[-1][5] = max(spans[-1][5], header.endtime)
         else:
-            st = wc.get_waveforms(**kwargs)
+            spans.append([header.network, header.station, header.location,
+                          header.channel, header.starttime, header.endtime])
+    return [tuple(span) for span in spans]
+
+
+def stream_request_to_sds(
+    request: Union[Tuple[str, str, str, str, str, str], List[Tuple[str, str, str, str, str, str]]],
+    waveform_clients: Dict[str, Client],
+    record_writer: SDSRecordWriter
+) -> int:
+    """
+    Download a request (or bulk selection) straight into an SDSRecordWriter.
+
+    The request is sent as dataselect POST lines, chunked like
+    download_selection(), and the raw response is handed to the writer
+    without being decoded.
+
+    Args:
+        request: Request tuple (possibly combined) or bulk selection.
+        waveform_clients: Dictionary mapping network codes to FDSN clients.
+            Special key 'open' is used for default client.
+        record_writer: Writer routing the records to their day files.
+
+    Returns:
+        int: Number of bytes received.
+    """
+    lines = request if isinstance(request, list) else expand_request(request)
+    bulk = []
+    for net, sta, loc, cha, t0, t1 in lines:
+        t0, t1 = UTCDateTime(t0), UTCDateTime(t1)
+        # Double check that the request range is real and not some db artifact
+        if t1 - t0 >= 1:
+            bulk.append((net.upper(), sta.upper(), loc.upper(), cha.upper(), t0, t1))
+    if not bulk:
+        return 0
+
+    time0 = time.time()
+    wc = select_waveform_client(request, waveform_clients)
+    nbytes = 0
+    for chunk in chunk_selection(bulk, BULK_MAX_BYTES, max_lines=BULK_MAX_LINES):
+        sink = record_writer.open_sink()
+        try:
+            wc.get_waveforms_bulk(chunk, filename=sink)
+        except Exception as e:
+            if 'code: 204' in str(e):
+                print(f"      ~ No data available")
+            else:
+                print(f"{str(e)}")
+        finally:
+            sink.close()
+        nbytes += sink.nbytes
+
+    if nbytes:
+        download_time = time.time() - time0
+        download_size = nbytes / 1024**2  # MB of miniSEED
+        print(f"      > Downloaded {download_size:.2f} MB @ {download_size/download_time:.2f} MB/s")
+
+    return nbytes
+
+
+def _client_key(wc: Client) -> str:
+    """Identify the data center behind a client (clients with credentials share it)."""
+    return getattr(wc, 'base_url', None) or str(id(wc))
+
+
+def _client_connection_limits(
+    waveform_clients: Dict[str, Client],
+    max_client_connections: int
+) -> Dict[str, threading.BoundedSemaphore]:
+    """One semaphore per data center, capping the simultaneous requests sent to it."""
+    client_limits = {}
+    for wc in waveform_clients.values():
+        key = _client_key(wc)
+        if key not in client_limits:
+            client_limits[key] = threading.BoundedSemaphore(max_client_connections)
+    return client_limits
+
+
+def archive_requests_concurrent(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    waveform_clients: Dict[str, Client],
+    sds_path: str,
+    db_manager: DatabaseManager,
+    num_workers: int = 4,
+    max_client_connections: int = 3,
+    stop_event: threading.Event = None,
+    write_buffer: Optional[SDSWriteBuffer] = None,
+    record_writer: Optional[SDSRecordWriter] = None,
+    index_records: bool = False
+) -> int:
+    """
+    Download and archive a list of requests using a bounded pool of worker threads.
+
+    Each request is handed to archive_request() on a worker thread. The number
+    of simultaneous downloads from any one data center (i.e. client base URL)
+    is capped separately, so that many workers do not hammer a single FDSN
+    server. Writes to the same SDS day file and database inserts are
+    serialized inside archive_request().
+
+    Args:
+        requests: List of (combined) request tuples containing
+            (network, station, location, channel, start_time, end_time)
+        waveform_clients: Dictionary mapping network codes to FDSN clients.
+            Special key 'open' is used for default client.
+        sds_path: Root path of the SDS archive.
+        db_manager: DatabaseManager instance for updating the database.
+        num_workers: Maximum number of requests in flight at once.
+        max_client_connections: Maximum number of simultaneous requests sent
+            to any single data center.
+        stop_event: Optional event flag for canceling the operation. Requests
+            that have not started yet are dropped once it is set; requests
+            already downloading are allowed to finish.
+        write_buffer: Optional SDSWriteBuffer to collect the downloaded data
+            in, rather than writing each request out immediately.
+        record_writer: Optional SDSRecordWriter to stream the raw downloads
+            into, see archive_request().
+        index_records: Write the sidecar record index of each day file
+            written, see archive_request().
+
+    Returns:
+        int: Number of requests that were attempted.
+
+    Example:
+        >>> clients = {'open': Client('IRIS')}
+        >>> archive_requests_concurrent(requests, clients, "/data/SDS", db_manager,
+        ...                             num_workers=8)
+    """
+    if not requests:
+        return 0
+
+    num_workers = max(1, min(num_workers, len(requests)))
+    max_client_connections = max(1, max_client_connections or 1)
+
+    client_limits = _client_connection_limits(waveform_clients, max_client_connections)
+
+    def _worker(request):
+        if stop_event and stop_event.is_set():
+            return False
+        wc = select_waveform_client(request, waveform_clients)
+        with client_limits[_client_key(wc)]:
+            # Re-check, we may have been waiting a while for a free slot
+            if stop_event and stop_event.is_set():
+                return False
+            print(f"  Requesting: {describe_request(request)}")
+            archive_request(request, waveform_clients, sds_path, db_manager,
+                            write_buffer=write_buffer, record_writer=record_writer,
+                            index_records=index_records)
+        return True
+
+    num_attempted = 0
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {executor.submit(_worker, request): request for request in requests}
+        for future in as_completed(futures):
+            try:
+                if future.result():
+                    num_attempted += 1
+            except Exception as e:
+                print(f"Request not successful: {futures[future]} with exception:\n {e}")
+
+            if stop_event and stop_event.is_set():
+                # Drop anything not yet started, let the running downloads finish
+                for f in futures:
+                    f.cancel()
+
+    return num_attempted
+
+
+class _ByteBudget:
+    """
+    Blocking byte counter used as backpressure between pipeline stages.
+
+    acquire() waits until the requested number of bytes fits under the limit.
+    A single item larger than the whole budget is still let through when
+    nothing else is buffered, so the pipeline can never deadlock.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int, stop_event: threading.Event = None) -> bool:
+        with self._cond:
+            while self.used > 0 and self.used + nbytes > self.max_bytes:
+                if stop_event and stop_event.is_set():
+                    return False
+                self._cond.wait(timeout=0.5)
+            self.used += nbytes
+            return True
+
+    def release(self, nbytes: int):
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+
+class _StageStats:
+    """Thread-safe byte and busy-time counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nbytes = 0
+        self.busy = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, nbytes: int, seconds: float):
+        with self._lock:
+            self.nbytes += nbytes
+            self.busy += seconds
+            self.count += 1
+
+    def report(self, wall_time: float) -> str:
+        mb = self.nbytes / 1024**2
+        rate = mb / wall_time if wall_time > 0 else 0.0
+        busy_pct = 100 * self.busy / wall_time if wall_time > 0 else 0.0
+        return (f"{self.name:>6}: {self.count:5d} items, {mb:9.2f} MB @ {rate:7.2f} MB/s "
+                f"(busy {busy_pct:5.1f}% of wall time)")
+
+
+def archive_requests_pipelined(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    waveform_clients: Dict[str, Client],
+    sds_path: str,
+    db_manager: DatabaseManager,
+    num_workers: int = 4,
+    max_client_connections: int = 3,
+    max_buffer_mb: float = 512,
+    stop_event: threading.Event = None,
+    write_buffer: Optional[SDSWriteBuffer] = None,
+    index_records: bool = False
+) -> Tuple[_StageStats, _StageStats]:
+    """
+    Download and archive requests with separate fetch and write stages.
 
-        # Log download statistics
-        download_time = time.time() - time0
-        download_size = sum(tr.data.nbytes for tr in st) / 1024**2  # MB
-        print(f"      > Downloaded {download_size:.2f} MB @ {download_size/download_time:.2f} MB/s")
+    A pool of fetcher threads downloads requests and puts the resulting
+    Streams on a queue. A single writer thread takes them off the queue,
+    splits them by day, merges them into the SDS archive and updates the
+    database. This keeps the network busy while miniSEED encoding runs, and
+    vice versa. Fetchers block once max_buffer_mb of downloaded data is
+    waiting to be written. A blocked fetcher still holds the Stream it
+    downloaded, so memory use peaks at max_buffer_mb plus one response per
+    fetcher (num_workers).
 
-    except Exception as e:
-        if 'code: 204' in str(e):
-            print(f"      ~ No data available")
-        else:
-            print(f"{str(e)}")
-        return
+    Throughput of both stages is printed at the end, so it is easy to tell
+    whether the network or the disk is the bottleneck: the stage that is
+    busy close to 100% of the time is the limiting one.
 
-    # Group traces by day
-    traces_by_day = defaultdict(Stream)
-    
-    for tr in st:
-        net = tr.stats.network
-        sta = tr.stats.station
-        loc = tr.stats.location
-        cha = tr.stats.channel
-        starttime = tr.stats.starttime
-        endtime = tr.stats.endtime
+    Args:
+        requests: List of (combined) request tuples containing
+            (network, station, location, channel, start_time, end_time)
+        waveform_clients: Dictionary mapping network codes to FDSN clients.
+            Special key 'open' is used for default client.
+        sds_path: Root path of the SDS archive.
+        db_manager: DatabaseManager instance for updating the database.
+        num_workers: Number of fetcher threads.
+        max_client_connections: Maximum number of simultaneous requests sent
+            to any single data center.
+        max_buffer_mb: Maximum amount of downloaded data (in MB) waiting in
+            the queue for the writer, not counting the responses of fetchers
+            waiting to queue theirs.
+        stop_event: Optional event flag for canceling the operation. Pending
+            downloads are dropped, data already queued is still written.
+        write_buffer: Optional SDSWriteBuffer. If given, the writer stage
+            hands data to the buffer instead of writing it out immediately.
+        index_records: Write the sidecar record index of each day file
+            written, see write_stream_to_sds().
 
-        # Handle trace start leaking into previous day
-        day_boundary = UTCDateTime(starttime.date + timedelta(days=1))
-        if (day_boundary - starttime) <= tr.stats.delta:
-            starttime = day_boundary
-        
-        current_time = UTCDateTime(starttime.date)
-        while current_time < endtime:
-            year = current_time.year
-            doy = current_time.julday
-            
-            next_day = current_time + 86400
-            day_end = min(next_day - tr.stats.delta, endtime)
-            
-            day_tr = tr.slice(current_time, day_end, nearest_sample=True)
-            day_key = (year, doy, net, sta, loc, cha)
-            traces_by_day[day_key] += day_tr
-            
-            current_time = next_day
+    Returns:
+        Tuple of (fetch, write) stage statistics.
+    """
+    fetch_stats = _StageStats("fetch")
+    write_stats = _StageStats("write")
+    if not requests:
+        return fetch_stats, write_stats
 
-    # Process each day's data
-    to_insert_db = []
-    for (year, doy, net, sta, loc, cha), day_stream in traces_by_day.items():
-        full_sds_path = os.path.join(sds_path, str(year), net, sta, f"{cha}.D")
-        filename = f"{net}.{sta}.{loc}.{cha}.D.{year}.{doy:03d}"
-        full_path = os.path.join(full_sds_path, filename)
-        
-        os.makedirs(full_sds_path, exist_ok=True)
-        
-        if os.path.exists(full_path):
-            try:
-                existing_st = streamread(full_path)
-                existing_st += day_stream
-                existing_st.merge(method=-1, fill_value=None)
-                existing_st._cleanup(misalignment_threshold=0.25)
-                if existing_st:
-                    print(f"  ... Merging {full_path}")
-            except Exception as e:
-                print(f"! Could not read {full_path}:\n {e}")
-                continue
-        else:
-            existing_st = day_stream
-            if existing_st:
-                print(f"  ... Writing {full_path}")
+    num_workers = max(1, min(num_workers, len(requests)))
+    max_client_connections = max(1, max_client_connections or 1)
+    budget = _ByteBudget(int(max_buffer_mb * 1024**2))
+    stream_queue = queue.Queue()
+    _DONE = object()
 
-        existing_st = Stream([tr for tr in existing_st if len(tr.data) > 0])
+    client_limits = _client_connection_limits(waveform_clients, max_client_connections)
 
-        if existing_st:
+    def _fetcher(request):
+        if stop_event and stop_event.is_set():
+            return
+        wc = select_waveform_client(request, waveform_clients)
+        with client_limits[_client_key(wc)]:
+            if stop_event and stop_event.is_set():
+                return
+            print(f"  Requesting: {describe_request(request)}")
+            t0 = time.time()
+            st = download_request(request, waveform_clients)
+        if not st:
+            return
+        nbytes = sum(tr.data.nbytes for tr in st)
+        fetch_stats.add(nbytes, time.time() - t0)
+        # Backpressure: wait here until the writer has caught up
+        if budget.acquire(nbytes, stop_event):
+            stream_queue.put((st, nbytes))
+
+    def _writer():
+        while True:
+            item = stream_queue.get()
+            if item is _DONE:
+                return
+            st, nbytes = item
+            t0 = time.time()
             try:
-                # Try STEIM2 compression first
-                existing_st.write(full_path, format="MSEED", encoding='STEIM2')
-                to_insert_db.extend(stream_to_db_elements(existing_st))
-            except Exception as e:
-                if "Wrong dtype" in str(e):
-                    # Fall back to uncompressed format
-                    print("Data type not compatible with STEIM2, attempting uncompressed format...")
-                    try:
-                        existing_st.write(full_path, format="MSEED")
-                        to_insert_db.extend(stream_to_db_elements(existing_st))
-                    except Exception as e:
-                        print(f"Failed to write uncompressed MSEED to {full_path}:\n {e}")
+                if write_buffer is not None:
+                    write_buffer.add(st)
                 else:
-                    print(f"Failed to write {full_path}:\n {e}")
+                    to_insert_db = write_stream_to_sds(st, sds_path, index_records)
+                    with _db_write_lock:
+                        db_manager.bulk_insert_archive_data(to_insert_db)
+            except Exception as e:
+                print(f"! Error writing downloaded data:\n {e}")
+            finally:
+                write_stats.add(nbytes, time.time() - t0)
+                budget.release(nbytes)
+                del st
+
+    wall0 = time.time()
+    writer = threading.Thread(target=_writer, name="sds-writer", daemon=True)
+    writer.start()
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {executor.submit(_fetcher, request): request for request in requests}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Request not successful: {futures[future]} with exception:\n {e}")
+            if stop_event and stop_event.is_set():
+                for f in futures:
+                    f.cancel()
 
-    # Update database
-    try:
-        num_inserted = db_manager.bulk_insert_archive_data(to_insert_db)
-    except Exception as e:
-        print("! Error with bulk_insert_archive_data:", e)
+    stream_queue.put(_DONE)
+    writer.join()
+    wall_time = time.time() - wall0
+
+    print("\n  Pipeline throughput:")
+    print("    " + fetch_stats.report(wall_time))
+    print("    " + write_stats.report(wall_time))
+
+    return fetch_stats, write_stats
+
+
+def archive_requests_parallel(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    waveform_clients: Dict[str, Client],
+    settings: SeismoLoaderSettings,
+    db_manager: DatabaseManager,
+    stop_event: threading.Event = None,
+    write_buffer: Optional[SDSWriteBuffer] = None,
+    record_writer: Optional[SDSRecordWriter] = None
+) -> None:
+    """
+    Archive requests concurrently, using the strategy selected in settings.processing.
+
+    Uses archive_requests_pipelined() if processing.pipeline_downloads is set,
+    otherwise archive_requests_concurrent(). Streaming into a record_writer
+    has no separate writer stage, so it always uses archive_requests_concurrent().
+    """
+    kwargs = {
+        'num_workers': get_num_download_workers(settings),
+        'max_client_connections': settings.processing.max_client_connections,
+        'stop_event': stop_event,
+        'write_buffer': write_buffer,
+        'index_records': settings.processing.record_index,
+    }
+    if settings.processing.pipeline_downloads and record_writer is None:
+        archive_requests_pipelined(requests, waveform_clients, settings.sds_path,
+                                   db_manager, max_buffer_mb=settings.processing.pipeline_buffer_mb or 512,
+                                   **kwargs)
+    else:
+        archive_requests_concurrent(requests, waveform_clients, settings.sds_path,
+                                    db_manager, record_writer=record_writer, **kwargs)
+
+
+def get_num_download_workers(settings: SeismoLoaderSettings) -> int:
+    """
+    Number of concurrent download workers to use, from settings.processing.num_processes.
+
+    A value of 0 (or None) means "auto", i.e. the number of available CPUs.
+    """
+    num_processes = settings.processing.num_processes if settings.processing else None
+    if num_processes is None or num_processes <= 0:
+        num_processes = os.cpu_count() or 1
+    return num_processes
 
 
 # MAIN RUN FUNCTIONS
@@ -1033,7 +2301,7 @@ def setup_paths(settings: SeismoLoaderSettings) -> Tuple[SeismoLoaderSettings, D
     Returns:
         Tuple containing:
             - Updated settings with validated paths
-            - Initialized DatabaseManager instance
+            - Initialized DatabaseManager instance, to close() when done with it
 
     Raises:
         ValueError: If SDS path is not set in settings.
@@ -1508,7 +2776,15 @@ def run_continuous(settings: SeismoLoaderSettings, stop_event: threading.Event =
     print("Running run_continuous\n----------------------")
     
     settings, db_manager = setup_paths(settings)
+    try:
+        return _run_continuous(settings, db_manager, stop_event)
+    finally:
+        db_manager.close()
+
 
+def _run_continuous(settings: SeismoLoaderSettings, db_manager: DatabaseManager,
+                    stop_event: threading.Event = None):
+    """Body of run_continuous(), with the database already open."""
     starttime = UTCDateTime(settings.station.date_config.start_time)
     endtime = UTCDateTime(settings.station.date_config.end_time)
     waveform_client = Client(settings.waveform.client)
@@ -1547,34 +2823,50 @@ def run_continuous(settings: SeismoLoaderSettings, stop_event: threading.Event =
         return None
 
     # Combine these into fewer (but larger) requests
-    combined_requests = combine_requests(pruned_requests)
+    combined_requests = plan_requests(pruned_requests, settings)
+
+    waveform_clients = get_waveform_clients(settings, waveform_client, combined_requests)
+
+    write_buffer = None
+    record_writer = None
+    if settings.processing.stream_buffer_mb:
+        # Route raw miniSEED records to their day files without decoding them
+        record_writer = SDSRecordWriter(settings.sds_path, db_manager,
+                                        max_buffer_mb=settings.processing.stream_buffer_mb,
+                                        index_records=settings.processing.record_index)
+    elif settings.processing.write_buffer_mb:
+        # Collect day files across requests so each is only written once (0 = off)
+        write_buffer = SDSWriteBuffer(settings.sds_path, db_manager,
+                                      max_buffer_mb=settings.processing.write_buffer_mb,
+                                      index_records=settings.processing.record_index)
+    held_back = write_buffer if write_buffer is not None else record_writer
 
-    waveform_clients= {'open':waveform_client} #now a dictionary
-    requested_networks = [ele[0] for ele in combined_requests]
+    # Archive to disk and updated database
+    num_workers = get_num_download_workers(settings)
+    if (num_workers > 1 or settings.processing.pipeline_downloads) and len(combined_requests) > 1:
+        archive_requests_parallel(combined_requests, waveform_clients,
+                                  settings, db_manager, stop_event, write_buffer,
+                                  record_writer=record_writer)
 
-    # May only work for network-wide credentials at the moment (99% use case)
-    for cred in settings.auths:
-        cred_net = cred.nslc_code.split('.')[0].upper()
-        if cred_net not in requested_networks:
-            continue
-        try:
-            new_client = Client(settings.waveform.client, 
-                user=cred.username.upper(), password=cred.password)
-            waveform_clients.update({cred_net:new_client})
-        except:
-            print("Issue creating client: %s %s via %s:%s" % (settings.waveform.client, 
-                cred.nslc_code, cred.username, cred.password))
-            continue
+        if stop_event and stop_event.is_set():
+            print("Run cancelled!")
+            if held_back is not None:
+                held_back.flush()
+            db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
+            return True
+
+        combined_requests = [] # all done
 
-    # Archive to disk and updated database
     for request in combined_requests:
         print(" ")    
-        print("Requesting: ", request)
+        print("Requesting: ", describe_request(request))
         time.sleep(0.05) # to help ctrl-C out if needed
         try:
-            archive_request(request, waveform_clients, settings.sds_path, db_manager)
+            archive_request(request, waveform_clients, settings.sds_path, db_manager,
+                            write_buffer=write_buffer, record_writer=record_writer,
+                            index_records=settings.processing.record_index)
         except Exception as e:
-            print(f"Continuous request not successful: {request} with exception:\n {e}")
+            print(f"Continuous request not successful: {describe_request(request)} with exception:\n {e}")
             continue
 
         # Check for cancellation before each individual request
@@ -1583,12 +2875,18 @@ def run_continuous(settings: SeismoLoaderSettings, stop_event: threading.Event =
         # This is the only time consuming step so probably the only sensible place for a cancel break
         if stop_event and stop_event.is_set():
             print("Run cancelled!")
-            db_manager.join_continuous_segments(settings.processing.gap_tolerance)
+            if held_back is not None:
+                held_back.flush()
+            db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
             return True
 
+    # Write out anything still held back
+    if held_back is not None:
+        held_back.flush()
+
     # Cleanup the database
     try:
-        db_manager.join_continuous_segments(settings.processing.gap_tolerance)
+        db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
     except Exception as e:
         print(f"! Error with join_continuous_segments:\n {e}")
 
@@ -1596,6 +2894,353 @@ def run_continuous(settings: SeismoLoaderSettings, stop_event: threading.Event =
 
 
 
+# Per-process state of the travel time workers used by collect_requests_events()
+_event_worker_state = {}
+
+
+def _init_event_worker(settings: SeismoLoaderSettings):
+    """Load settings and the travel time model once per worker process."""
+    _event_worker_state['settings'] = settings
+    _event_worker_state['model'] = get_travel_time_model(settings)
+
+
+def _collect_requests_event_worker(eq: Event):
+    settings = _event_worker_state['settings']
+    model = _event_worker_state['model']
+    try:
+        result = collect_requests_event(eq, settings.station.selected_invs,
+                                        model=model, settings=settings)
+    except Exception as e:
+        print(f"Issue running collect_requests_event for {eq.resource_id}:\n {e}")
+        return None
+    if isinstance(model, TravelTimeTable):
+        model.save()  # merged with what the other workers saved
+    return result
+
+
+def collect_requests_events(
+    events: List[Event],
+    settings: SeismoLoaderSettings,
+    num_processes: int = 2,
+    stop_event: threading.Event = None
+) -> List[Optional[Tuple[List[Tuple], List[Tuple], Dict[str, float]]]]:
+    """
+    Run collect_requests_event() for many events in a process pool.
+
+    Travel time calculations are CPU bound, so several events are handled at
+    once in separate processes. An event that fails is reported and skipped.
+    If the pool can't be started or breaks (common on OSX and Windows, or under
+    Streamlit), the events it didn't handle are run in this process instead.
+
+    Args:
+        events: Events to collect requests for.
+        settings: SeismoLoaderSettings object containing configuration.
+        num_processes: Number of worker processes.
+        stop_event: Optional event flag for canceling; remaining events are skipped.
+
+    Returns:
+        List with the (requests, new_arrivals, p_arrivals) result of
+        collect_requests_event() for each event, in order. None for events
+        that failed or were skipped after cancelling.
+    """
+    results = [None] * len(events)
+    attempted = set()
+
+    if num_processes > 1 and len(events) > 1:
+        pool_error = None
+        try:
+            with ProcessPoolExecutor(max_workers=num_processes,
+                                     initializer=_init_event_worker,
+                                     initargs=(settings,)) as executor:
+                futures = {executor.submit(_collect_requests_event_worker, eq): i
+                           for i, eq in enumerate(events)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                        attempted.add(i)
+                    except BrokenExecutor as e:
+                        pool_error = e  # not this event's fault, retried below
+                    except Exception as e:
+                        attempted.add(i)
+                        print(f"Issue running collect_requests_event for {events[i].resource_id}:\n {e}")
+                    if stop_event and stop_event.is_set():
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+        except Exception as e:
+            pool_error = e
+
+        if pool_error is None or (stop_event and stop_event.is_set()):
+            return results
+        print(f"Multiprocessing failed: {str(pool_error)}. Falling back to single-process execution "
+              f"for {len(events) - len(attempted)} events.")
+
+    ttmodel = get_travel_time_model(settings)
+    for i, eq in enumerate(events):
+        if stop_event and stop_event.is_set():
+            break
+        if i in attempted:
+            continue
+        try:
+            results[i] = collect_requests_event(eq, settings.station.selected_invs,
+                                                model=ttmodel, settings=settings)
+        except Exception as e:
+            print(f"Issue running collect_requests_event for {eq.resource_id}:\n {e}")
+    if isinstance(ttmodel, TravelTimeTable):
+        ttmodel.save()
+
+    return results
+
+
+def get_waveform_clients(
+    settings: SeismoLoaderSettings,
+    waveform_client: Client,
+    requests: List[Tuple[str, str, str, str, str, str]]
+) -> Dict[str, Client]:
+    """
+    Waveform clients for a set of requests: the open client plus one
+    authenticated client per credential (network or net.sta, see
+    credential_key) of a requested network.
+
+    Args:
+        settings: SeismoLoaderSettings object containing client and credentials.
+        waveform_client: Client for open data.
+        requests: Requests that are about to be archived.
+
+    Returns:
+        Dict[str, Client]: Clients keyed by network (or net.sta) code, and 'open'.
+    """
+    waveform_clients = {'open': waveform_client}
+    requested_networks = set(line[0] for req in requests for line in request_lines(req))
+
+    for cred in settings.auths:
+        cred_key = credential_key(cred.nslc_code)
+        if cred_key.split('.')[0] not in requested_networks:
+            continue
+        try:
+            new_client = Client(
+                settings.waveform.client,
+                user=cred.username.upper(),
+                password=cred.password
+            )
+            waveform_clients[cred_key] = new_client
+        except Exception as e:
+            print(f"Issue creating client for {cred_key}:\n {str(e)}")
+
+    return waveform_clients
+
+
+def load_event_traces(
+    eq: Event,
+    requests: List[Tuple[str, str, str, str, str, str]],
+    settings: SeismoLoaderSettings,
+    db_manager: DatabaseManager,
+    availability: Optional[AvailabilityIndex] = None
+) -> Tuple[Stream, dict]:
+    """
+    Read the archived data of an event and annotate it with event metadata.
+
+    All requests are read in one go with get_local_waveforms_bulk(), which
+    opens each day file once.
+
+    Args:
+        eq: The event.
+        requests: The (unpruned) requests of the event.
+        settings: SeismoLoaderSettings object containing configuration.
+        db_manager: DatabaseManager with the event's arrivals.
+        availability: Optional index of the archive, up to date with the event's
+            downloads. If None, one is loaded for the event's networks and time span.
+
+    Returns:
+        Tuple containing:
+            - Stream with arrival times, distances, azimuth and event info in each trace's stats
+            - Dictionary of missing data, as returned by get_missing_from_request()
+    """
+    try:
+        event_region = eq.event_descriptions[0].text
+    except:
+        event_region = ""
+
+    event_stream = Stream()
+    if not requests:
+        return event_stream, {}
+    cached_arrivals = db_manager.fetch_arrivals_distances_bulk(eq.preferred_origin_id.id)
+    try:
+        if availability is None:
+            availability = db_manager.get_availability_index(
+                networks=[req[0] for req in requests],
+                starttime=min(UTCDateTime(req[4]) for req in requests).timestamp,
+                endtime=max(UTCDateTime(req[5]) for req in requests).timestamp)
+        event_stream = get_local_waveforms_bulk(requests, settings.sds_path, availability)
+    except Exception as e:
+        print(f"Error reading data for event {eq.resource_id.id}:\n {str(e)}")
+
+    # Add event metadata to traces
+    event_magnitude = eq.magnitudes[0].mag if hasattr(eq, 'magnitudes') and eq.magnitudes else 0.99
+    for tr in event_stream:
+        arrivals = cached_arrivals.get(f"{tr.stats.network.upper()}.{tr.stats.station.upper()}")
+        if arrivals:
+            tr.stats.resource_id = eq.resource_id.id
+            tr.stats.p_arrival = arrivals[0]
+            tr.stats.s_arrival = arrivals[1]
+            tr.stats.distance_km = arrivals[2]
+            tr.stats.distance_deg = arrivals[3]
+            tr.stats.azimuth = arrivals[4]
+            tr.stats.event_magnitude = event_magnitude
+            tr.stats.event_region = event_region
+            tr.stats.event_time = eq.origins[0].time
+
+    # Now attempt to keep track of what data was missing. 
+    # Note that this is not catching out-of-bounds data, for better or worse (probably better)
+    missing = {}
+    if event_stream:
+        try: 
+            missing = get_missing_from_request(db_manager, eq.resource_id.id, requests, event_stream)
+        except Exception as e:
+            print("get_missing_from_request issue:", e)
+
+    return event_stream, missing
+
+
+def run_event_parallel(settings: SeismoLoaderSettings, stop_event: threading.Event = None):
+    """
+    Multi-event version of run_event(), used when processing.parallel_events > 1
+    or processing.coalesce_slack_sec is set.
+
+    Instead of handling one event at a time:
+    1. Requests and travel times of all events are computed in a process pool
+       of processing.parallel_events workers
+    2. New arrivals are stored and all requests are pruned against the archive at once
+    3. Overlapping windows of the same channel across events are merged, within
+       processing.coalesce_slack_sec (see coalesce_requests)
+    4. All events' downloads go through one shared bounded worker pool
+       (see archive_requests_parallel)
+    5. Each event's data is read back from the archive and annotated
+
+    Cancellation via stop_event is checked between these stages, between
+    downloads, and between events when reading back.
+
+    Args:
+        settings: SeismoLoaderSettings object containing configuration.
+        stop_event: Optional event flag for canceling the operation mid-execution.
+
+    Returns:
+        Same as run_event(): (all_event_traces, all_missing), or None if no data.
+    """
+    settings, db_manager = setup_paths(settings)
+    try:
+        return _run_event_parallel(settings, db_manager, stop_event)
+    finally:
+        db_manager.close()
+
+
+def _run_event_parallel(settings: SeismoLoaderSettings, db_manager: DatabaseManager,
+                        stop_event: threading.Event = None):
+    """Body of run_event_parallel(), with the database already open."""
+    waveform_client = Client(settings.waveform.client)
+    events = list(settings.event.selected_catalogs)
+
+    all_event_traces = []
+    all_missing = {}
+
+    def finish():
+        try:
+            print("\n~~ Cleaning up database ~~")
+            db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
+        except Exception as e:
+            print(f"! Error with join_continuous_segments: {str(e)}")
+
+        if all_event_traces:
+            return all_event_traces, all_missing
+        else:
+            return None
+
+    print(f"Collecting requests for {len(events)} events with "
+          f"{settings.processing.parallel_events} processes")
+    collected = collect_requests_events(events, settings,
+                                        num_processes=settings.processing.parallel_events,
+                                        stop_event=stop_event)
+
+    if stop_event and stop_event.is_set():
+        print("\nCancelling run_event!")
+        return finish()
+
+    # Update arrival database
+    new_arrivals = [arr for result in collected if result for arr in result[1]]
+    if new_arrivals:
+        try:
+            db_manager.bulk_insert_arrival_data(new_arrivals)
+        except Exception as e:
+            print(f"Issue with run_event > bulk_insert_arrival_data:\n",{e})
+
+    # Process data requests of all events at once
+    all_requests = [req for result in collected if result for req in result[0]]
+    if settings.waveform.force_redownload:
+        print("Forcing re-download as requested...")
+        pruned_requests = all_requests
+    else:
+        try:
+            pruned_requests = prune_requests(all_requests, db_manager, settings.sds_path)
+        except Exception as e:
+            print(f"Issue with run_event > prune_requests:\n",{e})
+            pruned_requests = all_requests
+
+    if len(all_requests) > 0 and not pruned_requests:
+        print(f"    All data already in archive")
+
+    # Merge overlapping windows of closely spaced events into single downloads
+    if pruned_requests:
+        num_pruned = len(pruned_requests)
+        pruned_requests = coalesce_requests(pruned_requests,
+                                            slack=settings.processing.coalesce_slack_sec or 0)
+        print(f"    Coalesced {num_pruned} requests into {len(pruned_requests)}")
+
+    # Download new data through one shared worker pool
+    if pruned_requests:
+        try:
+            combined_requests = plan_requests(pruned_requests, settings)
+        except Exception as e:
+            print(f"Issue with run_event > combine_requests:\n",{e})
+            combined_requests = pruned_requests
+
+        waveform_clients = get_waveform_clients(settings, waveform_client, combined_requests)
+        archive_requests_parallel(combined_requests, waveform_clients,
+                                  settings, db_manager, stop_event)
+
+        if stop_event and stop_event.is_set():
+            print("\nCancelling run_event!")
+            return finish()
+
+    # Now load everything in from our archive, with one availability lookup for all events
+    event_requests = [req for result in collected if result for req in result[0]]
+    availability = None
+    if event_requests:
+        try:
+            availability = db_manager.get_availability_index(
+                networks=[req[0] for req in event_requests],
+                starttime=min(UTCDateTime(req[4]) for req in event_requests).timestamp,
+                endtime=max(UTCDateTime(req[5]) for req in event_requests).timestamp)
+        except Exception as e:
+            print(f"Issue loading the availability index:\n {str(e)}")
+
+    for i, (eq, result) in enumerate(zip(events, collected)):
+        if stop_event and stop_event.is_set():
+            print("\nCancelling run_event!")
+            return finish()
+        if not result:
+            continue
+
+        print(f"Loading event {i+1}/{len(events)} | {str(eq.origins[0].time)[0:16]}")
+        event_stream, missing = load_event_traces(eq, result[0], settings, db_manager, availability)
+        if event_stream:
+            all_event_traces.extend(event_stream)
+            if missing:
+                all_missing.update(missing)
+
+    # Final database cleanup
+    return finish()
+
+
 def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None):
     """
     Processes and downloads seismic event data for each event in the provided catalog using
@@ -1641,16 +3286,25 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
     - Each stream in the output includes complete event metadata for analysis
     """
     print(f"Running run_event\n-----------------")
+
+    if len(settings.event.selected_catalogs) > 1 and \
+        ((settings.processing.parallel_events or 1) > 1 or settings.processing.coalesce_slack_sec is not None):
+        return run_event_parallel(settings, stop_event)
     
     settings, db_manager = setup_paths(settings)
+    try:
+        return _run_event(settings, db_manager, stop_event)
+    finally:
+        db_manager.close()
+
+
+def _run_event(settings: SeismoLoaderSettings, db_manager: DatabaseManager,
+               stop_event: threading.Event = None):
+    """Body of run_event(), with the database already open."""
     waveform_client = Client(settings.waveform.client)
     
     # Initialize travel time model
-    try:
-        ttmodel = TauPyModel(settings.event.model)
-    except Exception as e:
-        print(f"Falling back to IASP91 model: {str(e)}")
-        ttmodel = TauPyModel('IASP91')
+    ttmodel = get_travel_time_model(settings)
 
     all_event_traces = []
     all_missing = {}
@@ -1662,7 +3316,7 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
             # stop_event.clear() # i don't think these are needed / REVIEW
             try:
                 print("\n~~ Cleaning up database ~~")
-                db_manager.join_continuous_segments(settings.processing.gap_tolerance)
+                db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
             except Exception as e:
                 print(f"! Error with join_continuous_segments: {str(e)}")
 
@@ -1694,6 +3348,9 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
         except Exception as e:
             print(f"Issue running collect_requests_event in run_event:\n {e}")
 
+        if isinstance(ttmodel, TravelTimeTable):
+            ttmodel.save()
+
         # Update arrival database
         if new_arrivals:
             try:
@@ -1717,7 +3374,7 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
         # Download new data if needed
         if pruned_requests:
             try:
-                combined_requests = combine_requests(pruned_requests)
+                combined_requests = plan_requests(pruned_requests, settings)
             except Exception as e:
                 print(f"Issue with run_event > combine_requests:\n",{e})
 
@@ -1726,36 +3383,41 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
                 continue
             
             # Setup authenticated clients
-            waveform_clients = {'open': waveform_client}
-            requested_networks = [req[0] for req in combined_requests]
-            
-            for cred in settings.auths:
-                cred_net = cred.nslc_code.split('.')[0].upper()
-                if cred_net not in requested_networks:
-                    continue
-                try:
-                    new_client = Client(
-                        settings.waveform.client,
-                        user=cred.username.upper(),
-                        password=cred.password
-                    )
-                    waveform_clients[cred_net] = new_client
-                except Exception as e:
-                    print(f"Issue creating client for {cred_net}:\n {str(e)}")
+            waveform_clients = get_waveform_clients(settings, waveform_client, combined_requests)
 
             # Process requests
+            num_workers = get_num_download_workers(settings)
+            if (num_workers > 1 or settings.processing.pipeline_downloads) and len(combined_requests) > 1:
+                archive_requests_parallel(combined_requests, waveform_clients,
+                                          settings, db_manager, stop_event)
+                combined_requests = [] # all done
+
+                if stop_event and stop_event.is_set():
+                    print("\nCancelling run_event!")
+                    try:
+                        print("\n~~ Cleaning up database ~~")
+                        db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
+                    except Exception as e:
+                        print(f"! Error with join_continuous_segments: {str(e)}")
+
+                    if all_event_traces:
+                        return all_event_traces, all_missing
+                    else:
+                        return None
+
             for request in combined_requests:
 
-                print(f"  Requesting: {request}")
+                print(f"  Requesting: {describe_request(request)}")
                 try:
                     archive_request(
                         request,
                         waveform_clients,
                         settings.sds_path,
-                        db_manager
+                        db_manager,
+                        index_records=settings.processing.record_index
                     )
                 except Exception as e:
-                    print(f"Error archiving request {request}:\n {str(e)}")
+                    print(f"Error archiving request {describe_request(request)}:\n {str(e)}")
                     continue
 
                 if stop_event and stop_event.is_set():
@@ -1763,7 +3425,7 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
                     # ? stop_event.clear()
                     try:
                         print("\n~~ Cleaning up database ~~")
-                        db_manager.join_continuous_segments(settings.processing.gap_tolerance)
+                        db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
                     except Exception as e:
                         print(f"! Error with join_continuous_segments: {str(e)}")
 
@@ -1773,49 +3435,9 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
                         return None
 
         # Now load everything in from our archive
-        event_stream = Stream()
-        for request in requests:
-            try:
-                st = get_local_waveform(request, settings)
-                if st:
-                    # Add event metadata to traces
-                    arrivals = db_manager.fetch_arrivals_distances(
-                        eq.preferred_origin_id.id,
-                        request[0].upper(), # network
-                        request[1].upper()  # station
-                        )
-                    
-                    if arrivals:
-                        for tr in st:
-                            tr.stats.resource_id = eq.resource_id.id
-                            tr.stats.p_arrival = arrivals[0]
-                            tr.stats.s_arrival = arrivals[1]
-                            tr.stats.distance_km = arrivals[2]
-                            tr.stats.distance_deg = arrivals[3]
-                            tr.stats.azimuth = arrivals[4]
-                            tr.stats.event_magnitude = eq.magnitudes[0].mag if hasattr(eq, 'magnitudes') and eq.magnitudes else 0.99
-                            tr.stats.event_region = event_region
-                            tr.stats.event_time = eq.origins[0].time
-                    
-                    event_stream.extend(st)
-
-
-            except Exception as e:
-                print(f"Error reading data for {request[0].upper()}.{request[1].upper()}:\n {str(e)}")
-                continue
-
-
-        # Now attempt to keep track of what data was missing. 
-        # Note that this is not catching out-of-bounds data, for better or worse (probably better)
+        event_stream, missing = load_event_traces(eq, requests, settings, db_manager)
         if event_stream:
-
             all_event_traces.extend(event_stream)
-
-            try: 
-                missing = get_missing_from_request(db_manager,eq.resource_id.id,requests,event_stream)
-            except Exception as e:
-                print("get_missing_from_request issue:", e)
-
             if missing:
                 all_missing.update(missing)
 
@@ -1823,7 +3445,7 @@ def run_event(settings: SeismoLoaderSettings, stop_event: threading.Event = None
     # Final database cleanup
     try:
         print("\n~~ Cleaning up database ~~")
-        db_manager.join_continuous_segments(settings.processing.gap_tolerance)
+        db_manager.join_continuous_segments(settings.processing.gap_tolerance, touched_only=True)
     except Exception as e:
         print(f"! Error with join_continuous_segments: {str(e)}")
 
@@ -1869,6 +3491,7 @@ def run_main(
         settings = settings.from_cfg_file(cfg_source=from_file)
 
     settings, db_manager = setup_paths(settings)
+    db_manager.close()
 
     # Load client URL mappings
     settings.client_url_mapping.load()
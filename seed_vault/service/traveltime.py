@@ -0,0 +1,289 @@
+"""
+Cached first-P / first-S travel times.
+
+Ray tracing every basic phase with TauP just to find the first P and first S
+arrival is the most expensive CPU step of an event download. TravelTimeTable
+keeps a (distance x source depth) grid of those two times per velocity model,
+bilinearly interpolates it with numpy, and falls back to exact TauP wherever
+interpolation isn't accurate enough (as checked at a few points per cell) or
+the point lies outside the grid.
+
+Grid nodes are computed lazily, the first time a cell is used, and the grid is
+persisted to disk with save(), so later runs only pay for cells they haven't
+seen before.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from obspy.taup import TauPyModel
+
+
+# Grid nodes: distance in degrees, source depth in kilometres
+DISTANCES = np.arange(0.0, 181.0, 1.0)
+DEPTHS = np.array([0, 10, 20, 35, 50, 75, 100, 150, 200, 250, 300,
+                   400, 500, 600, 700, 800], dtype=np.float64)
+
+# Points where interpolation is checked against TauP. Each grid of points is
+# shared by neighbouring cells: name -> (distances, depths).
+_CHECK_GRIDS = {
+    'center': ((DISTANCES[:-1] + DISTANCES[1:]) / 2, (DEPTHS[:-1] + DEPTHS[1:]) / 2),
+    'dist_mid': ((DISTANCES[:-1] + DISTANCES[1:]) / 2, DEPTHS),
+    'depth_mid': (DISTANCES, (DEPTHS[:-1] + DEPTHS[1:]) / 2),
+}
+# The points checked for cell (i, j): (grid, index offsets, position (u, v) in the cell)
+_CELL_CHECKS = [
+    ('center', 0, 0, 0.5, 0.5),
+    ('dist_mid', 0, 0, 0.5, 0.0),
+    ('dist_mid', 0, 1, 0.5, 1.0),
+    ('depth_mid', 0, 0, 0.0, 0.5),
+    ('depth_mid', 1, 0, 1.0, 0.5),
+]
+
+
+def first_p_s_times(model: TauPyModel, depth_km: float, dist_deg: float) -> Tuple[float, float]:
+    """
+    Compute the first P and first S travel times with TauP.
+
+    "P" is whatever the first arrival is, not necessarily literally P.
+    For S only phases named 'S' are considered.
+
+    Args:
+        model: Travel time model to use for calculations.
+        depth_km: Source depth in kilometres.
+        dist_deg: Distance between source and receiver in degrees.
+
+    Returns:
+        Tuple[float, float]: (P, S) travel times in seconds, NaN where there is no arrival.
+
+    Raises:
+        Exception: Anything raised by TauPyModel.get_travel_times().
+    """
+    phasearrivals = model.get_travel_times(
+        source_depth_in_km=depth_km,
+        distance_in_degree=dist_deg,
+        phase_list=['ttbasic']
+    )
+    p_time = phasearrivals[0].time if len(phasearrivals) else np.nan
+    s_time = next((arr.time for arr in phasearrivals if arr.name.upper() == 'S'), np.nan)
+    return p_time, s_time
+
+
+class TravelTimeTable:
+    """
+    Interpolated first-P / first-S travel time grid for one velocity model.
+
+    Each grid cell is checked once against exact TauP evaluations at its
+    centre and the midpoints of its four edges. Cells where the bilinear
+    estimate is off by more than `tolerance` seconds at any of these points
+    (e.g. across phase triplications or the core shadow) always use exact
+    TauP. Between the check points the error isn't bounded, so the tolerance
+    is approximate: narrow features inside a cell may still exceed it.
+
+    Attributes:
+        model_name (str): Name of the velocity model, e.g. "IASP91".
+        model (TauPyModel): Model used for exact evaluations.
+        tolerance (float): Interpolation error accepted at the check points, in seconds.
+        path (Optional[Path]): File the grid is loaded from and saved to.
+
+    Example:
+        >>> table = TravelTimeTable("iasp91", cache_dir="~/.seed_vault", tolerance=0.5)
+        >>> p, s = table.travel_times(33.0, 45.3)
+        >>> table.save()
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Optional[Union[str, Path]] = None,
+        tolerance: float = 0.5,
+        model: Optional[TauPyModel] = None
+    ):
+        """
+        Initialize the table, loading a previously saved grid if there is one.
+
+        Args:
+            model_name: Name of the velocity model.
+            cache_dir: Directory to persist the grid in. If None it is kept in memory only.
+            tolerance: Interpolation error accepted at the check points, in seconds.
+            model: Already loaded TauPyModel for model_name, to avoid loading it twice.
+        """
+        self.model_name = model_name.upper()
+        self.model = model if model is not None else TauPyModel(model_name)
+        self.tolerance = tolerance
+        self.path = None
+        if cache_dir is not None:
+            self.path = Path(cache_dir).expanduser() / f"traveltimes_{self.model_name.lower()}.npz"
+
+        shape = (len(DISTANCES), len(DEPTHS))
+        self._p = np.full(shape, np.nan)
+        self._s = np.full(shape, np.nan)
+        self._done = np.zeros(shape, dtype=bool)
+        # Exact (P, S, done) at the check points, per grid of _CHECK_GRIDS
+        self._checks = {}
+        for name, (dists, depths) in _CHECK_GRIDS.items():
+            check_shape = (len(dists), len(depths))
+            self._checks[name] = (np.full(check_shape, np.nan), np.full(check_shape, np.nan),
+                                  np.zeros(check_shape, dtype=bool))
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def _grids(self):
+        """(key prefix in the saved file, (P, S, done)) of the nodes and of every check grid."""
+        return [('', (self._p, self._s, self._done))] + [
+            (f'{name}_', grids) for name, grids in self._checks.items()]
+
+    def _load(self):
+        """Take over the nodes and check points saved on disk that this table doesn't have yet."""
+        try:
+            with np.load(self.path) as data:
+                if not (np.array_equal(data['distances'], DISTANCES) and np.array_equal(data['depths'], DEPTHS)):
+                    print(f"Travel time grid {self.path} has a different layout, rebuilding it")
+                    return
+                for prefix, (p, s, done) in self._grids():
+                    # Grids saved before a check was added don't have it
+                    if f'{prefix}done' not in data:
+                        continue
+                    theirs = data[f'{prefix}done'] & ~done
+                    p[theirs] = data[f'{prefix}p'][theirs]
+                    s[theirs] = data[f'{prefix}s'][theirs]
+                    done |= theirs
+        except Exception as e:
+            print(f"Could not load travel time grid {self.path}: {str(e)}")
+
+    def save(self):
+        """
+        Write the grid to disk if new nodes were computed since it was loaded.
+
+        Nodes saved in the meantime by other processes using the same file
+        (e.g. the workers of collect_requests_events) are merged in first, so
+        they aren't lost when the file is replaced.
+        """
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists():
+                    self._load()
+                tmp_path = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+                grids = {f'{prefix}{key}': grid for prefix, grids in self._grids()
+                         for key, grid in zip(('p', 's', 'done'), grids)}
+                np.savez(tmp_path, distances=DISTANCES, depths=DEPTHS, **grids)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Could not save travel time grid {self.path}: {str(e)}")
+
+    def _exact(self, depth_km: float, dist_deg: float) -> Tuple[float, float]:
+        try:
+            return first_p_s_times(self.model, depth_km, dist_deg)
+        except Exception as e:
+            print(f"Error calculating travel times:\n {str(e)}")
+            return np.nan, np.nan
+
+    def _cell_known(self, i: int, j: int) -> bool:
+        """Whether the corner nodes and check points of cell (i, j) are computed."""
+        return (self._done[i:i + 2, j:j + 2].all() and
+                all(self._checks[name][2][i + di, j + dj] for name, di, dj, _, _ in _CELL_CHECKS))
+
+    def _fill_cell(self, i: int, j: int):
+        """Compute the corner nodes and check points of cell (i, j) if they aren't known yet."""
+        with self._lock:
+            for a, b in ((i, j), (i + 1, j), (i, j + 1), (i + 1, j + 1)):
+                if not self._done[a, b]:
+                    self._p[a, b], self._s[a, b] = self._exact(DEPTHS[b], DISTANCES[a])
+                    self._done[a, b] = True
+                    self._dirty = True
+            for name, di, dj, _, _ in _CELL_CHECKS:
+                a, b = i + di, j + dj
+                p, s, done = self._checks[name]
+                if not done[a, b]:
+                    dists, depths = _CHECK_GRIDS[name]
+                    p[a, b], s[a, b] = self._exact(depths[b], dists[a])
+                    done[a, b] = True
+                    self._dirty = True
+
+    def _interpolate(self, grid: np.ndarray, i: np.ndarray, j: np.ndarray,
+                     u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        return ((1 - u) * (1 - v) * grid[i, j] + u * (1 - v) * grid[i + 1, j]
+                + (1 - u) * v * grid[i, j + 1] + u * v * grid[i + 1, j + 1])
+
+    def _cell_ok(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Whether the bilinear estimate at every check point of each cell is within tolerance."""
+        ok = np.ones(len(i), dtype=bool)
+        for name, di, dj, u, v in _CELL_CHECKS:
+            check_p, check_s, _ = self._checks[name]
+            at_u, at_v = np.full(len(i), u), np.full(len(i), v)
+            for grid, check in ((self._p, check_p), (self._s, check_s)):
+                estimate = self._interpolate(grid, i, j, at_u, at_v)
+                exact = check[i + di, j + dj]
+                both_nan = np.isnan(estimate) & np.isnan(exact)
+                ok &= both_nan | (np.abs(estimate - exact) <= self.tolerance)
+        return ok
+
+    def travel_times_array(self, depths_km, dists_deg) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        First P and first S travel times for many source-receiver pairs.
+
+        Args:
+            depths_km: Source depths in kilometres.
+            dists_deg: Distances between source and receiver in degrees.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: P and S travel times in seconds,
+                NaN where there is no arrival.
+        """
+        depths_km, dists_deg = np.broadcast_arrays(np.asarray(depths_km, dtype=np.float64),
+                                                   np.asarray(dists_deg, dtype=np.float64))
+        depths_km, dists_deg = depths_km.ravel(), dists_deg.ravel()
+        p_times = np.full(len(depths_km), np.nan)
+        s_times = np.full(len(depths_km), np.nan)
+
+        inside = ((dists_deg >= DISTANCES[0]) & (dists_deg <= DISTANCES[-1]) &
+                  (depths_km >= DEPTHS[0]) & (depths_km <= DEPTHS[-1]))
+        idx = np.flatnonzero(inside)
+
+        i = np.clip(np.searchsorted(DISTANCES, dists_deg[idx], side='right') - 1, 0, len(DISTANCES) - 2)
+        j = np.clip(np.searchsorted(DEPTHS, depths_km[idx], side='right') - 1, 0, len(DEPTHS) - 2)
+        for a, b in set(zip(i.tolist(), j.tolist())):
+            if not self._cell_known(a, b):
+                self._fill_cell(a, b)
+
+        ok = self._cell_ok(i, j)
+        idx, i, j = idx[ok], i[ok], j[ok]
+        u = (dists_deg[idx] - DISTANCES[i]) / (DISTANCES[i + 1] - DISTANCES[i])
+        v = (depths_km[idx] - DEPTHS[j]) / (DEPTHS[j + 1] - DEPTHS[j])
+        p_times[idx] = self._interpolate(self._p, i, j, u, v)
+        s_times[idx] = self._interpolate(self._s, i, j, u, v)
+
+        # Outside the grid, or interpolation not accurate enough: exact TauP
+        exact = np.ones(len(depths_km), dtype=bool)
+        exact[idx] = False
+        for k in np.flatnonzero(exact):
+            p_times[k], s_times[k] = self._exact(depths_km[k], dists_deg[k])
+
+        return p_times, s_times
+
+    def travel_times(self, depth_km: float, dist_deg: float) -> Tuple[Optional[float], Optional[float]]:
+        """
+        First P and first S travel times for one source-receiver pair.
+
+        Args:
+            depth_km: Source depth in kilometres.
+            dist_deg: Distance between source and receiver in degrees.
+
+        Returns:
+            Tuple[Optional[float], Optional[float]]: P and S travel times in seconds,
+                None where there is no arrival.
+        """
+        p_times, s_times = self.travel_times_array(depth_km, dist_deg)
+        p_time, s_time = p_times[0], s_times[0]
+        return (None if np.isnan(p_time) else float(p_time),
+                None if np.isnan(s_time) else float(s_time))
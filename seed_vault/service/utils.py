@@ -1,15 +1,17 @@
 from typing import Any, Dict, List, Tuple, Optional, Union
 
+from collections import defaultdict
 from datetime import datetime, date, time, timedelta, timezone
 from dateutil.relativedelta import relativedelta
 
+import numpy as np
 import streamlit as st
 
 from obspy import UTCDateTime
 from obspy.clients.fdsn import Client
 from obspy.core.inventory import Inventory
 from obspy.core.event import Event,Catalog
-from obspy.geodetics import locations2degrees
+from obspy.geodetics import locations2degrees, gps2dist_azimuth
 
 from seed_vault.enums.config import GeoConstraintType
 
@@ -287,6 +289,163 @@ def remove_duplicate_events(catalog):
 
     return out
 
+# WGS84 ellipsoid, as used by obspy.geodetics.gps2dist_azimuth
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+
+
+def inventory_coordinates(inventory: Inventory) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Station coordinates of an inventory as numpy arrays.
+
+    Args:
+        inventory: ObsPy Inventory.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Latitudes and longitudes of every station,
+            in the order of iterating over networks and then stations.
+    """
+    coords = [(sta.latitude, sta.longitude) for net in inventory for sta in net]
+    coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1]
+
+
+def catalog_coordinates(catalog: Catalog) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Preferred (first) origin coordinates of a catalog as numpy arrays.
+
+    Args:
+        catalog: ObsPy Catalog.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Latitudes and longitudes of every event,
+            NaN for events without an origin.
+    """
+    coords = []
+    for event in catalog:
+        try:
+            coords.append((event.origins[0].latitude, event.origins[0].longitude))
+        except (IndexError, AttributeError):
+            coords.append((np.nan, np.nan))
+    coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1]
+
+
+def gps2dist_azimuth_array(lat1: float, lon1: float, lats2, lons2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized obspy.geodetics.gps2dist_azimuth from one point to many.
+
+    Solves Vincenty's inverse problem on the WGS84 ellipsoid for all points at
+    once. The few near-antipodal points where the iteration doesn't converge
+    are handed to gps2dist_azimuth one by one.
+
+    Args:
+        lat1: Latitude of the source point (e.g. an event) in degrees.
+        lon1: Longitude of the source point in degrees.
+        lats2: Latitudes of the target points (e.g. stations) in degrees.
+        lons2: Longitudes of the target points in degrees.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Distances in metres, azimuths
+            from source to targets and back azimuths, in degrees.
+
+    Example:
+        >>> lats, lons = inventory_coordinates(inv)
+        >>> dist_m, azi, baz = gps2dist_azimuth_array(ev_lat, ev_lon, lats, lons)
+    """
+    lats2 = np.atleast_1d(np.asarray(lats2, dtype=np.float64))
+    lons2 = np.atleast_1d(np.asarray(lons2, dtype=np.float64))
+    a, f = WGS84_A, WGS84_F
+    b = a * (1 - f)
+
+    L = np.radians(lons2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lats2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(len(L), dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(200):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam - lam_prev) < 1e-12
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (a ** 2 - b ** 2) / b ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        dist = b * A * (sigma - delta_sigma)
+
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        azimuth = np.degrees(np.arctan2(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)) % 360
+        back_azimuth = (np.degrees(np.arctan2(cosU1 * sin_lam, -sinU1 * cosU2 + cosU1 * sinU2 * cos_lam)) + 180) % 360
+
+    # Coincident points
+    same = sin_sigma == 0
+    dist[same], azimuth[same], back_azimuth[same] = 0.0, 0.0, 0.0
+
+    for i in np.flatnonzero(~converged & ~np.isnan(lam)):
+        dist[i], azimuth[i], back_azimuth[i] = gps2dist_azimuth(lat1, lon1, lats2[i], lons2[i])
+
+    return dist, azimuth, back_azimuth
+
+
+def geo_constraints_mask(lats, lons, constraints) -> np.ndarray:
+    """
+    Which points fall within ANY of a list of geographical constraints.
+
+    Args:
+        lats: Latitudes in degrees (NaN for unknown locations, which never match).
+        lons: Longitudes in degrees.
+        constraints: List of GeometryConstraint (e.g. settings.event.geo_constraint).
+
+    Returns:
+        np.ndarray: Boolean mask, True where a point satisfies at least one constraint.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    mask = np.zeros(len(lats), dtype=bool)
+
+    for geo in constraints:
+        if geo.geo_type == GeoConstraintType.BOUNDING:
+            in_lat = (geo.coords.min_lat <= lats) & (lats <= geo.coords.max_lat)
+            if geo.coords.min_lon <= geo.coords.max_lon:
+                # Normal case: box doesn't cross meridian
+                in_lon = (geo.coords.min_lon <= lons) & (lons <= geo.coords.max_lon)
+            else:
+                # Box crosses meridian
+                in_lon = (lons >= geo.coords.min_lon) | (lons <= geo.coords.max_lon)
+            mask |= in_lat & in_lon
+
+        elif geo.geo_type == GeoConstraintType.CIRCLE:
+            if not geo.coords.max_radius:
+                geo.coords.max_radius = 180
+            if not geo.coords.min_radius:
+                geo.coords.min_radius = 0
+
+            distance = locations2degrees(lats, lons, geo.coords.lat, geo.coords.lon)
+            mask |= (geo.coords.min_radius <= distance) & (distance <= geo.coords.max_radius)
+
+        else:
+            mask |= True
+
+    return mask & ~np.isnan(lats) & ~np.isnan(lons)
+
 def filter_catalog_by_geo_constraints(catalog: Catalog, constraints) -> Catalog:
     """
     Filter an ObsPy event catalog to include events within ANY of original search constraints. 
@@ -307,56 +466,18 @@ def filter_catalog_by_geo_constraints(catalog: Catalog, constraints) -> Catalog:
     if len(constraints) == 0:
         return catalog
 
-    filtered_events = []
+    lats, lons = catalog_coordinates(catalog)
+    mask = geo_constraints_mask(lats, lons, constraints)
 
-    for event in catalog:
+    filtered_events = []
+    # Filter out duplicates while we're here (equal events share a resource_id)
+    seen = defaultdict(list)
 
-        # Filter out duplicates while we're here
-        if event in filtered_events:
+    for event, keep in zip(catalog, mask):
+        if not keep or event in seen[str(event.resource_id)]:
             continue
-
-        try:
-            event_lat = event.origins[0].latitude
-            event_lon = event.origins[0].longitude
-        except (IndexError, AttributeError):
-            continue
-
-        for geo in constraints:
-            if geo.geo_type == GeoConstraintType.BOUNDING:
-
-                # Check latitude first since it's simpler
-                if not (geo.coords.min_lat <= event_lat <= geo.coords.max_lat):
-                    continue
-                    
-                # Handle longitude, accounting for meridian crossing
-                lon_in_bounds = False
-                if geo.coords.min_lon <= geo.coords.max_lon:
-                    # Normal case: box doesn't cross meridian
-                    lon_in_bounds = geo.coords.min_lon <= event_lon <= geo.coords.max_lon
-                else:
-                    # Box crosses meridian - event must be either:
-                    # 1) Greater than min_lon (e.g., 170 to 180) or
-                    # 2) Less than max_lon (e.g., -180 to -170)
-                    lon_in_bounds = event_lon >= geo.coords.min_lon or event_lon <= geo.coords.max_lon
-                
-                if lon_in_bounds:
-                    filtered_events.append(event)
-                    break
-
-            elif geo.geo_type == GeoConstraintType.CIRCLE:
-
-                if not geo.coords.max_radius:
-                    geo.coords.max_radius = 180
-                if not geo.coords.min_radius:
-                    geo.coords.min_radius = 0
-
-                distance = locations2degrees(event_lat, event_lon, geo.coords.lat, geo.coords.lon)
-                    
-                if geo.coords.min_radius <= distance <= geo.coords.max_radius:
-                    filtered_events.append(event)
-                    break
-            else:
-                filtered_events.append(event)
+        seen[str(event.resource_id)].append(event)
+        filtered_events.append(event)
 
     return Catalog(events=filtered_events)
 
@@ -379,6 +500,9 @@ def filter_inventory_by_geo_constraints(inventory: Inventory, constraints) -> In
     if len(constraints) == 0:
         return inventory
 
+    lats, lons = inventory_coordinates(inventory)
+    mask = iter(geo_constraints_mask(lats, lons, constraints))
+
     # Create new networks list for filtered inventory
     networks = []
     
@@ -387,49 +511,13 @@ def filter_inventory_by_geo_constraints(inventory: Inventory, constraints) -> In
         filtered_stations = []
         
         for station in network:
+            keep = next(mask)
 
             # Filter out duplicates while we're here
-            if station in filtered_stations:
+            if not keep or station in filtered_stations:
                 continue
 
-            station_lat = station.latitude
-            station_lon = station.longitude
-            
-            # Check each constraint
-            for geo in constraints:
-                if geo.geo_type == GeoConstraintType.BOUNDING:
-                    # Check latitude first
-                    if not (geo.coords.min_lat <= station_lat <= geo.coords.max_lat):
-                        continue
-                        
-                    # Handle longitude, accounting for meridian crossing
-                    lon_in_bounds = False
-                    if geo.coords.min_lon <= geo.coords.max_lon:
-                        # Normal case: box doesn't cross meridian
-                        lon_in_bounds = geo.coords.min_lon <= station_lon <= geo.coords.max_lon
-                    else:
-                        # Box crosses meridian
-                        lon_in_bounds = station_lon >= geo.coords.min_lon or station_lon <= geo.coords.max_lon
-                    
-                    if lon_in_bounds:
-                        filtered_stations.append(station)
-                        break  # Found a matching constraint, no need to check others
-                        
-                elif geo.geo_type == GeoConstraintType.CIRCLE:
-                    if not geo.coords.max_radius:
-                        geo.coords.max_radius = 180
-                    if not geo.coords.min_radius:
-                        geo.coords.min_radius = 0
-                        
-                    distance = locations2degrees(station_lat, station_lon, 
-                                              geo.coords.lat, geo.coords.lon)
-                        
-                    if geo.coords.min_radius <= distance <= geo.coords.max_radius:
-                        filtered_stations.append(station)
-                        break
-                        
-                else:
-                    filtered_stations.append(station)
+            filtered_stations.append(station)
         
         # If we found any stations in this network, add the network to our result
         if filtered_stations:
@@ -439,4 +527,4 @@ def filter_inventory_by_geo_constraints(inventory: Inventory, constraints) -> In
             networks.append(filtered_network)
     
     # Create new inventory with only the networks that had matching stations
-    return Inventory(networks=networks, source=inventory.source, sender=inventory.sender)
\ No newline at end of file
+    return Inventory(networks=networks, source=inventory.source, sender=inventory.sender)
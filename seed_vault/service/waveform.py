@@ -1,27 +1,64 @@
+import numpy as np
 import pandas as pd
 import os
+import glob
+import fnmatch
 import itertools
+from collections import defaultdict
 from typing import Tuple, List, Optional
 import obspy
 from obspy import UTCDateTime, Stream
-from obspy.clients.filesystem.sds import Client as LocalClient
+from obspy.clients.filesystem.sds import Client as LocalClient, BAND_CODE
 
 from seed_vault.models.config import SeismoLoaderSettings, SeismoQuery
 from seed_vault.models.exception import NotFoundError
+from seed_vault.service.db import AvailabilityIndex
+from seed_vault.service.mseed import read_windows
 
-def stream_to_dataframe(stream):
-    df = pd.DataFrame()
-    for trace in stream:
-        data = {
-            'time': trace.times("matplotlib"),  # Times in days since '0001-01-01'
-            'amplitude': trace.data,
-            'channel': trace.stats.channel
-        }
-        trace_df = pd.DataFrame(data)
-        # Adjust origin to '1970-01-01' to avoid overflow
-        trace_df['time'] = pd.to_datetime(trace_df['time'], unit='D', origin=pd.Timestamp('1970-01-01'))
-        df = pd.concat([df, trace_df], ignore_index=True)
-    return df
+# Like obspy's SDS client: also look this far into neighbouring day files
+SDS_FILEBORDER_SECONDS = 30
+SDS_FILEBORDER_SAMPLES = 5000
+
+def stream_to_dataframe(stream: Stream, decimate: int = 1) -> pd.DataFrame:
+    """
+    Flatten a stream into one long DataFrame for plotting.
+
+    All traces are copied into arrays allocated once for the whole stream, with
+    times computed from each trace's starttime and sampling interval.
+
+    Args:
+        stream: Traces to convert. Gaps in merged (masked) traces become NaN.
+        decimate: Keep only every n-th sample of each trace. This is plain
+            striding without anti-alias filtering, meant to lighten displays.
+
+    Returns:
+        pd.DataFrame: Columns 'time' (naive datetime64[ns] in UTC), 'amplitude' and
+            'channel', one row per (kept) sample, trace after trace.
+
+    Example:
+        >>> df = stream_to_dataframe(read(), decimate=10)
+    """
+    decimate = max(1, int(decimate))
+    lengths = [-(-len(tr.data) // decimate) for tr in stream]
+    total = sum(lengths)
+
+    dtypes = [np.float64 if np.ma.isMaskedArray(tr.data) else tr.data.dtype for tr in stream]
+    times = np.empty(total, dtype='datetime64[ns]')
+    amplitude = np.empty(total, dtype=np.result_type(*dtypes) if dtypes else np.float64)
+    channel = np.empty(total, dtype=object)
+
+    i = 0
+    for tr, n in zip(stream, lengths):
+        data = tr.data[::decimate]
+        if np.ma.isMaskedArray(data):
+            data = data.astype(np.float64).filled(np.nan)
+        offsets = np.round(np.arange(n) * (decimate * tr.stats.delta * 1e9)).astype(np.int64)
+        times[i:i + n] = (offsets + tr.stats.starttime.ns).view('datetime64[ns]')
+        amplitude[i:i + n] = data
+        channel[i:i + n] = tr.stats.channel
+        i += n
+
+    return pd.DataFrame({'time': times, 'amplitude': amplitude, 'channel': channel})
 
 
 def check_is_archived(cursor, req: SeismoQuery): 
@@ -30,7 +67,8 @@ def check_is_archived(cursor, req: SeismoQuery):
         WHERE network = ? AND station = ? AND location = ? AND channel = ?
         AND endtime >= ? AND starttime <= ?
         ORDER BY starttime
-    ''', (req.network, req.station, req.location, req.channel, req.starttime.isoformat(), req.endtime.isoformat()))
+    ''', (req.network, req.station, req.location, req.channel,
+          UTCDateTime(req.starttime).timestamp, UTCDateTime(req.endtime).timestamp))
     
     existing_data = cursor.fetchall()
     if not existing_data:
@@ -98,6 +136,111 @@ def get_local_waveform(request: Tuple[str, str, str, str, str, str], settings: S
     else:
         return None
 
+
+def _split_codes(field: str) -> List[str]:
+    """Comma-separated request field as a list of codes ('' stays a single empty code)."""
+    if not field:
+        return ['']
+    return [code.strip().upper() for code in field.split(',')]
+
+
+def _sds_day_files(sds_path: str, nslc: Tuple[str, str, str, str], t0: float, t1: float) -> List[str]:
+    """Paths of the day files that may hold data of a channel between t0 and t1."""
+    network, station, location, channel = nslc
+    buffer = max(SDS_FILEBORDER_SAMPLES / BAND_CODE.get(channel[:1], 20.0), SDS_FILEBORDER_SECONDS)
+    first = UTCDateTime(UTCDateTime(t0 - buffer).date)
+    last = UTCDateTime(t1 + buffer)
+    paths = []
+    day = first
+    while day <= last:
+        year, doy = day.year, f"{day.julday:03d}"
+        paths.append(os.path.join(sds_path, str(year), network, station, f"{channel}.D",
+                                  f"{network}.{station}.{location}.{channel}.D.{year}.{doy}"))
+        day += 86400
+    return paths
+
+
+def get_local_waveforms_bulk(
+    requests: List[Tuple[str, str, str, str, str, str]],
+    sds_path: str,
+    availability: Optional[AvailabilityIndex] = None
+) -> Stream:
+    """
+    Read the data of many requests from the local SDS archive at once.
+
+    Each request is resolved to exact channels and day files up front, instead
+    of a client lookup per combination of comma separated codes: wildcards are
+    matched against the channels known to `availability`, and combinations
+    that `availability` knows to have no data in a request's window aren't
+    looked for at all. Every day file is then read once, decoding only the
+    records that overlap its requests' windows (see mseed.read_windows), and
+    cut into the requested windows.
+
+    Args:
+        requests: List of (network, station, location, channel, starttime, endtime)
+            tuples. Location and channel may be comma separated lists.
+        sds_path: Root path of the SDS archive.
+        availability: Optional index of the archived data, e.g. from
+            DatabaseManager.get_availability_index(). Channels it doesn't
+            know are still looked for on disk.
+
+    Returns:
+        Stream with the data of all requests (possibly empty). Data of the same
+        channel and window from adjacent day files is merged.
+
+    Example:
+        >>> requests = [("IU", "ANMO", "00,10", "BHZ,BHN", "2020-01-01T00:00:00", "2020-01-01T00:10:00")]
+        >>> st = get_local_waveforms_bulk(requests, "/data/SDS", db_manager.get_availability_index(["IU"]))
+    """
+    # Exact channels and time windows
+    windows = {}
+    for request in requests:
+        t0 = UTCDateTime(request[4]).timestamp
+        t1 = UTCDateTime(request[5]).timestamp
+        for nslc in itertools.product(_split_codes(request[0]), _split_codes(request[1]),
+                                      _split_codes(request[2]), _split_codes(request[3])):
+            if not any(ch in code for code in nslc for ch in '*?['):
+                matches = [nslc]
+            elif availability is not None:
+                matches = [key for key in availability.spans
+                           if all(fnmatch.fnmatchcase(k, p) for k, p in zip(key, nslc))]
+            else:
+                # Wildcards without an index: find the channels from the day files
+                matches = {tuple(os.path.basename(path).split('.')[0:4])
+                           for pattern in _sds_day_files(sds_path, nslc, t0, t1)
+                           for path in glob.glob(pattern)}
+            for key in matches:
+                if availability is not None and key in availability and not availability.covered(key, t0, t1):
+                    continue
+                windows[key + (t0, t1)] = Stream()
+
+    # Day files to read, with the windows each one contributes to
+    file_windows = defaultdict(list)
+    for window in windows:
+        for path in _sds_day_files(sds_path, window[0:4], window[4], window[5]):
+            file_windows[path].append(window)
+
+    for path, file_requests in file_windows.items():
+        if not os.path.isfile(path):
+            continue
+        try:
+            st = read_windows(path, [window[4:6] for window in file_requests])
+        except Exception as e:
+            print(f"get_local_waveforms_bulk problem reading {path}:", e)
+            continue
+        for window in file_requests:
+            network, station, location, channel = window[0:4]
+            windows[window] += st.select(network=network, station=station,
+                                         location=location, channel=channel).slice(
+                UTCDateTime(window[4]), UTCDateTime(window[5]))
+
+    combined_stream = Stream()
+    for window, st in windows.items():
+        if len(st) > 0:
+            st.merge(-1)
+            combined_stream += st
+    return combined_stream
+
 def get_local_waveform_OLD(request: Tuple[str, str, str, str, str, str], settings: SeismoLoaderSettings):
     client = LocalClient(settings.sds_path)
     kwargs = {
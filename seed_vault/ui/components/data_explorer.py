@@ -147,6 +147,7 @@ class DataExplorerComponent:
                 st.code("SELECT * FROM arrival_data", language="sql")
                 st.code("SELECT * FROM archive_data LIMIT 100", language="sql")
                 st.code("SELECT DISTINCT network, station FROM archive_data", language="sql")
+                st.code("SELECT * FROM archive_data_iso LIMIT 100  -- times as ISO strings", language="sql")
         with c2:
             with st.expander("DELETE", expanded=True):
                 st.code('DELETE FROM archive_data where network="IU" and station="DAV"', language="sql")
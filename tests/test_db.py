@@ -0,0 +1,393 @@
+import os
+import shutil
+import pytest
+from unittest.mock import patch
+from obspy import UTCDateTime, read
+
+from seed_vault.service.db import (DatabaseManager, AvailabilityIndex, iter_sds_files,
+                                   populate_database_from_sds, index_sds_archive)
+from seed_vault.service.mseed import read_segments
+from seed_vault.service.seismoloader import prune_requests, get_missing_from_request
+
+
+def ts(s):
+    return UTCDateTime(s).timestamp
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Empty database in a temporary directory"""
+    return DatabaseManager(str(tmp_path / "database.sqlite"))
+
+
+def test_availability_index_merges_and_finds_gaps():
+    rows = [
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T02:00:00", "2024-01-01T03:00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00", "2024-01-01T01:00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:30:00", "2024-01-01T01:30:00"),
+    ]
+    index = AvailabilityIndex.from_rows(rows)
+
+    starts, ends = index.spans[("IU", "ANMO", "00", "BHZ")]
+    assert list(starts) == [ts("2024-01-01T00:00:00"), ts("2024-01-01T02:00:00")]
+    assert list(ends) == [ts("2024-01-01T01:30:00"), ts("2024-01-01T03:00:00")]
+
+    gaps = index.missing("IU", "ANMO", "00", "BHZ", ts("2023-12-31T23:00:00"), ts("2024-01-01T04:00:00"))
+    assert gaps == [
+        (ts("2023-12-31T23:00:00"), ts("2024-01-01T00:00:00")),
+        (ts("2024-01-01T01:30:00"), ts("2024-01-01T02:00:00")),
+        (ts("2024-01-01T03:00:00"), ts("2024-01-01T04:00:00")),
+    ]
+    assert index.missing("IU", "ANMO", "00", "BHZ", ts("2024-01-01T00:10:00"), ts("2024-01-01T01:00:00")) == []
+    assert index.missing("IU", "ANMO", "10", "BHZ", 0, 10) == [(0, 10)]
+
+
+def test_prune_requests_uses_existing_spans(db_manager, tmp_path):
+    db_manager.bulk_insert_archive_data([
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00", "2024-01-01T12:00:00"),
+    ])
+    requests = [
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z"),
+        ("IU", "COLA", "00", "BHZ", "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T01:00:00Z", "2024-01-01T02:00:00Z"),
+    ]
+
+    pruned = prune_requests(requests, db_manager, str(tmp_path / "SDS"))
+
+    assert requests[1] in pruned  # nothing archived, untouched
+    anmo = [req for req in pruned if req[1] == "ANMO"]
+    assert len(anmo) == 1
+    assert UTCDateTime(anmo[0][4]) == UTCDateTime("2024-01-01T12:00:00")
+    assert UTCDateTime(anmo[0][5]) == UTCDateTime("2024-01-02T00:00:00")
+
+
+def test_prune_requests_picks_up_unrecorded_files(db_manager, tmp_path):
+    sds_path = tmp_path / "SDS"
+    st = read()  # BW.RJOB..EH? 2009-08-24T00:20:03 - 00:20:33
+    tr = st.select(channel="EHZ")[0]
+    fn = sds_path / "2009" / "BW" / "RJOB" / "EHZ.D" / "BW.RJOB..EHZ.D.2009.236"
+    os.makedirs(fn.parent)
+    tr.write(str(fn), format="MSEED")
+
+    request = ("BW", "RJOB", "", "EHZ", "2009-08-24T00:19:00", "2009-08-24T00:21:00")
+    pruned = prune_requests([request], db_manager, str(sds_path))
+
+    assert len(pruned) == 2
+    assert UTCDateTime(pruned[0][5]) == tr.stats.starttime
+    assert UTCDateTime(pruned[1][4]) == tr.stats.endtime
+    # Joined like any other newly inserted channel
+    assert db_manager.touched_channels == {("BW", "RJOB", "", "EHZ")}
+
+
+def test_legacy_iso_database_is_migrated(tmp_path):
+    import sqlite3
+    db_path = str(tmp_path / "legacy.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE archive_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            network TEXT, station TEXT, location TEXT, channel TEXT,
+            starttime TEXT, endtime TEXT, importtime REAL)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_archive_data
+        ON archive_data (network, station, location, channel, starttime, endtime, importtime)
+    ''')
+    conn.execute("INSERT INTO archive_data VALUES (1, 'IU', 'ANMO', '00', 'BHZ', "
+                 "'2024-01-01T00:00:00.500000', '2024-01-01T12:00:00', 1700000000)")
+    conn.commit()
+    conn.close()
+
+    db_manager = DatabaseManager(db_path)
+
+    with db_manager.connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == DatabaseManager.SCHEMA_VERSION
+        row = conn.execute("SELECT starttime, endtime FROM archive_data").fetchone()
+        assert row == (ts("2024-01-01T00:00:00.5"), ts("2024-01-01T12:00:00"))
+        iso = conn.execute("SELECT starttime FROM archive_data_iso").fetchone()[0]
+        assert iso == "2024-01-01T00:00:00.500"
+        index_cols = [r[2] for r in conn.execute("PRAGMA index_info(idx_archive_data)")]
+        assert "importtime" not in index_cols
+
+    assert db_manager.check_data_existence("IU", "ANMO", "00", "BHZ",
+                                           "2024-01-01T01:00:00", "2024-01-01T02:00:00")
+
+
+def test_join_continuous_segments_only_touches_new_channels(db_manager):
+    # Adjacent segments that were never joined, on a channel not touched by this run
+    with db_manager.connection() as conn:
+        conn.executemany('''
+            INSERT INTO archive_data (network, station, location, channel, starttime, endtime, importtime)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [("IU", "COLA", "00", "BHZ", 0.0, 100.0, 1.0), ("IU", "COLA", "00", "BHZ", 110.0, 200.0, 1.0)])
+
+    db_manager.bulk_insert_archive_data([
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00", "2024-01-01T01:00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:30:00", "2024-01-01T02:00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T02:00:10", "2024-01-01T03:00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T05:00:00", "2024-01-01T06:00:00"),
+    ])
+    db_manager.join_continuous_segments(gap_tolerance=30, touched_only=True)
+
+    with db_manager.connection() as conn:
+        anmo = conn.execute("SELECT starttime, endtime FROM archive_data WHERE station = 'ANMO' "
+                            "ORDER BY starttime").fetchall()
+        cola = conn.execute("SELECT COUNT(*) FROM archive_data WHERE station = 'COLA'").fetchone()[0]
+    assert anmo == [(ts("2024-01-01T00:00:00"), ts("2024-01-01T03:00:00")),
+                    (ts("2024-01-01T05:00:00"), ts("2024-01-01T06:00:00"))]
+    assert cola == 2
+    assert db_manager.touched_channels == set()
+
+    db_manager.join_continuous_segments(gap_tolerance=30)
+    with db_manager.connection() as conn:
+        cola = conn.execute("SELECT starttime, endtime FROM archive_data WHERE station = 'COLA'").fetchall()
+    assert cola == [(0.0, 200.0)]
+
+
+def test_failed_join_keeps_touched_channels(db_manager):
+    db_manager.bulk_insert_archive_data([("IU", "ANMO", "00", "BHZ", 0.0, 100.0)])
+
+    with patch("seed_vault.service.db._merge_segments", side_effect=RuntimeError("boom")):
+        with pytest.raises(RuntimeError):
+            db_manager.join_continuous_segments(gap_tolerance=30, touched_only=True)
+    assert db_manager.touched_channels == {("IU", "ANMO", "00", "BHZ")}
+
+
+def test_pooled_connections_are_per_thread_and_use_wal(db_manager):
+    import threading
+
+    with db_manager.connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with db_manager.connection() as conn:
+        assert conn is first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db_manager._pooled_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+    # A failed transaction is rolled back and doesn't leak into the next call
+    with pytest.raises(ValueError):
+        with db_manager.connection() as conn:
+            conn.execute("INSERT INTO archive_data (network, station, location, channel, starttime, endtime) "
+                         "VALUES ('IU', 'ANMO', '00', 'BHZ', 0, 1)")
+            raise ValueError
+    with db_manager.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM archive_data").fetchone()[0] == 0
+
+    db_manager.close()
+    assert len(db_manager._pool) == 0
+
+
+def test_pooled_connections_close_with_their_thread_and_nest(db_manager):
+    import gc
+    import sqlite3
+    import threading
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db_manager._pooled_connection()))
+    thread.start()
+    thread.join()
+    gc.collect()
+    with pytest.raises(sqlite3.ProgrammingError):
+        other[0].execute("SELECT 1")
+    assert len(db_manager._pool) == 1  # only this thread's
+
+    # An inner context doesn't commit or roll back the outer transaction
+    with pytest.raises(ValueError):
+        with db_manager.connection() as outer:
+            outer.execute("INSERT INTO archive_data (network, station, location, channel, starttime, endtime) "
+                          "VALUES ('IU', 'ANMO', '00', 'BHZ', 0, 1)")
+            with db_manager.connection() as inner:
+                assert inner is outer
+            assert outer.in_transaction
+            raise ValueError
+    with db_manager.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM archive_data").fetchone()[0] == 0
+
+
+def test_fetch_arrivals_distances_bulk(db_manager):
+    def arrival(rid, sta, p):
+        return (rid, 6.0, 0, 0, 10, 0, "IU", sta, 1, 1, 0, None, None, 10.0, 1111.0, 45.0, p, p + 60, "iasp91")
+
+    db_manager.bulk_insert_arrival_data([arrival("ev1", "ANMO", 100.0), arrival("ev1", "COLA", 200.0),
+                                         arrival("ev2", "ANMO", 300.0)])
+
+    cached = db_manager.fetch_arrivals_distances_bulk("ev1")
+    assert set(cached) == {"IU.ANMO", "IU.COLA"}
+    assert cached["IU.ANMO"] == db_manager.fetch_arrivals_distances("ev1", "IU", "ANMO")
+
+    by_event = db_manager.fetch_arrivals_distances_bulk(["ev1", "ev2", "ev3"])
+    assert by_event["ev2"]["IU.ANMO"][0] == 300.0
+    assert by_event["ev3"] == {}
+
+
+def _write_sds_day(sds_path, tr, mtime):
+    fn = (sds_path / str(tr.stats.starttime.year) / tr.stats.network / tr.stats.station /
+          f"{tr.stats.channel}.D" / (f"{tr.id}.D.{tr.stats.starttime.year}." +
+                                     f"{tr.stats.starttime.julday:03d}"))
+    os.makedirs(fn.parent, exist_ok=True)
+    tr.write(str(fn), format="MSEED")
+    os.utime(fn, (mtime, mtime))
+    return fn
+
+
+def test_sds_scan_follows_layout_and_fast_mode(tmp_path):
+    sds_path = tmp_path / "SDS"
+    st = read()  # BW.RJOB..EH? 2009-08-24T00:20:03 - 00:20:33
+    old = ts("2010-01-01")
+    for tr in st:
+        _write_sds_day(sds_path, tr, old)
+    # Still being written: modified before its day was over
+    tr = st.select(channel="EHZ")[0].copy()
+    tr.stats.starttime = UTCDateTime("2009-08-25T00:00:00")
+    recent = _write_sds_day(sds_path, tr, ts("2009-08-25T00:10:00"))
+    # Outside the SDS layout or not matching the pattern
+    (sds_path / "notes.txt").write_text("x")
+    os.makedirs(sds_path / "tmp" / "BW" / "RJOB" / "EHZ.D")
+    (sds_path / "tmp" / "BW" / "RJOB" / "EHZ.D" / "BW.RJOB..EHZ.D.2009.236").write_bytes(b"x")
+    (recent.parent / "BW.RJOB..EHZ.D.2009.237.bak").write_bytes(b"x")
+
+    found = sorted(e.name for e in iter_sds_files(str(sds_path)))
+    assert found == ["BW.RJOB..EHE.D.2009.236", "BW.RJOB..EHN.D.2009.236",
+                     "BW.RJOB..EHZ.D.2009.236", "BW.RJOB..EHZ.D.2009.237"]
+
+    db_path = str(tmp_path / "database.sqlite")
+    with patch("seed_vault.service.db.read_segments", wraps=read_segments) as mock_read:
+        populate_database_from_sds(str(sds_path), db_path, num_processes=1,
+                                   from_filenames=True)
+        assert mock_read.call_count == 1  # only the file that may have changed
+
+    with DatabaseManager(db_path).connection() as conn:
+        rows = conn.execute("SELECT channel, starttime, endtime FROM archive_data "
+                            "ORDER BY channel, starttime").fetchall()
+    ehz = [r for r in rows if r[0] == "EHZ"]
+    assert len(ehz) == 1  # day by name joined with the read header
+    assert UTCDateTime(ehz[0][1]) == UTCDateTime("2009-08-24")
+    assert UTCDateTime(ehz[0][2]) == tr.stats.endtime
+    ehe = [r for r in rows if r[0] == "EHE"]
+    assert UTCDateTime(ehe[0][2]) == UTCDateTime("2009-08-25")
+
+
+def test_incremental_sync_reads_only_changed_files(tmp_path):
+    sds_path = tmp_path / "SDS"
+    st = read()  # BW.RJOB..EH? 2009-08-24T00:20:03 - 00:20:33
+    files = {tr.stats.channel: _write_sds_day(sds_path, tr, ts("2010-01-01")) for tr in st}
+    db_path = str(tmp_path / "database.sqlite")
+
+    def sync():
+        with patch("seed_vault.service.db.read_segments", wraps=read_segments) as mock_read:
+            populate_database_from_sds(str(sds_path), db_path, num_processes=1, incremental=True)
+        with DatabaseManager(db_path).connection() as conn:
+            rows = conn.execute("SELECT channel, starttime, endtime FROM archive_data "
+                                "ORDER BY channel").fetchall()
+        return mock_read.call_count, rows
+
+    num_read, rows = sync()
+    assert num_read == 3
+    assert [r[0] for r in rows] == ["EHE", "EHN", "EHZ"]
+    assert len(DatabaseManager(db_path).get_file_manifest()) == 3
+
+    num_read, rows_again = sync()
+    assert num_read == 0
+    assert rows_again == rows
+
+    # Shorten one file, remove another
+    tr = st.select(channel="EHZ")[0].slice(endtime=st[0].stats.starttime + 10)
+    _write_sds_day(sds_path, tr, ts("2010-01-02"))
+    os.remove(files["EHN"])
+
+    num_read, rows = sync()
+    assert num_read == 1
+    assert [r[0] for r in rows] == ["EHE", "EHZ"]
+    assert UTCDateTime(rows[1][2]) == tr.stats.endtime
+    manifest = DatabaseManager(db_path).get_file_manifest()
+    assert sorted(os.path.basename(p) for p in manifest) == ["BW.RJOB..EHE.D.2009.236",
+                                                             "BW.RJOB..EHZ.D.2009.236"]
+
+
+def test_sync_inserts_in_batches_as_results_arrive(tmp_path):
+    sds_path = tmp_path / "SDS"
+    for day in range(5):
+        for tr in read():
+            tr.stats.starttime += day * 86400
+            _write_sds_day(sds_path, tr, ts("2010-01-01"))
+    db_path = str(tmp_path / "database.sqlite")
+
+    with patch("seed_vault.service.db.SYNC_BATCH_FILES", 4), \
+         patch.object(DatabaseManager, "update_file_manifest", autospec=True,
+                      side_effect=DatabaseManager.update_file_manifest) as mock_update:
+        populate_database_from_sds(str(sds_path), db_path, num_processes=2)
+
+    batches = [call.args[1] for call in mock_update.call_args_list if call.args[1]]
+    assert [len(b) for b in batches] == [4, 4, 4, 3]
+    assert len(DatabaseManager(db_path).get_file_manifest()) == 15
+    with DatabaseManager(db_path).connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM archive_data").fetchone()[0] == 15
+
+
+def test_incremental_sync_compares_one_directory_at_a_time(tmp_path):
+    sds_path = tmp_path / "SDS"
+    paths = {}
+    for day in range(2):
+        for tr in read():
+            tr.stats.starttime += day * 86400
+            paths[(tr.stats.channel, day)] = _write_sds_day(sds_path, tr, ts("2010-01-01"))
+    db_path = str(tmp_path / "database.sqlite")
+    populate_database_from_sds(str(sds_path), db_path, num_processes=2, incremental=True)
+    assert len(DatabaseManager(db_path).get_file_manifest()) == 6
+
+    # A file gone from a directory that still has files, a whole directory gone
+    os.remove(paths[("EHE", 1)])
+    shutil.rmtree(paths[("EHN", 0)].parent)
+
+    with patch.object(DatabaseManager, "get_file_manifest", autospec=True,
+                      side_effect=DatabaseManager.get_file_manifest) as mock_manifest:
+        populate_database_from_sds(str(sds_path), db_path, num_processes=2, incremental=True)
+    assert all(call.args[1] is not None for call in mock_manifest.call_args_list)
+
+    manifest = DatabaseManager(db_path).get_file_manifest()
+    assert sorted(os.path.basename(p) for p in manifest) == [
+        "BW.RJOB..EHE.D.2009.236", "BW.RJOB..EHZ.D.2009.236", "BW.RJOB..EHZ.D.2009.237"]
+    with DatabaseManager(db_path).connection() as conn:
+        rows = conn.execute("SELECT channel, COUNT(*) FROM archive_data "
+                            "GROUP BY channel ORDER BY channel").fetchall()
+    assert rows == [("EHE", 1), ("EHZ", 2)]
+
+
+def test_index_sds_archive_backfills_missing_and_stale_indexes(tmp_path):
+    sds_path = tmp_path / "SDS"
+    st = read()
+    paths = [_write_sds_day(sds_path, tr, ts("2010-01-01")) for tr in st]
+
+    assert index_sds_archive(str(sds_path), num_processes=1) == {'indexed': 3, 'skipped': 0, 'failed': 0}
+    # Sidecars don't show up as SDS files
+    assert len(list(iter_sds_files(str(sds_path)))) == 3
+
+    os.utime(paths[0], (ts("2011-01-01"), ts("2011-01-01")))
+    assert index_sds_archive(str(sds_path), num_processes=2) == {'indexed': 1, 'skipped': 2, 'failed': 0}
+
+
+def test_get_missing_from_request_uses_stream_and_one_db_query(db_manager):
+    from obspy import Stream, Trace
+
+    st = Stream([Trace(header={"network": "IU", "station": "ANMO", "location": "00", "channel": ch})
+                 for ch in ("BHZ", "BHN")])
+    t0, t1 = "2024-01-01T00:00:00", "2024-01-01T00:10:00"
+    requests = [("IU", "ANMO", "00,10", "BH?", t0, t1),
+                ("IU", "COLA", "00", "BHZ,BHE", t0, t1),
+                ("AU", "NWAO", "", "BHZ", t0, t1)]
+
+    with patch.object(DatabaseManager, "check_data_existence_bulk",
+                      wraps=db_manager.check_data_existence_bulk) as mock_bulk:
+        missing = get_missing_from_request(db_manager, "ev1", requests, st)
+    assert mock_bulk.call_count == 1
+    assert missing == {"ev1": {"IU.ANMO": ["IU.ANMO.10.BH?"], "IU.COLA": "ALL", "AU.NWAO": "ALL"}}
+
+    # Any streamed channel archived across a request's whole window satisfies it
+    db_manager.bulk_insert_archive_data([("IU", "ANMO", "00", "BHZ", ts("2023-12-31"), ts("2024-01-02"))])
+    missing = get_missing_from_request(db_manager, "ev1", requests, st)
+    assert missing == {"ev1": {"IU.ANMO": [], "IU.COLA": [], "AU.NWAO": []}}
+    assert get_missing_from_request(db_manager, "ev1", requests, Stream())["ev1"]["IU.ANMO"] == "ALL"
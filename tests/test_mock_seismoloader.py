@@ -98,3 +98,516 @@ def test_get_stations_no_data(mock_settings):
         result = get_stations(mock_settings)
 
         assert result is None
+
+
+def test_archive_requests_concurrent_limits_per_client():
+    """Concurrent downloads never exceed the per data center connection limit"""
+    import threading
+    import time
+    from seed_vault.service.seismoloader import archive_requests_concurrent
+
+    wc = MagicMock()
+    wc.base_url = "http://fdsn.example"
+    requests = [("XX", f"S{i:02d}", "", "HHZ", "2024-01-01T00:00:00", "2024-01-02T00:00:00")
+                for i in range(12)]
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_archive(request, waveform_clients, sds_path, db_manager, **kwargs):
+        with lock:
+            active.append(request)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(request)
+
+    with patch("seed_vault.service.seismoloader.archive_request", side_effect=fake_archive) as mock_archive:
+        n = archive_requests_concurrent(requests, {"open": wc}, "unused", MagicMock(),
+                                        num_workers=8, max_client_connections=2)
+
+    assert n == len(requests)
+    assert mock_archive.call_count == len(requests)
+    assert max(peak) <= 2
+
+
+def test_archive_requests_concurrent_stop_event():
+    """Nothing is requested once the stop event is set"""
+    import threading
+    from seed_vault.service.seismoloader import archive_requests_concurrent
+
+    stop_event = threading.Event()
+    stop_event.set()
+    requests = [("XX", "STA", "", "HHZ", "2024-01-01T00:00:00", "2024-01-02T00:00:00")] * 4
+
+    with patch("seed_vault.service.seismoloader.archive_request") as mock_archive:
+        n = archive_requests_concurrent(requests, {"open": MagicMock()}, "unused", MagicMock(),
+                                        num_workers=4, stop_event=stop_event)
+
+    assert n == 0
+    mock_archive.assert_not_called()
+
+
+def test_archive_requests_pipelined_writes_every_download():
+    """Every downloaded stream reaches the single writer stage and the database"""
+    from obspy import read
+    from seed_vault.service.seismoloader import archive_requests_pipelined
+
+    requests = [("BW", f"S{i}", "", "EHZ", "2009-08-24T00:20:00", "2009-08-24T00:21:00")
+                for i in range(5)]
+    db_manager = MagicMock()
+
+    with patch("seed_vault.service.seismoloader.download_request", side_effect=lambda r, c: read()), \
+         patch("seed_vault.service.seismoloader.write_stream_to_sds", return_value=[("BW",)]) as mock_write:
+        fetch_stats, write_stats = archive_requests_pipelined(
+            requests, {"open": MagicMock()}, "unused", db_manager,
+            num_workers=3, max_buffer_mb=0.01)
+
+    assert mock_write.call_count == len(requests)
+    assert db_manager.bulk_insert_archive_data.call_count == len(requests)
+    assert fetch_stats.count == write_stats.count == len(requests)
+    assert fetch_stats.nbytes == write_stats.nbytes > 0
+
+
+def test_archive_requests_parallel_passes_pipeline_buffer_setting():
+    """processing.pipeline_buffer_mb caps the data waiting for the pipeline's writer"""
+    from seed_vault.models.config import ProcessingConfig
+    from seed_vault.service.seismoloader import archive_requests_parallel
+
+    settings = MagicMock()
+    settings.processing = ProcessingConfig(pipeline_downloads=True, pipeline_buffer_mb=64)
+    with patch("seed_vault.service.seismoloader.archive_requests_pipelined") as mock_pipelined:
+        archive_requests_parallel([("XX",)], {"open": MagicMock()}, settings, MagicMock())
+
+    assert mock_pipelined.call_args.kwargs["max_buffer_mb"] == 64
+
+
+def test_sds_write_buffer_writes_each_day_file_once(tmp_path):
+    """Traces for the same day file collected across requests are written once and merged"""
+    from obspy import read, Stream
+    from seed_vault.service.seismoloader import SDSWriteBuffer
+
+    tr = read().select(channel="EHZ")[0]
+    tr.data = tr.data.astype("int32")
+    split_time = tr.stats.starttime + 10
+    first = tr.slice(tr.stats.starttime, split_time)
+    second = tr.slice(split_time + tr.stats.delta, tr.stats.endtime)
+
+    db_manager = MagicMock()
+    buffer = SDSWriteBuffer(str(tmp_path), db_manager, max_buffer_mb=100)
+    with patch("seed_vault.service.seismoloader.streamread", wraps=read) as mock_read:
+        buffer.add(Stream([first]))
+        buffer.add(Stream([second]))
+        assert len(buffer) == 1
+        assert buffer.flush() == 1
+        mock_read.assert_not_called()  # new file, nothing to re-read
+
+    assert db_manager.bulk_insert_archive_data.call_count == 1
+    assert len(buffer) == 0 and buffer.nbytes == 0
+
+    written = list(tmp_path.rglob("BW.RJOB..EHZ.D.2009.236"))
+    assert len(written) == 1
+    st_out = read(str(written[0]))
+    assert len(st_out) == 1
+    assert st_out[0].stats.npts == tr.stats.npts
+
+
+def test_run_event_parallel_shares_one_download_pool():
+    """All events' requests are archived in one call and every event's data is read back"""
+    from obspy import read
+    from seed_vault.service.seismoloader import run_event_parallel
+
+    settings = MagicMock()
+    settings.auths = []
+    settings.waveform.force_redownload = False
+    settings.processing.parallel_events = 2
+    settings.processing.coalesce_slack_sec = None
+    events = [MagicMock(), MagicMock(), MagicMock()]
+    settings.event.selected_catalogs = events
+    collected = [
+        ([("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00", "2024-01-01T00:10:00")], [("arr1",)], {}),
+        None,  # failed event
+        ([("IU", "COLA", "00", "BHZ", "2024-02-01T00:00:00", "2024-02-01T00:10:00")], [("arr2",)], {}),
+    ]
+    db_manager = MagicMock()
+
+    with patch("seed_vault.service.seismoloader.setup_paths", return_value=(settings, db_manager)), \
+         patch("seed_vault.service.seismoloader.Client"), \
+         patch("seed_vault.service.seismoloader.collect_requests_events", return_value=collected), \
+         patch("seed_vault.service.seismoloader.prune_requests", side_effect=lambda r, *a, **k: r), \
+         patch("seed_vault.service.seismoloader.archive_requests_parallel") as mock_archive, \
+         patch("seed_vault.service.seismoloader.load_event_traces",
+               side_effect=lambda eq, reqs, *a: (read(), {reqs[0][1]: reqs})) as mock_load:
+        traces, missing = run_event_parallel(settings)
+
+    assert mock_archive.call_count == 1
+    assert {req[1] for req in mock_archive.call_args[0][0]} == {"ANMO", "COLA"}
+    db_manager.bulk_insert_arrival_data.assert_called_once_with([("arr1",), ("arr2",)])
+    assert [call[0][0] for call in mock_load.call_args_list] == [events[0], events[2]]
+    assert len(traces) == 6
+    assert set(missing) == {"ANMO", "COLA"}
+
+
+def test_collect_requests_events_keeps_results_when_one_event_fails():
+    """A failed event doesn't rerun the others; a broken pool reruns only what it didn't handle"""
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    from seed_vault.service.seismoloader import collect_requests_events
+
+    from types import SimpleNamespace
+    events = [SimpleNamespace(resource_id=f"ev{i}") for i in range(3)]
+
+    def worker(eq):
+        if eq.resource_id == "ev1":
+            raise failure
+        return ([eq.resource_id], [], {})
+
+    for failure, expected, rerun in ((ValueError("unpicklable"), [(["ev0"], [], {}), None, (["ev2"], [], {})], []),
+                                     (BrokenProcessPool("killed"), [(["ev0"], [], {}), "serial", (["ev2"], [], {})], ["ev1"])):
+        with patch("seed_vault.service.seismoloader.ProcessPoolExecutor", ThreadPoolExecutor), \
+             patch("seed_vault.service.seismoloader._init_event_worker"), \
+             patch("seed_vault.service.seismoloader._collect_requests_event_worker", side_effect=worker), \
+             patch("seed_vault.service.seismoloader.get_travel_time_model"), \
+             patch("seed_vault.service.seismoloader.collect_requests_event", return_value="serial") as mock_serial:
+            results = collect_requests_events(events, MagicMock(), num_processes=2)
+
+        assert results == expected
+        assert [call[0][0].resource_id for call in mock_serial.call_args_list] == rerun
+
+
+def test_coalesce_requests_merges_overlapping_event_windows():
+    """Windows of the same channel from nearby events become one download"""
+    from obspy import UTCDateTime
+    from seed_vault.service.seismoloader import coalesce_requests
+
+    requests = [
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00+00:00", "2024-01-01T00:10:00+00:00"),
+        ("IU", "COLA", "00", "BHZ", "2024-01-01T00:05:00+00:00", "2024-01-01T00:15:00+00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:05:00+00:00", "2024-01-01T00:15:00+00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T00:15:30+00:00", "2024-01-01T00:20:00+00:00"),
+        ("IU", "ANMO", "00", "BHZ", "2024-01-01T02:00:00+00:00", "2024-01-01T02:10:00+00:00"),
+    ]
+
+    coalesced = coalesce_requests(requests, slack=60)
+
+    assert len(coalesced) == 3
+    assert requests[1] in coalesced and requests[4] in coalesced
+    merged = [req for req in coalesced if req[1] == "ANMO" and req != requests[4]][0]
+    assert UTCDateTime(merged[4]) == UTCDateTime("2024-01-01T00:00:00")
+    assert UTCDateTime(merged[5]) == UTCDateTime("2024-01-01T00:20:00")
+
+    assert len(coalesce_requests(requests, slack=0)) == 4
+
+
+def test_pack_requests_keeps_exact_windows_within_budget():
+    """Each channel keeps its own window, and selections stay within the payload budget"""
+    from seed_vault.service.seismoloader import pack_requests, estimate_request_bytes
+
+    requests = [("IU", f"S{i:02d}", "00", "BHZ", "2024-01-01T00:00:00", f"2024-01-01T0{i % 3 + 1}:00:00")
+                for i in range(10)]
+    requests.append(("II", "PFO", "00", "LHZ", "2024-01-01T00:00:00", "2024-01-02T00:00:00"))
+    sample_rates = {("IU", f"S{i:02d}", "00", "BHZ"): 20.0 for i in range(10)}
+
+    one_hour = estimate_request_bytes(requests[0], sample_rates)
+    assert one_hour == 20 * 3600 * 2.0
+    assert estimate_request_bytes(requests[-1]) == 1 * 86400 * 2.0  # from the band code
+
+    selections = pack_requests(requests, max_bytes=4 * one_hour, sample_rates=sample_rates)
+
+    assert sorted(line for sel in selections for line in sel) == sorted(requests)
+    for sel in selections:
+        assert len({line[0] for line in sel}) == 1
+        if len(sel) > 1:
+            assert sum(estimate_request_bytes(line, sample_rates) for line in sel) <= 4 * one_hour
+
+
+def test_pack_requests_groups_selections_by_client():
+    """Stations with their own credentials get selections (and clients) of their own"""
+    from seed_vault.service.seismoloader import pack_requests, select_waveform_client
+
+    requests = [("XX", sta, "00", "HHZ", "2024-01-01T00:00:00", "2024-01-01T01:00:00")
+                for sta in ("AAA", "BBB", "CCC", "DDD")]
+    requests.append(("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00", "2024-01-01T01:00:00"))
+    clients = {"open": MagicMock(), "XX.BBB": MagicMock(), "XX.DDD": MagicMock(), "IU": MagicMock()}
+
+    selections = pack_requests(requests, max_bytes=1e12, client_keys={"XX.BBB", "XX.DDD", "IU"})
+
+    by_client = {id(select_waveform_client(sel, clients)): sorted(line[1] for line in sel)
+                 for sel in selections}
+    assert by_client == {id(clients["open"]): ["AAA", "CCC"], id(clients["XX.BBB"]): ["BBB"],
+                         id(clients["XX.DDD"]): ["DDD"], id(clients["IU"]): ["ANMO"]}
+
+
+def test_download_request_sends_selection_as_bulk():
+    """A packed selection is fetched with a single get_waveforms_bulk call"""
+    from obspy import read
+    from seed_vault.service.seismoloader import download_request
+
+    wc = MagicMock()
+    wc.get_waveforms_bulk.return_value = read()
+    selection = [("IU", "ANMO", "00", "BHZ", "2024-01-01T00:00:00", "2024-01-01T01:00:00"),
+                 ("IU", "COLA", "00", "BHZ", "2024-01-01T00:30:00", "2024-01-01T01:00:00")]
+
+    st = download_request(selection, {"open": wc})
+
+    assert len(st) == 3
+    wc.get_waveforms.assert_not_called()
+    bulk = wc.get_waveforms_bulk.call_args[0][0]
+    assert [line[1] for line in bulk] == ["ANMO", "COLA"]
+    assert bulk[1][4] == UTCDateTime("2024-01-01T00:30:00")
+
+
+def test_download_request_long_station_list_uses_chunked_bulk():
+    """Combined requests with many stations are POSTed in payload limited chunks"""
+    from obspy import read
+    from seed_vault.service import seismoloader
+
+    wc = MagicMock()
+    wc.get_waveforms_bulk.side_effect = lambda bulk: read()
+    stations = ",".join(f"S{i:03d}" for i in range(30))
+    request = ("XX", stations, "00,10", "BHZ", "2024-01-01T00:00:00", "2024-01-01T01:00:00")
+
+    with patch.object(seismoloader, "BULK_MAX_LINES", 25):
+        st = seismoloader.download_request(request, {"open": wc})
+
+    wc.get_waveforms.assert_not_called()
+    chunks = [call[0][0] for call in wc.get_waveforms_bulk.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [25, 25, 10]
+    assert {(line[1], line[2]) for chunk in chunks for line in chunk} == \
+        {(f"S{i:03d}", loc) for i in range(30) for loc in ("00", "10")}
+    assert len(st) == 9
+
+
+def test_sds_record_writer_routes_raw_records(tmp_path):
+    """Raw records are appended to new day files as-is and merged into existing ones"""
+    import io
+    from obspy import read
+    from seed_vault.service.seismoloader import SDSRecordWriter
+
+    st = read()
+    for tr in st:
+        tr.data = tr.data.astype("int32")
+    buf = io.BytesIO()
+    st.write(buf, format="MSEED", reclen=512, encoding="STEIM2")
+    data = buf.getvalue()
+
+    db_manager = MagicMock()
+    writer = SDSRecordWriter(str(tmp_path), db_manager, max_buffer_mb=100)
+    sink = writer.open_sink()
+    for i in range(0, len(data), 300):  # arrives in pieces that split records
+        sink.write(data[i:i + 300])
+    sink.close()
+
+    assert writer.nbytes == len(data)
+    with patch("seed_vault.service.seismoloader.streamread", wraps=read) as mock_read:
+        assert writer.flush() == 3
+        mock_read.assert_not_called()  # nothing decoded
+
+    day_file = tmp_path / "2009" / "BW" / "RJOB" / "EHZ.D" / "BW.RJOB..EHZ.D.2009.236"
+    assert read(str(day_file))[0].stats.npts == st.select(channel="EHZ")[0].stats.npts
+    spans = db_manager.bulk_insert_archive_data.call_args[0][0]
+    assert len(spans) == 3
+    assert spans[0][4] == st[0].stats.starttime.timestamp
+
+    # A day file written before this writer existed is merged, not appended to
+    writer = SDSRecordWriter(str(tmp_path), db_manager)
+    sink = writer.open_sink()
+    sink.write(data)
+    with patch("seed_vault.service.seismoloader.streamread", wraps=read) as mock_read:
+        writer.flush()
+        assert mock_read.call_count == 6  # new records + existing file, per channel
+    merged = read(str(day_file))
+    assert len(merged) == 1
+    assert merged[0].stats.npts == st.select(channel="EHZ")[0].stats.npts
+
+
+def test_sds_record_writer_drops_repeated_boundary_records(tmp_path):
+    """A record returned by two adjacent requests is stored once; other overlaps are merged"""
+    import io
+    from obspy import read, Stream
+    from seed_vault.service.mseed import iter_records
+    from seed_vault.service.seismoloader import SDSRecordWriter
+
+    tr = read().select(channel="EHZ")[0]
+    tr.data = tr.data.astype("int32")
+    buf = io.BytesIO()
+    tr.write(buf, format="MSEED", reclen=512, encoding="STEIM2")
+    data = buf.getvalue()
+    records = [data[offset:offset + header.record_length] for offset, header in iter_records(data)]
+    day_file = tmp_path / "2009" / "BW" / "RJOB" / "EHZ.D" / "BW.RJOB..EHZ.D.2009.236"
+
+    writer = SDSRecordWriter(str(tmp_path), MagicMock())
+    for first, last in ((0, 4), (3, 6), (6, len(records))):  # records 3 and 6 arrive twice
+        sink = writer.open_sink()
+        sink.write(b"".join(records[first:last + 1]))
+        sink.close()
+        if first == 3:
+            writer.flush()
+    with patch("seed_vault.service.seismoloader.streamread", wraps=read) as mock_read:
+        writer.flush()
+        mock_read.assert_not_called()
+    assert day_file.read_bytes() == data
+
+    # Differently cut records overlapping the written ones go through the merge path
+    buf = io.BytesIO()
+    Stream([tr.slice(starttime=tr.stats.starttime + 5)]).write(buf, format="MSEED", reclen=256)
+    sink = writer.open_sink()
+    sink.write(buf.getvalue())
+    sink.close()
+    with patch("seed_vault.service.seismoloader.streamread", wraps=read) as mock_read:
+        writer.flush()
+        assert mock_read.called
+    merged = read(str(day_file))
+    assert len(merged) == 1
+    assert merged[0].stats.npts == tr.stats.npts
+
+
+def test_sds_record_writer_merges_same_start_records_of_different_length(tmp_path):
+    """A longer record starting with a written one is merged, not taken for a repeat"""
+    import io
+    from obspy import read
+    from seed_vault.service.seismoloader import SDSRecordWriter
+
+    tr = read().select(channel="EHZ")[0]
+    tr.data = tr.data.astype("int32")
+    short, full = io.BytesIO(), io.BytesIO()
+    tr.slice(endtime=tr.stats.starttime + 2).write(short, format="MSEED", reclen=512, encoding="STEIM2")
+    tr.write(full, format="MSEED", reclen=4096, encoding="STEIM2")
+
+    for same_batch in (False, True):
+        sds_path = tmp_path / str(same_batch)
+        db_manager = MagicMock()
+        writer = SDSRecordWriter(str(sds_path), db_manager)
+        for data in (short.getvalue(), full.getvalue()):
+            sink = writer.open_sink()
+            sink.write(data)
+            sink.close()
+            if not same_batch:
+                writer.flush()
+        writer.flush()
+
+        merged = read(str(sds_path / "2009" / "BW" / "RJOB" / "EHZ.D" / "BW.RJOB..EHZ.D.2009.236"))
+        assert len(merged) == 1
+        assert merged[0].stats.npts == tr.stats.npts
+        inserted = [ele for call in db_manager.bulk_insert_archive_data.call_args_list
+                    for ele in call.args[0]]
+        assert max(UTCDateTime(ele[5]) for ele in inserted) == tr.stats.endtime
+
+
+def test_written_day_files_get_a_record_index(tmp_path):
+    """With index_records, every day file written has an up to date sidecar index"""
+    from obspy import read
+    from seed_vault.service.mseed import load_record_index, read_segments
+    from seed_vault.service.seismoloader import write_stream_to_sds
+
+    st = read()
+    write_stream_to_sds(st, str(tmp_path), index_records=True)
+
+    day_file = str(tmp_path / "2009" / "BW" / "RJOB" / "EHZ.D" / "BW.RJOB..EHZ.D.2009.236")
+    records, segments = load_record_index(day_file)
+    assert records.nsamples.sum() == st.select(channel="EHZ")[0].stats.npts
+    assert segments == read_segments(day_file)
+
+
+def test_split_stream_by_day_returns_views():
+    """Day traces share memory with the original data, so splitting allocates ~nothing"""
+    import tracemalloc
+    import numpy as np
+    from obspy import Stream, Trace
+    from seed_vault.service.seismoloader import split_stream_by_day
+
+    tr = Trace(data=np.arange(10 * 86400 * 3, dtype=np.int32))
+    tr.stats.sampling_rate = 10.0
+    tr.stats.starttime = UTCDateTime("2024-01-01T06:00:00")
+    tr.stats.network, tr.stats.station, tr.stats.channel = "XX", "STA", "BHZ"
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    by_day = split_stream_by_day(Stream([tr]))
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    assert peak < tr.data.nbytes / 20
+
+    assert sorted(by_day) == [(2024, doy, "XX", "STA", "", "BHZ") for doy in (1, 2, 3, 4)]
+    day_traces = [by_day[key][0] for key in sorted(by_day)]
+    assert [t.stats.npts for t in day_traces] == [10 * 64800, 10 * 86400, 10 * 86400, 10 * 21600]
+    assert sum(t.stats.npts for t in day_traces) == tr.stats.npts
+    for t in day_traces:
+        assert np.shares_memory(t.data, tr.data)
+        assert t.data[0] == round((t.stats.starttime - tr.stats.starttime) * 10)
+    assert day_traces[1].stats.starttime == UTCDateTime("2024-01-02")
+
+
+def test_get_local_waveforms_bulk_reads_each_day_file_once(tmp_path):
+    """Bulk local reads match per-request reads, opening each needed day file once"""
+    import numpy as np
+    from obspy import read, Stream, Trace
+    from seed_vault.service.db import AvailabilityIndex
+    from seed_vault.service.seismoloader import write_stream_to_sds
+    from seed_vault.service.mseed import read_windows
+    from seed_vault.service.waveform import get_local_waveform, get_local_waveforms_bulk
+
+    st = Stream()
+    for cha in ("HHZ", "HHN"):
+        st += Trace(data=np.arange(2000, dtype=np.int32),
+                    header={"network": "XX", "station": "STA", "location": "00", "channel": cha,
+                            "starttime": UTCDateTime("2024-01-01T23:59:50"), "sampling_rate": 100.0})
+    write_stream_to_sds(st, str(tmp_path))
+    assert len(list(tmp_path.rglob("XX.STA.00.*"))) == 4  # two days, two channels
+
+    settings = MagicMock()
+    settings.sds_path = str(tmp_path)
+    requests = [("XX", "STA", "00", "HHZ,HHN,HHE", "2024-01-01T23:59:55", "2024-01-02T00:00:05"),
+                ("XX", "STA", "00", "HHZ", "2024-01-01T23:59:51", "2024-01-01T23:59:52")]
+    expected = Stream()
+    for request in requests:
+        expected += get_local_waveform(request, settings)
+
+    with patch("seed_vault.service.waveform.read_windows", wraps=read_windows) as mock_read:
+        bulk = get_local_waveforms_bulk(requests, str(tmp_path))
+    assert mock_read.call_count == 4
+    assert sorted(tr.id + str(tr.stats.starttime) + str(tr.stats.npts) for tr in bulk) == \
+        sorted(tr.id + str(tr.stats.starttime) + str(tr.stats.npts) for tr in expected)
+    for tr in bulk:
+        match = [e for e in expected if e.id == tr.id and e.stats.starttime == tr.stats.starttime]
+        assert np.array_equal(tr.data, match[0].data)
+
+    # Channels the index knows to have no data in the window aren't read
+    index = AvailabilityIndex.from_rows([
+        ("XX", "STA", "00", "HHZ", UTCDateTime("2024-01-01T23:59:50").timestamp,
+         UTCDateTime("2024-01-02T00:00:09.99").timestamp),
+        ("XX", "STA", "00", "HHN", UTCDateTime("2024-01-03").timestamp,
+         UTCDateTime("2024-01-04").timestamp),
+    ])
+    with patch("seed_vault.service.waveform.read_windows", wraps=read_windows) as mock_read:
+        bulk = get_local_waveforms_bulk([("XX", "STA", "00", "HH?", "2024-01-01T23:59:55",
+                                          "2024-01-02T00:00:05")], str(tmp_path), index)
+    assert mock_read.call_count == 2
+    assert [tr.stats.channel for tr in bulk] == ["HHZ"]
+    assert bulk[0].stats.npts == 1001
+
+
+def test_stream_to_dataframe_flattens_traces_with_exact_times():
+    """One row per kept sample, gaps as NaN, times from starttime and delta"""
+    import numpy as np
+    from obspy import read
+    from seed_vault.service.waveform import stream_to_dataframe
+
+    st = read()
+    late = read().select(channel="EHZ")
+    late[0].stats.starttime += 100
+    st += late
+    st.merge()  # EHZ now has a masked gap
+
+    df = stream_to_dataframe(st)
+    assert len(df) == sum(tr.stats.npts for tr in st)
+    ehz = df[df.channel == "EHZ"]
+    tr = st.select(channel="EHZ")[0]
+    assert ehz.time.iloc[0] == tr.stats.starttime.datetime
+    assert ehz.time.iloc[-1] == tr.stats.endtime.datetime
+    assert ehz.amplitude.isna().sum() == np.ma.count_masked(tr.data)
+
+    decimated = stream_to_dataframe(st, decimate=7)
+    assert len(decimated) == sum(-(-tr.stats.npts // 7) for tr in st)
+    assert (decimated.time.iloc[1] - decimated.time.iloc[0]).total_seconds() == 7 * st[0].stats.delta
@@ -0,0 +1,142 @@
+import io
+
+import pytest
+from obspy import read, UTCDateTime
+
+from seed_vault.service.mseed import parse_record_header, iter_records
+
+
+def mseed_bytes(st, **kwargs):
+    buf = io.BytesIO()
+    st.write(buf, format="MSEED", **kwargs)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("byteorder", [">", "<"])
+def test_record_headers_match_obspy(byteorder):
+    st = read()
+    for tr in st:
+        tr.data = tr.data.astype("int32")
+    data = mseed_bytes(st, reclen=512, encoding="STEIM2", byteorder=byteorder)
+
+    records = list(iter_records(data))
+
+    assert sum(header.record_length for _, header in records) == len(data)
+    assert {header.channel for _, header in records} == {"EHZ", "EHN", "EHE"}
+    first = records[0][1]
+    assert (first.network, first.station, first.location) == ("BW", "RJOB", "")
+    assert first.starttime == st[0].stats.starttime.timestamp
+    assert first.sample_rate == st[0].stats.sampling_rate
+    assert (first.year, first.doy) == (2009, 236)
+
+    ehz = [header for _, header in records if header.channel == "EHZ"]
+    assert sum(header.nsamples for header in ehz) == st.select(channel="EHZ")[0].stats.npts
+    assert ehz[-1].endtime == pytest.approx(st.select(channel="EHZ")[0].stats.endtime.timestamp)
+
+
+def test_iter_records_stops_at_incomplete_record():
+    data = mseed_bytes(read(), reclen=512)
+
+    records = list(iter_records(data[:1300]))
+
+    assert [offset for offset, _ in records] == [0, 512]
+    with pytest.raises(ValueError):
+        parse_record_header(data[:20])
+
+
+@pytest.mark.parametrize("byteorder", [">", "<"])
+def test_read_segments_matches_obspy(tmp_path, byteorder):
+    from obspy import Stream
+    from seed_vault.service.db import stream_to_db_elements
+    from seed_vault.service.mseed import read_segments
+
+    tr = read().select(channel="EHZ")[0]
+    tr.data = tr.data.astype("int32")
+    t0 = tr.stats.starttime
+    # A gap, and an overlapping piece written out of order
+    st = Stream([tr.slice(endtime=t0 + 10), tr.slice(starttime=t0 + 20),
+                 tr.slice(starttime=t0 + 5, endtime=t0 + 15)])
+    fn = str(tmp_path / "BW.RJOB..EHZ.D.2009.236")
+    st.write(fn, format="MSEED", reclen=256, byteorder=byteorder)
+
+    segments = read_segments(fn)
+
+    assert segments == stream_to_db_elements(read(fn, headonly=True))
+    assert [UTCDateTime(s[5]) for s in segments] == [t0 + 15, tr.stats.endtime]
+
+
+def test_scan_records_falls_back_for_mixed_record_lengths():
+    from obspy import Stream
+    from seed_vault.service.mseed import scan_records
+
+    st = read()
+    data = mseed_bytes(Stream([st[0]]), reclen=256) + mseed_bytes(Stream([st[1]]), reclen=512)
+
+    records = scan_records(data)
+
+    assert records.offsets[-1] + 512 == len(data)
+    assert set(records.codes.tolist()) == {b"RJOB   EHZBW", b"RJOB   EHNBW"}
+    assert records.nsamples.sum() == st[0].stats.npts + st[1].stats.npts
+
+
+def test_read_windows_decodes_only_overlapping_records(tmp_path):
+    import numpy as np
+    from unittest.mock import patch
+    from obspy import Trace
+    from seed_vault.service.mseed import read_windows
+
+    tr = Trace(data=np.arange(100 * 3600, dtype=np.int32),
+               header={"network": "XX", "station": "STA", "channel": "HHZ",
+                       "starttime": UTCDateTime("2024-01-01"), "sampling_rate": 100.0})
+    fn = str(tmp_path / "XX.STA..HHZ.D.2024.001")
+    tr.write(fn, format="MSEED", reclen=512, encoding="STEIM2")
+    size = (tmp_path / "XX.STA..HHZ.D.2024.001").stat().st_size
+    windows = [(UTCDateTime("2024-01-01T00:10:00").timestamp, UTCDateTime("2024-01-01T00:12:20").timestamp),
+               (UTCDateTime("2024-01-01T00:50:00").timestamp, UTCDateTime("2024-01-01T00:50:10").timestamp)]
+
+    with patch("seed_vault.service.mseed.streamread", wraps=read) as mock_read:
+        st = read_windows(fn, windows)
+    decoded = mock_read.call_args[0][0].getbuffer().nbytes
+    assert decoded < size / 10
+
+    full = read(fn)
+    for t0, t1 in windows:
+        part = st.slice(UTCDateTime(t0), UTCDateTime(t1))
+        expected = full.slice(UTCDateTime(t0), UTCDateTime(t1))
+        assert len(part) == 1
+        assert np.array_equal(part[0].data, expected[0].data)
+
+    assert len(read_windows(fn, [(UTCDateTime("2024-01-02").timestamp,
+                                  UTCDateTime("2024-01-02T00:01:00").timestamp)])) == 0
+
+
+def test_record_index_sidecar_is_used_until_file_changes(tmp_path):
+    import os
+    import numpy as np
+    from obspy import Stream
+    from unittest.mock import patch
+    from seed_vault.service import mseed
+
+    tr = read().select(channel="EHZ")[0]
+    tr.data = tr.data.astype("int32")
+    t0 = tr.stats.starttime
+    fn = str(tmp_path / "BW.RJOB..EHZ.D.2009.236")
+    Stream([tr.slice(endtime=t0 + 10), tr.slice(starttime=t0 + 20)]).write(fn, format="MSEED", reclen=256)
+
+    records = mseed.write_record_index(fn)
+    assert os.path.exists(str(tmp_path / ".BW.RJOB..EHZ.D.2009.236.idx"))
+    expected = mseed.read_segments(fn)
+    mseed._record_index_cache.clear()
+
+    with patch("seed_vault.service.mseed.scan_records") as mock_scan:
+        assert mseed.read_segments(fn) == expected
+        assert len(expected) == 2
+        cached = mseed.record_index(fn)
+    mock_scan.assert_not_called()
+    assert np.array_equal(cached.starttimes, records.starttimes)
+    assert np.array_equal(cached.codes, records.codes)
+
+    # Once the file is rewritten the sidecar is stale and ignored
+    tr.write(fn, format="MSEED", reclen=512)
+    assert mseed.load_record_index(fn) is None
+    assert len(mseed.read_segments(fn)) == 1
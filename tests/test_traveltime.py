@@ -0,0 +1,63 @@
+import numpy as np
+from obspy.taup import TauPyModel
+
+from seed_vault.service.traveltime import TravelTimeTable, first_p_s_times
+
+
+MODEL = TauPyModel("iasp91")
+
+
+def test_interpolated_times_match_taup(tmp_path):
+    table = TravelTimeTable("iasp91", cache_dir=tmp_path, tolerance=0.5, model=MODEL)
+
+    p, s = table.travel_times(33.0, 45.3)
+    p_exact, s_exact = first_p_s_times(MODEL, 33.0, 45.3)
+    assert abs(p - p_exact) <= 0.5
+    assert abs(s - s_exact) <= 0.5
+
+    # Nodes are reused from disk by the next table
+    table.save()
+    reloaded = TravelTimeTable("iasp91", cache_dir=tmp_path, tolerance=0.5, model=MODEL)
+    assert reloaded._done.sum() == 4
+    assert reloaded.travel_times(33.0, 45.3) == (p, s)
+
+
+def test_outside_grid_uses_taup():
+    table = TravelTimeTable("iasp91", tolerance=0.5, model=MODEL)
+
+    p, s = table.travel_times(900.0, 45.3)
+    assert (p, s) == first_p_s_times(MODEL, 900.0, 45.3)
+    assert not table._done.any()
+
+
+def test_zero_tolerance_falls_back_to_taup():
+    table = TravelTimeTable("iasp91", tolerance=0.0, model=MODEL)
+
+    p_times, s_times = table.travel_times_array([33.0], [45.3])
+    assert np.allclose((p_times[0], s_times[0]), first_p_s_times(MODEL, 33.0, 45.3))
+
+
+def test_cells_are_checked_beyond_their_centre():
+    # Triplication points whose cells interpolate well at the centre only
+    table = TravelTimeTable("iasp91", tolerance=0.5, model=MODEL)
+
+    for depth, dist in ((622.0, 11.9), (331.0, 13.3)):
+        p, s = table.travel_times(depth, dist)
+        p_exact, s_exact = first_p_s_times(MODEL, depth, dist)
+        assert abs(p - p_exact) <= 0.5
+        assert abs(s - s_exact) <= 0.5
+
+
+def test_save_keeps_nodes_saved_by_another_process(tmp_path):
+    # Two workers starting from the same (empty) grid file, saving in turn
+    first = TravelTimeTable("iasp91", cache_dir=tmp_path, tolerance=0.5, model=MODEL)
+    second = TravelTimeTable("iasp91", cache_dir=tmp_path, tolerance=0.5, model=MODEL)
+    first.travel_times(33.0, 45.3)
+    second.travel_times(150.0, 90.2)
+    first.save()
+    second.save()
+
+    reloaded = TravelTimeTable("iasp91", cache_dir=tmp_path, tolerance=0.5, model=MODEL)
+    assert reloaded._done.sum() == 8
+    assert reloaded.travel_times(33.0, 45.3) == first.travel_times(33.0, 45.3)
+    assert reloaded.travel_times(150.0, 90.2) == second.travel_times(150.0, 90.2)
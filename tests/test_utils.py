@@ -0,0 +1,41 @@
+import numpy as np
+from obspy import read_inventory, read_events
+from obspy.geodetics import gps2dist_azimuth
+
+from seed_vault.models.common import RectangleArea, CircleArea
+from seed_vault.models.config import GeometryConstraint
+from seed_vault.service.utils import gps2dist_azimuth_array, inventory_coordinates, \
+    filter_inventory_by_geo_constraints, filter_catalog_by_geo_constraints
+
+
+def test_gps2dist_azimuth_array_matches_obspy():
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-89, 89, 200), rng.uniform(-180, 180, 200)
+
+    dist, azi, baz = gps2dist_azimuth_array(35.0, -106.0, lats, lons)
+
+    expected = np.array([gps2dist_azimuth(35.0, -106.0, lat, lon) for lat, lon in zip(lats, lons)])
+    assert np.allclose(dist, expected[:, 0], atol=0.1)
+    assert np.allclose(azi, expected[:, 1], atol=1e-6)
+    assert np.allclose(baz, expected[:, 2], atol=1e-6)
+    assert gps2dist_azimuth_array(35.0, -106.0, [35.0], [-106.0])[0][0] == 0.0
+
+
+def test_filter_inventory_by_geo_constraints():
+    inv = read_inventory()  # GR.FUR (48.16, 11.28), GR.WET (49.14, 12.88), 3 epochs of BW.RJOB (47.74, 12.80)
+    assert len(inventory_coordinates(inv)[0]) == 5
+
+    box = GeometryConstraint(coords=RectangleArea(min_lat=49, max_lat=50, min_lon=12, max_lon=13))
+    circle = GeometryConstraint(coords=CircleArea(lat=47.7, lon=12.8, max_radius=0.5, min_radius=0))
+
+    filtered = filter_inventory_by_geo_constraints(inv, [box, circle])
+    assert sorted(sta.code for net in filtered for sta in net) == ["RJOB", "RJOB", "RJOB", "WET"]
+
+
+def test_filter_catalog_by_geo_constraints():
+    cat = read_events()  # events at (41.8, 79.7), (39.3, 41.0) and (38.0, 37.7)
+    circle = GeometryConstraint(coords=CircleArea(lat=42.0, lon=80.0, max_radius=5, min_radius=0))
+
+    filtered = filter_catalog_by_geo_constraints(cat + cat, [circle])
+    assert len(filtered) == 1
+    assert filtered[0].origins[0].longitude > 70